@@ -2,7 +2,7 @@
 from dotenv import load_dotenv
 
 # Flask and related
-from flask import Flask, render_template, flash  
+from flask import Flask, render_template, flash, make_response
 
 # Extensions
 from flask_migrate import Migrate  
@@ -16,14 +16,32 @@ from flask_mail import Mail
 from config import get_config  
 from app.models.db import db  
 from app.models.user import User 
-from app.utils import get_app_config 
+from app.utils.user_cache import UserCache, UserSnapshot
+from app.utils import get_app_config, permission_cache
 from app.models.oauth import OAuth  
+from app.instrumentation import SQLInstrumentation
+from app.metrics import RequestMetrics
+from app.db_pool import PoolMetrics
+from app.db_replicas import ReplicaRouter
+from app.fragment_cache import FragmentCache
+from app.product_lookup import ProductLookup
+from app.product_cache import ProductCache
+from app.password_hasher import PasswordHasher
+from app.rate_limit import RateLimiter
+from app.services.inventory_summary_service import InventorySummaryService
 
 
 load_dotenv()
 
 mail = Mail()
 
+
+def _oauth_storage_user():
+    """The mapped User for Flask-Dance queries, even when current_user is a cached snapshot."""
+    user = current_user._get_current_object()
+    return user.get_real_user() if isinstance(user, UserSnapshot) else user
+
+
 # App factory to create Flask app instances
 def create_app(config_name=None):
     """Application factory for creating Flask app instances"""
@@ -59,9 +77,21 @@ def create_app(config_name=None):
         app.logger.warning("Google OAuth secrets not set. Google login will be disabled.")
 
     # Initialize db with the app
+    PoolMetrics.configure_pools(app)
     db.init_app(app)
     Migrate(app, db)
     mail.init_app(app)
+    permission_cache.init_app(app)
+    SQLInstrumentation(app)
+    RequestMetrics(app)
+    PoolMetrics(app)
+    # Before any hook that may query the database
+    RateLimiter(app)
+    ReplicaRouter(app)
+    FragmentCache(app, version_provider=InventorySummaryService.get_catalog_version)
+    ProductLookup(app)
+    ProductCache(app)
+    PasswordHasher(app)
 
     # Initialize Flask-Login
     login_manager = LoginManager()
@@ -69,10 +99,14 @@ def create_app(config_name=None):
     login_manager.login_message_category = 'info'
     login_manager.init_app(app)
 
-    # User loader callback for Flask-Login
+    user_cache = UserCache(ttl=app.config.get("USER_CACHE_TTL", 0),
+                           max_entries=app.config.get("USER_CACHE_MAX_ENTRIES", 4096))
+    user_cache.init_app(app)
+
+    # User loader callback for Flask-Login; serves a cached snapshot when it can
     @login_manager.user_loader
     def load_user(user_id):
-        return User.query.get(int(user_id))
+        return user_cache.load(int(user_id))
 
     # Register CLI command for database initialization
     @app.cli.command("init-db")
@@ -82,6 +116,9 @@ def create_app(config_name=None):
             db.create_all()
         print("Initialized the database.")
 
+    from app.commands import register_commands
+    register_commands(app)
+
     # --- Flask-Dance Google Blueprint Setup ---
     # Only register if keys are configured
     google_bp = None
@@ -90,7 +127,7 @@ def create_app(config_name=None):
             client_id=app.config.get("GOOGLE_OAUTH_CLIENT_ID"),
             client_secret=app.config.get("GOOGLE_OAUTH_CLIENT_SECRET"),
             scope=["openid", "https://www.googleapis.com/auth/userinfo.email", "https://www.googleapis.com/auth/userinfo.profile"],
-            storage=SQLAlchemyStorage(OAuth, db.session, user=current_user), 
+            storage=SQLAlchemyStorage(OAuth, db.session, user=_oauth_storage_user), 
             # offline=True, # Add if you need refresh tokens
         )
         app.register_blueprint(google_bp, url_prefix="/login")
@@ -98,12 +135,13 @@ def create_app(config_name=None):
         google_bp = None
 
     # Register blueprints
-    from app.routes import main_bp, products_bp, reports_bp
+    from app.routes import main_bp, products_bp, reports_bp, api_v1_bp
     from app.routes.auth import auth_bp
     from app.routes.admin import admin_bp
     app.register_blueprint(main_bp)
     app.register_blueprint(products_bp)
     app.register_blueprint(reports_bp)
+    app.register_blueprint(api_v1_bp)
     app.register_blueprint(auth_bp)
     app.register_blueprint(admin_bp)
 
@@ -116,6 +154,13 @@ def create_app(config_name=None):
     def not_found_error(error):
         return render_template('errors/404.html'), 404
 
+    @app.errorhandler(429)
+    @app.errorhandler(503)
+    def retry_later_error(error):
+        response = make_response(render_template('errors/retry_later.html', error=error), error.code)
+        response.retry_after = getattr(error, 'retry_after', None)
+        return response
+
     @app.errorhandler(500)
     def internal_error(error):
         db.session.rollback()  # Rollback any failed database sessions
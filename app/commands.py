@@ -0,0 +1,136 @@
+import time
+
+import click
+from flask import current_app
+from flask.cli import AppGroup, with_appcontext
+from app.models import db
+from app.product_lookup import get_product_lookup
+from app.services.inventory_service import InventoryService
+from app.services.inventory_summary_service import InventorySummaryService
+from app.services.mail_service import MailService
+from app.services.product_import_service import ProductImportService
+
+
+# --- Inventory summary maintenance: flask inventory-summary <command> ---
+inventory_summary_cli = AppGroup('inventory-summary', help='Maintain the materialized inventory summary.')
+
+
+@inventory_summary_cli.command('rebuild')
+def rebuild_inventory_summary_command():
+    """Recompute the inventory summary from the product table."""
+    summary = InventorySummaryService.rebuild()
+    click.echo(
+        f"Rebuilt inventory summary: {summary.total_products} products, "
+        f"{summary.total_units} units, value {summary.total_value}."
+    )
+
+
+@inventory_summary_cli.command('check')
+def check_inventory_summary_command():
+    """Report drift between the inventory summary and the product table."""
+    drift = InventorySummaryService.check_drift()
+    if not drift:
+        click.echo("Inventory summary is up to date.")
+        return
+    for field, values in drift.items():
+        click.echo(f"{field}: stored={values['stored']} actual={values['actual']}")
+    raise click.ClickException("Inventory summary has drifted; run 'flask inventory-summary rebuild'.")
+
+
+# --- Stock ledger maintenance: flask stock <command> ---
+stock_cli = AppGroup('stock', help='Maintain the stock movement ledger.')
+
+
+@stock_cli.command('snapshot')
+def snapshot_stock_command():
+    """Checkpoint stock levels of products that moved since their last snapshot."""
+    written = InventoryService.take_snapshots()
+    click.echo(f"Wrote {written} stock snapshot(s).")
+
+
+# --- Typeahead index: flask product-lookup <command> ---
+product_lookup_cli = AppGroup('product-lookup', help='Maintain the in-process product lookup index.')
+
+
+@product_lookup_cli.command('rebuild')
+def rebuild_product_lookup_command():
+    """Build the lookup index from the product table and report its size.
+
+    Each web worker holds its own index and rebuilds it every
+    PRODUCT_LOOKUP_REFRESH_SECONDS (or on restart); this command checks that
+    a build succeeds, how long it takes and whether it fits
+    PRODUCT_LOOKUP_MAX_PRODUCTS.
+    """
+    lookup = get_product_lookup()
+    started = time.perf_counter()
+    lookup.rebuild()
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    if lookup.size is None:
+        raise click.ClickException("The lookup index was not built (see the log); lookups will query the database.")
+    click.echo(f"Built product lookup index: {lookup.size} products in {elapsed_ms:.0f}ms.")
+
+
+@click.command('import-products')
+@click.argument('csv_file', type=click.File('r', encoding='utf-8-sig'))
+@click.option('--chunk-size', type=int, default=None, help='Rows per chunk (default: PRODUCT_IMPORT_CHUNK_SIZE).')
+@click.option('--errors', 'errors_file', type=click.File('w', encoding='utf-8'), default=None,
+              help='Write rejected rows with their error to this CSV file.')
+@click.option('--upsert', is_flag=True, help='Update products whose SKU already exists instead of rejecting them.')
+@with_appcontext
+def import_products_command(csv_file, chunk_size, errors_file, upsert):
+    """Bulk import products from CSV_FILE (use - for stdin)."""
+    def report(totals):
+        click.echo(f"  {totals['rows']} rows read, {totals['imported']} imported, {totals['rejected']} rejected")
+
+    totals = ProductImportService.import_csv(csv_file, chunk_size=chunk_size,
+                                             error_stream=errors_file, progress=report, upsert=upsert)
+    if upsert:
+        click.echo(f"Sync finished: {totals['inserted']} inserted, {totals['updated']} updated, "
+                   f"{totals['unchanged']} unchanged, {totals['rejected']} rejected.")
+    else:
+        click.echo(f"Import finished: {totals['imported']} imported, {totals['rejected']} rejected.")
+    if totals['rejected'] and errors_file is None:
+        click.echo("Re-run with --errors FILE to see why rows were rejected.")
+
+
+@click.command('mail-worker')
+@click.option('--once', is_flag=True, help='Deliver the emails that are due now, then exit.')
+@click.option('--batch-size', type=int, default=None, help='Emails per SMTP connection (default: MAIL_OUTBOX_BATCH_SIZE).')
+@click.option('--requeue-dead', is_flag=True, help='Give dead emails a fresh set of attempts, then exit.')
+@click.option('--purge-sent', 'purge_days', type=int, default=None, metavar='DAYS',
+              help='Delete emails sent more than DAYS days ago, then exit.')
+@with_appcontext
+def mail_worker_command(once, batch_size, requeue_dead, purge_days):
+    """Send queued email from the mail outbox, polling every MAIL_OUTBOX_POLL_SECONDS."""
+    if requeue_dead:
+        click.echo(f"Requeued {MailService.requeue_dead()} dead email(s).")
+        return
+    if purge_days is not None:
+        click.echo(f"Deleted {MailService.purge_sent(purge_days)} sent email(s).")
+        return
+
+    poll_seconds = current_app.config.get('MAIL_OUTBOX_POLL_SECONDS', 5)
+    totals = {'sent': 0, 'retry': 0, 'dead': 0}
+    try:
+        while True:
+            counts = MailService.deliver_batch(batch_size)
+            for key, count in counts.items():
+                totals[key] += count
+            # Release the connection between batches; the next one starts a fresh transaction
+            db.session.remove()
+            if not any(counts.values()):
+                if once:
+                    break
+                time.sleep(poll_seconds)
+    except KeyboardInterrupt:
+        pass
+    click.echo(f"Mail worker stopped: {totals['sent']} sent, {totals['retry']} to retry, {totals['dead']} dead.")
+
+
+def register_commands(app):
+    """Attach the application's CLI command groups to the Flask app."""
+    app.cli.add_command(inventory_summary_cli)
+    app.cli.add_command(stock_cli)
+    app.cli.add_command(product_lookup_cli)
+    app.cli.add_command(import_products_command)
+    app.cli.add_command(mail_worker_command)
@@ -0,0 +1,120 @@
+import time
+from typing import Any, Optional
+
+from flask import Flask
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+from app.metrics import metrics
+from app.models.db import db
+
+# Engine options that size a pool; engines configured with them get an InstrumentedQueuePool
+POOL_OPTIONS = ('pool_size', 'max_overflow', 'pool_timeout')
+
+CHECKOUT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+metrics.describe('db_pool_checkout_wait_seconds', 'histogram',
+                 'Time to get a connection from the pool, including waiting for a free one.', CHECKOUT_BUCKETS)
+metrics.describe('db_pool_checkout_timeouts_total', 'counter', 'Checkouts that gave up after the pool timeout.')
+metrics.describe('db_pool_checked_out', 'gauge', 'Connections currently checked out of the pool.')
+metrics.describe('db_pool_saturation', 'gauge', 'Checked-out connections as a fraction of pool_size + max_overflow.')
+
+
+class InstrumentedQueuePool(QueuePool):
+    """
+    QueuePool that times every checkout, so waits for a free connection show up in metrics.
+
+    Selected with the poolclass engine option, which
+    PoolMetrics.configure_pools() sets; PoolMetrics then names it after
+    its engine.
+    """
+
+    metrics_name = 'default'
+
+    def __init__(self, creator: Any, pool_size: int = 5, max_overflow: int = 10, **kw: Any) -> None:
+        super().__init__(creator, pool_size=pool_size, max_overflow=max_overflow, **kw)
+        self.max_overflow = max_overflow
+
+    def connect(self) -> Any:
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        except PoolTimeoutError:
+            metrics.inc('db_pool_checkout_timeouts_total', {'engine': self.metrics_name})
+            raise
+        finally:
+            metrics.observe('db_pool_checkout_wait_seconds', time.perf_counter() - started,
+                            {'engine': self.metrics_name})
+
+    def recreate(self) -> 'InstrumentedQueuePool':
+        pool = super().recreate()
+        pool.metrics_name = self.metrics_name
+        return pool
+
+    @property
+    def capacity(self) -> Optional[int]:
+        """Most connections the pool will open, or None without an overflow limit."""
+        return None if self.max_overflow < 0 else self.size() + self.max_overflow
+
+
+class PoolMetrics:
+    """
+    Reports connection pool pressure for every engine of the app.
+
+    Engines created with poolclass=InstrumentedQueuePool (see
+    configure_pools(), which create_app calls before db.init_app) record
+    checkout wait time and timeouts, and their checked-out connections and
+    saturation are updated on every checkout and checkin. Other pools
+    (e.g. SQLite's in-memory StaticPool) are left alone.
+    """
+
+    def __init__(self, app: Optional[Flask] = None) -> None:
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask) -> None:
+        if not app.config.get('METRICS_ENABLED', True):
+            return
+        with app.app_context():
+            for bind_key, engine in db.engines.items():
+                self.instrument(engine, bind_key or 'default')
+        app.extensions['pool_metrics'] = self
+
+    @staticmethod
+    def configure_pools(app: Flask) -> None:
+        """
+        Run sized pools as InstrumentedQueuePools. Call before the engines are created.
+
+        Applies to SQLALCHEMY_ENGINE_OPTIONS and SQLALCHEMY_REPLICA_ENGINE_OPTIONS
+        that hold pool options (e.g. engine_options() in config/production.py)
+        and name no poolclass of their own.
+        """
+        if not app.config.get('METRICS_ENABLED', True):
+            return
+        for key in ('SQLALCHEMY_ENGINE_OPTIONS', 'SQLALCHEMY_REPLICA_ENGINE_OPTIONS'):
+            options = app.config.get(key)
+            if options and 'poolclass' not in options and any(option in options for option in POOL_OPTIONS):
+                # A copy: the dict may be shared with the config class
+                app.config[key] = {**options, 'poolclass': InstrumentedQueuePool}
+
+    def instrument(self, engine: Any, name: str) -> None:
+        """Report the pool of an engine created outside Flask-SQLAlchemy (e.g. a read replica) as `name`."""
+        pool = engine.pool
+        if not isinstance(pool, InstrumentedQueuePool):
+            return
+        # Carried over to the pool engine.dispose() creates by InstrumentedQueuePool.recreate()
+        pool.metrics_name = name
+        event.listen(engine, 'checkout', lambda *args: self._update(engine))
+        # Fires just before the connection goes back into the pool, so it still counts as checked out
+        event.listen(engine, 'checkin', lambda *args: self._update(engine, returning=1))
+
+    @staticmethod
+    def _update(engine: Any, returning: int = 0) -> None:
+        pool = engine.pool
+        if not isinstance(pool, InstrumentedQueuePool):
+            return
+        labels = {'engine': pool.metrics_name}
+        checked_out = max(0, pool.checkedout() - returning)
+        metrics.set('db_pool_checked_out', checked_out, labels)
+        metrics.set('db_pool_saturation', checked_out / (pool.capacity or pool.size()), labels)
@@ -0,0 +1,210 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from flask import Flask, current_app, g, has_app_context, has_request_context, request
+from flask import session as http_session
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+from sqlalchemy.sql.dml import UpdateBase
+
+from app.metrics import metrics
+from app.models.db import db
+
+logger = logging.getLogger(__name__)
+
+metrics.describe('db_replica_transactions_total', 'counter',
+                 'Read transactions routed to each replica, or to the primary when none was available.')
+metrics.describe('db_replica_failures_total', 'counter', 'Read replica connection failures, by replica.')
+metrics.describe('db_replica_lagging_total', 'counter', 'Requests sent back to the primary because a replica lagged.')
+
+# Flask session key holding the time until which the user's reads stay on the primary
+PIN_SESSION_KEY = '_db_primary_until'
+
+
+class ReplicaRouter:
+    """
+    Sends reads to read replicas (SQLALCHEMY_REPLICA_URIS).
+
+    GET and HEAD requests to DB_REPLICA_BLUEPRINTS (the dashboard and
+    reports) read from a replica; replica_reads() does the same for a block
+    of code such as a read-only service call. Each transaction uses one
+    replica, taken round-robin; a replica that fails to connect is skipped
+    for DB_REPLICA_RETRY_SECONDS and, with none left, the read falls back to
+    the primary.
+
+    Everything else stays on the primary: flushes, INSERT/UPDATE/DELETE,
+    SELECT ... FOR UPDATE, and every statement after the first write in a
+    request. After a user's own write commits, their reads stay on the
+    primary for DB_REPLICA_READ_YOUR_WRITES_SECONDS (kept in their session
+    cookie, so it holds across workers); set it above the expected replica lag.
+    Catalog pages also check the replica against the primary's catalog
+    version (require_version) and read the primary while it lags.
+    """
+
+    def __init__(self, app: Optional[Flask] = None) -> None:
+        self._lock = threading.Lock()
+        self._next = 0
+        self._down_until: Dict[int, float] = {}
+        self.engines: List[Any] = []
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask) -> None:
+        uris = app.config.get('SQLALCHEMY_REPLICA_URIS') or []
+        if not uris:
+            return
+        options = app.config.get('SQLALCHEMY_REPLICA_ENGINE_OPTIONS')
+        if options is None:
+            options = app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {}
+        self.engines = [create_engine(uri, **options) for uri in uris]
+        self.blueprints = set(app.config.get('DB_REPLICA_BLUEPRINTS') or ())
+        self.read_your_writes = app.config.get('DB_REPLICA_READ_YOUR_WRITES_SECONDS', 10)
+        self.retry_seconds = app.config.get('DB_REPLICA_RETRY_SECONDS', 30)
+
+        sql_instrumentation = app.extensions.get('sql_instrumentation')
+        pool_metrics = app.extensions.get('pool_metrics')
+        for index, engine in enumerate(self.engines):
+            if sql_instrumentation is not None:
+                sql_instrumentation.instrument(engine)
+            if pool_metrics is not None:
+                pool_metrics.instrument(engine, f'replica_{index}')
+        app.extensions['db_replicas'] = self
+        app.before_request(self._start_request)
+        app.teardown_request(self._end_request)
+
+    def _start_request(self) -> None:
+        g.db_wrote = False
+        g.db_replica_reads = (request.method in ('GET', 'HEAD') and request.blueprint in self.blueprints
+                              and not self.pinned())
+
+    @staticmethod
+    def _end_request(exc: Optional[BaseException] = None) -> None:
+        g.pop('db_replica_reads', None)
+        g.pop('db_wrote', None)
+
+    def pinned(self) -> bool:
+        """True if the current user wrote recently enough that replicas may not have their change yet."""
+        return has_request_context() and http_session.get(PIN_SESSION_KEY, 0) > time.time()
+
+    def pin(self) -> None:
+        if self.read_your_writes > 0 and has_request_context():
+            http_session[PIN_SESSION_KEY] = time.time() + self.read_your_writes
+
+    def route(self, session: Session, clause: Any, primary: Any) -> Any:
+        """Return the engine for `clause`: a replica for a routed read, otherwise `primary`."""
+        if primary is not db.engine:
+            return primary
+        if isinstance(clause, UpdateBase):
+            # Core INSERT/UPDATE/DELETE (e.g. stock deltas) count as writes, like a flush
+            mark_written(session)
+            return primary
+        if not g.get('db_replica_reads') or g.get('db_wrote'):
+            return primary
+        if not isinstance(clause, Select) or clause._for_update_arg is not None:
+            return primary
+        engine = session.info.get('db_replica')
+        if engine is None:
+            engine = session.info['db_replica'] = self._pick(session, primary)
+        return engine
+
+    def _pick(self, session: Session, primary: Any) -> Any:
+        with self._lock:
+            start = self._next
+            self._next = (self._next + 1) % len(self.engines)
+            now = time.monotonic()
+            candidates = [index for index in ((start + offset) % len(self.engines)
+                                              for offset in range(len(self.engines)))
+                          if self._down_until.get(index, 0) <= now]
+        for index in candidates:
+            engine = self.engines[index]
+            try:
+                # Connect now, inside the session's transaction, so a dead replica can be skipped
+                session.connection(bind_arguments={'bind': engine})
+            except DBAPIError as e:
+                with self._lock:
+                    self._down_until[index] = time.monotonic() + self.retry_seconds
+                metrics.inc('db_replica_failures_total', {'engine': f'replica_{index}'})
+                logger.warning(f"Read replica {index} unavailable, skipping it for {self.retry_seconds}s: {e}")
+                continue
+            metrics.inc('db_replica_transactions_total', {'engine': f'replica_{index}'})
+            return engine
+        metrics.inc('db_replica_transactions_total', {'engine': 'primary'})
+        return primary
+
+    def dispose(self) -> None:
+        for engine in self.engines:
+            engine.dispose()
+
+
+def get_db_replicas() -> Optional[ReplicaRouter]:
+    """Return the current app's ReplicaRouter, if replicas are configured."""
+    if not has_app_context():
+        return None
+    return current_app.extensions.get('db_replicas')
+
+
+@contextmanager
+def replica_reads() -> Iterator[None]:
+    """Read from a replica inside the block, unless the current user is in their read-your-writes window."""
+    router = get_db_replicas()
+    if router is None:
+        yield
+        return
+    previous = g.get('db_replica_reads', False)
+    g.db_replica_reads = not router.pinned()
+    try:
+        yield
+    finally:
+        g.db_replica_reads = previous
+
+
+def require_version(version: int, read_version: Callable[[], Optional[int]]) -> None:
+    """
+    Send the rest of this request's reads to the primary unless the replica has reached `version`.
+
+    `version` comes from the primary and `read_version` reads the same
+    counter through the routed session, e.g. the catalog version behind a
+    page's ETag, so a page is never tagged newer than the data it shows.
+    """
+    if get_db_replicas() is None or not g.get('db_replica_reads') or g.get('db_wrote'):
+        return
+    replica_version = read_version()
+    if replica_version is None or replica_version < version:
+        metrics.inc('db_replica_lagging_total')
+        g.db_replica_reads = False
+
+
+def mark_written(session: Session) -> None:
+    """Keep the rest of this request on the primary and pin the user to it once the session commits."""
+    session.info['db_wrote'] = True
+    if has_app_context():
+        g.db_wrote = True
+
+
+@event.listens_for(Session, 'after_flush')
+def _flushed(session: Session, flush_context: Any) -> None:
+    if get_db_replicas() is not None:
+        mark_written(session)
+
+
+@event.listens_for(Session, 'after_commit')
+def _committed(session: Session) -> None:
+    router = get_db_replicas()
+    if session.info.pop('db_wrote', False) and router is not None:
+        router.pin()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _rolled_back(session: Session) -> None:
+    session.info.pop('db_wrote', None)
+
+
+@event.listens_for(Session, 'after_transaction_end')
+def _transaction_ended(session: Session, transaction: Any) -> None:
+    if transaction.parent is None:
+        session.info.pop('db_replica', None)
@@ -1,4 +1,5 @@
 from flask_wtf import FlaskForm
+from flask_wtf.file import FileField, FileRequired, FileAllowed
 from wtforms import StringField, TextAreaField, DecimalField, IntegerField, SubmitField
 from decimal import ROUND_HALF_UP
 from wtforms.validators import DataRequired, Length, NumberRange, Optional
@@ -40,3 +41,12 @@ class ConfirmDeleteForm(FlaskForm):
     """Simple form for confirming deletion."""
     submit = SubmitField('Confirm Delete')
 
+# Form: Bulk product import
+class ProductImportForm(FlaskForm):
+    """Upload form for bulk CSV product imports."""
+    csv_file = FileField(
+        'CSV File',
+        validators=[FileRequired(), FileAllowed(['csv'], 'CSV files only.')]
+    )
+    submit = SubmitField('Import Products')
+
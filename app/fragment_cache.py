@@ -0,0 +1,166 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional, Tuple
+
+from flask import Flask, current_app, g, has_app_context
+from jinja2 import nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+
+from app.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+metrics.describe('fragment_cache_requests_total', 'counter', 'Template fragment cache lookups by result.')
+metrics.describe('fragment_render_duration_seconds', 'histogram', 'Render time of cache-missed template fragments.')
+
+
+class LRUFragmentStore:
+    """In-process LRU store with per-entry TTL."""
+
+    def __init__(self, max_entries: int = 1024) -> None:
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[str, Tuple[float, str]]' = OrderedDict()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: str, value: str, ttl: int) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisFragmentStore:
+    """Shared store on any client with Redis-style get()/setex(), e.g. redis.Redis."""
+
+    def __init__(self, client: Any, prefix: str = 'fragment:') -> None:
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[str]:
+        value = self.client.get(self.prefix + key)
+        if isinstance(value, bytes):
+            value = value.decode('utf-8')
+        return value
+
+    def set(self, key: str, value: str, ttl: int) -> None:
+        self.client.setex(self.prefix + key, ttl, value)
+
+
+class FragmentCache:
+    """
+    Backs the {% cache key, ttl %} template tag.
+
+    Cache keys combine the template name, the key expression and the
+    version returned by `version_provider` (the catalog change counter), so
+    any product write makes every cached fragment unreachable; entries then
+    age out of the store. If the version is unavailable, fragments render
+    uncached. The version is read at most once per request.
+    """
+
+    def __init__(self, app: Optional[Flask] = None, store: Any = None,
+                 version_provider: Optional[Callable[[], Optional[int]]] = None) -> None:
+        self.store = store
+        self.version_provider = version_provider
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask) -> None:
+        if self.store is None:
+            self.store = self._store_from_config(app)
+        app.extensions['fragment_cache'] = self
+        app.jinja_env.add_extension(FragmentCacheExtension)
+        app.before_request(self._reset_request_version)
+
+    @staticmethod
+    def _store_from_config(app: Flask) -> Any:
+        backend = app.config.get('FRAGMENT_CACHE_BACKEND', 'lru')
+        if backend == 'null':
+            return None
+        if backend == 'redis':
+            try:
+                import redis
+                return RedisFragmentStore(redis.Redis.from_url(app.config['FRAGMENT_CACHE_REDIS_URL']))
+            except (ImportError, KeyError) as e:
+                app.logger.warning(f"Redis fragment cache unavailable ({e}); using the in-process LRU store.")
+        return LRUFragmentStore(app.config.get('FRAGMENT_CACHE_MAX_ENTRIES', 1024))
+
+    @staticmethod
+    def _reset_request_version() -> None:
+        g.pop('_fragment_cache_version', None)
+
+    def current_version(self) -> Optional[int]:
+        if self.version_provider is None:
+            return None
+        if '_fragment_cache_version' not in g:
+            g._fragment_cache_version = self.version_provider()
+        return g._fragment_cache_version
+
+
+def get_fragment_cache() -> Optional[FragmentCache]:
+    if not has_app_context():
+        return None
+    return current_app.extensions.get('fragment_cache')
+
+
+class FragmentCacheExtension(Extension):
+    """
+    Jinja extension adding {% cache key[, ttl] %}...{% endcache %}.
+
+    `key` is any expression identifying the fragment within its template
+    (e.g. 'rows:' ~ request.full_path); `ttl` defaults to
+    FRAGMENT_CACHE_DEFAULT_TTL seconds.
+    """
+    tags = {'cache'}
+
+    def parse(self, parser: Any) -> nodes.Node:
+        lineno = next(parser.stream).lineno
+        args = [nodes.Const(parser.name), parser.parse_expression()]
+        if parser.stream.skip_if('comma'):
+            args.append(parser.parse_expression())
+        else:
+            args.append(nodes.Const(None))
+        body = parser.parse_statements(('name:endcache',), drop_needle=True)
+        return nodes.CallBlock(self.call_method('_render_cached', args), [], [], body).set_lineno(lineno)
+
+    def _render_cached(self, template_name: Optional[str], key: Any, ttl: Optional[int],
+                       caller: Callable[[], str]) -> str:
+        cache = get_fragment_cache()
+        version = cache.current_version() if cache is not None and cache.store is not None else None
+        if version is None:
+            return caller()
+
+        template_name = template_name or 'string'
+        cache_key = f'{template_name}:{key}:v{version}'
+        cached = cache.store.get(cache_key)
+        if cached is not None:
+            metrics.inc('fragment_cache_requests_total', {'result': 'hit'})
+            return Markup(cached)
+
+        metrics.inc('fragment_cache_requests_total', {'result': 'miss'})
+        started = time.perf_counter()
+        rendered = caller()
+        metrics.observe('fragment_render_duration_seconds', time.perf_counter() - started,
+                        {'template': template_name})
+        if ttl is None:
+            ttl = current_app.config.get('FRAGMENT_CACHE_DEFAULT_TTL', 300)
+        cache.store.set(cache_key, str(rendered), int(ttl))
+        return rendered
@@ -0,0 +1,105 @@
+import logging
+import time
+from typing import Any, Optional, Tuple
+
+from flask import Flask, Response, g, has_app_context, request
+from sqlalchemy import event
+
+from app.models.db import db
+
+logger = logging.getLogger(__name__)
+
+# Longest repr of a slow statement's parameters written to the log
+MAX_LOGGED_PARAMS_LENGTH = 1000
+
+
+class SQLInstrumentation:
+    """
+    Counts SQL statements and database time per request.
+
+    Hooks before/after_cursor_execute on every engine of the app (and on
+    engines created outside Flask-SQLAlchemy, via instrument()), keeps the
+    running totals on `flask.g`, adds them to the response as a
+    Server-Timing header and writes one key=value log line per request.
+    Statements slower than SQL_SLOW_QUERY_MS are logged with their
+    parameters. The hooks only do a perf_counter() call and two additions,
+    so they are cheap enough to stay on in production.
+    """
+
+    def __init__(self, app: Optional[Flask] = None) -> None:
+        self.slow_query_ms: Optional[float] = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask) -> None:
+        if not app.config.get('SQL_INSTRUMENTATION_ENABLED', True):
+            return
+        self.slow_query_ms = app.config.get('SQL_SLOW_QUERY_MS', 250)
+
+        with app.app_context():
+            for engine in db.engines.values():
+                self.instrument(engine)
+
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        app.extensions['sql_instrumentation'] = self
+
+    def instrument(self, engine: Any) -> None:
+        """Count and time the statements of an engine created outside Flask-SQLAlchemy (e.g. a read replica)."""
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+
+    def _before_cursor_execute(self, conn: Any, cursor: Any, statement: str, parameters: Any,
+                               context: Any, executemany: bool) -> None:
+        conn.info.setdefault('query_start_time', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn: Any, cursor: Any, statement: str, parameters: Any,
+                              context: Any, executemany: bool) -> None:
+        started = conn.info['query_start_time'].pop()
+        elapsed = time.perf_counter() - started
+
+        if has_app_context():
+            stats = g.get('_sql_stats')
+            if stats is not None:
+                stats[0] += 1
+                stats[1] += elapsed
+
+        if self.slow_query_ms is not None and elapsed * 1000 >= self.slow_query_ms:
+            params = repr(parameters)
+            if len(params) > MAX_LOGGED_PARAMS_LENGTH:
+                params = params[:MAX_LOGGED_PARAMS_LENGTH] + '...'
+            logger.warning(
+                f"slow_query duration_ms={elapsed * 1000:.1f} executemany={executemany} "
+                f"statement={' '.join(statement.split())!r} parameters={params}"
+            )
+
+    @staticmethod
+    def _start_request() -> None:
+        g._sql_stats = [0, 0.0]
+        g._request_started = time.perf_counter()
+
+    @staticmethod
+    def _finish_request(response: Response) -> Response:
+        stats = g.get('_sql_stats')
+        started = g.get('_request_started')
+        if stats is None or started is None:
+            return response
+
+        total_ms = (time.perf_counter() - started) * 1000
+        count, db_ms = stats[0], stats[1] * 1000
+        response.headers.add(
+            'Server-Timing', f'db;dur={db_ms:.2f};desc="{count} queries", app;dur={total_ms:.2f}'
+        )
+        logger.info(
+            f"request method={request.method} path={request.path} endpoint={request.endpoint} "
+            f"status={response.status_code} queries={count} db_ms={db_ms:.2f} total_ms={total_ms:.2f}"
+        )
+        return response
+
+
+def get_request_sql_stats() -> Tuple[int, float]:
+    """Return (query count, DB seconds) so far in the current request, or (0, 0.0) outside one."""
+    stats = g.get('_sql_stats') if has_app_context() else None
+    if stats is None:
+        return 0, 0.0
+    return stats[0], stats[1]
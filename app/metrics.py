@@ -0,0 +1,289 @@
+import atexit
+import glob
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from flask import Flask, Response, before_render_template, g, request, template_rendered
+
+from app.instrumentation import get_request_sql_stats
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+class MetricsRegistry:
+    """
+    A small Prometheus-compatible registry of counters, gauges and histograms.
+
+    Families are declared once with describe() and updated with inc(),
+    set() and observe(). Values live in this process. When a multiprocess
+    directory is configured (METRICS_MULTIPROC_DIR), each process also
+    writes its values to <dir>/metrics_<pid>.json at most every
+    METRICS_FLUSH_INTERVAL seconds, and render() sums the files of all
+    workers. Updates made between writes are written by a timer once the
+    interval has passed, and at exit, so an idle worker's file is current. Files of dead workers still count for counters and histograms
+    but not for gauges. Clear the directory when the service restarts.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._families: Dict[str, Dict[str, Any]] = {}
+        self._values: Dict[str, Dict[LabelKey, Any]] = {}
+        self.multiproc_dir: Optional[str] = None
+        self.flush_interval = 1.0
+        self._last_flush = 0.0
+        self._dirty = False
+        self._timer: Optional[threading.Timer] = None
+        self._timer_pid = 0
+        atexit.register(self._flush_pending)
+
+    def describe(self, name: str, kind: str, help_text: str,
+                 buckets: Optional[Iterable[float]] = None) -> None:
+        """Declare a metric family; kind is 'counter', 'gauge' or 'histogram'."""
+        with self._lock:
+            self._families.setdefault(name, {
+                'kind': kind,
+                'help': help_text,
+                'buckets': tuple(buckets or LATENCY_BUCKETS) if kind == 'histogram' else None,
+            })
+            self._values.setdefault(name, {})
+
+    def inc(self, name: str, labels: Optional[Dict[str, Any]] = None, value: float = 1) -> None:
+        key = self._key(labels)
+        with self._lock:
+            values = self._values[name]
+            values[key] = values.get(key, 0) + value
+        self._maybe_flush()
+
+    def set(self, name: str, value: float, labels: Optional[Dict[str, Any]] = None) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[name][key] = value
+        self._maybe_flush()
+
+    def observe(self, name: str, value: float, labels: Optional[Dict[str, Any]] = None) -> None:
+        key = self._key(labels)
+        with self._lock:
+            buckets = self._families[name]['buckets']
+            values = self._values[name]
+            state = values.get(key)
+            if state is None:
+                state = values[key] = [[0] * len(buckets), 0.0, 0]
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+        self._maybe_flush()
+
+    def get(self, name: str, labels: Optional[Dict[str, Any]] = None) -> Any:
+        """Return this process's current value for one label set (0 if never set)."""
+        with self._lock:
+            return self._values.get(name, {}).get(self._key(labels), 0)
+
+    @staticmethod
+    def _key(labels: Optional[Dict[str, Any]]) -> LabelKey:
+        return tuple(sorted((k, str(v)) for k, v in (labels or {}).items()))
+
+    # --- Multiprocess store ---
+
+    def _maybe_flush(self) -> None:
+        if not self.multiproc_dir:
+            return
+        wait = self.flush_interval - (time.monotonic() - self._last_flush)
+        if wait <= 0:
+            self.flush()
+            return
+        with self._lock:
+            self._dirty = True
+            # A timer started before a fork did not survive it
+            if self._timer is not None and self._timer_pid == os.getpid():
+                return
+            self._timer = threading.Timer(wait, self._flush_pending)
+            self._timer.daemon = True
+            self._timer_pid = os.getpid()
+            self._timer.start()
+
+    def _flush_pending(self) -> None:
+        """Write updates the last flush missed, e.g. from a worker's final requests before going idle."""
+        with self._lock:
+            self._timer = None
+            dirty = self._dirty
+        if dirty:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write this process's values to its file in the multiprocess directory."""
+        if not self.multiproc_dir:
+            return
+        with self._lock:
+            self._last_flush = time.monotonic()
+            self._dirty = False
+            payload = {name: [[list(map(list, key)), value] for key, value in values.items()]
+                       for name, values in self._values.items()}
+        os.makedirs(self.multiproc_dir, exist_ok=True)
+        path = os.path.join(self.multiproc_dir, f'metrics_{os.getpid()}.json')
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(payload, f)
+        os.replace(tmp_path, path)
+
+    def _collect(self) -> Dict[str, Dict[LabelKey, Any]]:
+        """Return the values to expose: this process's, or the sum over all worker files."""
+        if not self.multiproc_dir:
+            with self._lock:
+                return {name: {key: self._copy(value) for key, value in values.items()}
+                        for name, values in self._values.items()}
+
+        self.flush()
+        merged: Dict[str, Dict[LabelKey, Any]] = {name: {} for name in self._families}
+        for path in glob.glob(os.path.join(self.multiproc_dir, 'metrics_*.json')):
+            pid = int(os.path.basename(path)[len('metrics_'):-len('.json')])
+            try:
+                with open(path, encoding='utf-8') as f:
+                    payload = json.load(f)
+            except (OSError, ValueError):
+                continue
+            alive = _pid_alive(pid)
+            for name, entries in payload.items():
+                family = self._families.get(name)
+                if family is None or (family['kind'] == 'gauge' and not alive):
+                    continue
+                for raw_key, value in entries:
+                    key = tuple(tuple(pair) for pair in raw_key)
+                    merged[name][key] = self._merge(merged[name].get(key), value)
+        return merged
+
+    @staticmethod
+    def _copy(value: Any) -> Any:
+        return [list(value[0]), value[1], value[2]] if isinstance(value, list) else value
+
+    @staticmethod
+    def _merge(current: Any, value: Any) -> Any:
+        if current is None:
+            return MetricsRegistry._copy(value)
+        if isinstance(value, list):
+            return [[a + b for a, b in zip(current[0], value[0])], current[1] + value[1], current[2] + value[2]]
+        return current + value
+
+    # --- Exposition ---
+
+    def render(self) -> str:
+        """Return all families in the Prometheus text exposition format (0.0.4)."""
+        values = self._collect()
+        lines: List[str] = []
+        for name in sorted(self._families):
+            family = self._families[name]
+            lines.append(f'# HELP {name} {family["help"]}')
+            lines.append(f'# TYPE {name} {family["kind"]}')
+            for key, value in sorted(values.get(name, {}).items()):
+                if family['kind'] != 'histogram':
+                    lines.append(f'{name}{_format_labels(key)} {value}')
+                    continue
+                counts, total, count = value
+                cumulative = 0
+                for bound, bucket_count in zip(family['buckets'], counts):
+                    cumulative += bucket_count
+                    lines.append(f'{name}_bucket{_format_labels(key + (("le", str(bound)),))} {cumulative}')
+                lines.append(f'{name}_bucket{_format_labels(key + (("le", "+Inf"),))} {count}')
+                lines.append(f'{name}_sum{_format_labels(key)} {total}')
+                lines.append(f'{name}_count{_format_labels(key)} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+def _pid_alive(pid: int) -> bool:
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(key: LabelKey) -> str:
+    if not key:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape_label_value(v)}"' for k, v in key) + '}'
+
+
+metrics = MetricsRegistry()
+metrics.describe('http_requests_total', 'counter', 'HTTP requests by blueprint, endpoint, method and status.')
+metrics.describe('http_request_duration_seconds', 'histogram', 'HTTP request latency by blueprint and endpoint.')
+metrics.describe('http_request_db_seconds', 'histogram', 'Database time spent per HTTP request.')
+metrics.describe('http_request_db_queries_total', 'counter', 'SQL statements issued by HTTP requests.')
+metrics.describe('template_render_duration_seconds', 'histogram', 'Jinja render time by template.')
+
+
+class RequestMetrics:
+    """
+    Records request, database and template timings into `metrics` and
+    serves them at METRICS_PATH (default /metrics). Each rendered template's
+    cost is also added to the response as a Server-Timing entry.
+    """
+
+    def __init__(self, app: Optional[Flask] = None) -> None:
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask) -> None:
+        if not app.config.get('METRICS_ENABLED', True):
+            return
+        metrics.multiproc_dir = app.config.get('METRICS_MULTIPROC_DIR') or None
+        metrics.flush_interval = app.config.get('METRICS_FLUSH_INTERVAL', 1.0)
+
+        app.before_request(self._start_request)
+        app.after_request(self._record_request)
+        app.add_url_rule(app.config.get('METRICS_PATH', '/metrics'), 'metrics', self.metrics_view)
+        before_render_template.connect(self._start_render, app)
+        template_rendered.connect(self._record_render, app)
+
+    @staticmethod
+    def _start_request() -> None:
+        g._metrics_started = time.perf_counter()
+        g._metrics_render_stack = []
+        g._metrics_template_times = []
+
+    @staticmethod
+    def _record_request(response: Response) -> Response:
+        started = g.get('_metrics_started')
+        if started is None or request.endpoint in ('static', 'metrics'):
+            return response
+
+        labels = {'blueprint': request.blueprint or 'app', 'endpoint': request.endpoint or 'none'}
+        metrics.observe('http_request_duration_seconds', time.perf_counter() - started, labels)
+        metrics.inc('http_requests_total', {**labels, 'method': request.method, 'status': response.status_code})
+        queries, db_seconds = get_request_sql_stats()
+        metrics.observe('http_request_db_seconds', db_seconds, labels)
+        if queries:
+            metrics.inc('http_request_db_queries_total', labels, queries)
+        for index, (template_name, seconds) in enumerate(g.get('_metrics_template_times') or ()):
+            response.headers.add('Server-Timing', f'tpl{index};dur={seconds * 1000:.2f};desc="{template_name}"')
+        return response
+
+    @staticmethod
+    def _start_render(sender: Flask, template: Any, context: Dict[str, Any], **extra: Any) -> None:
+        g.setdefault('_metrics_render_stack', []).append(time.perf_counter())
+
+    @staticmethod
+    def _record_render(sender: Flask, template: Any, context: Dict[str, Any], **extra: Any) -> None:
+        stack = g.get('_metrics_render_stack')
+        if stack:
+            seconds = time.perf_counter() - stack.pop()
+            metrics.observe('template_render_duration_seconds', seconds, {'template': template.name or 'string'})
+            g.setdefault('_metrics_template_times', []).append((template.name or 'string', seconds))
+
+    @staticmethod
+    def metrics_view() -> Response:
+        return Response(metrics.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
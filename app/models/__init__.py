@@ -1,9 +1,14 @@
 from .db import db
 from .product import Product
+from . import product_search  # registers the full-text index DDL
 from .user import User
 from .oauth import OAuth
 from .role import Role
 from .permission import Permission
+from .inventory_summary import InventorySummary
+from .stock_movement import StockMovement, StockSnapshot
+from .mail_outbox import OutboundEmail
 
 # Export all models
-__all__ = ["db", "Product", "User", "OAuth", "Role", "Permission"]
+__all__ = ["db", "Product", "User", "OAuth", "Role", "Permission", "InventorySummary",
+           "StockMovement", "StockSnapshot", "OutboundEmail"]
@@ -1,5 +1,26 @@
+from typing import Any, Optional
+
+from flask import current_app, has_app_context
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
 
-# Initialize the SQLAlchemy database instance
-db = SQLAlchemy()
 
+class RoutingSession(Session):
+    """
+    Session that lets the app's ReplicaRouter (see app/db_replicas.py) send reads to a replica.
+
+    Flushes and explicitly bound statements always go to the engine
+    Flask-SQLAlchemy picks, i.e. the primary.
+    """
+
+    def get_bind(self, mapper: Optional[Any] = None, clause: Optional[Any] = None,
+                 bind: Optional[Any] = None, **kwargs: Any) -> Any:
+        engine = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        if bind is not None or self._flushing or not has_app_context():
+            return engine
+        router = current_app.extensions.get('db_replicas')
+        return router.route(self, clause, engine) if router is not None else engine
+
+
+# Initialize the SQLAlchemy database instance
+db = SQLAlchemy(session_options={'class_': RoutingSession})
@@ -0,0 +1,28 @@
+from app.models.db import db
+from typing import Any
+from datetime import datetime, timezone
+from sqlalchemy.types import Numeric
+
+
+class InventorySummary(db.Model):
+    """
+    Running inventory totals maintained incrementally on every product write.
+    A single row (id=1) holds the totals for the whole catalog.
+    """
+    __tablename__: str = 'inventory_summary'
+
+    SINGLETON_ID = 1
+
+    id: Any = db.Column(db.Integer, primary_key=True)
+    total_products: Any = db.Column(db.Integer, default=0, nullable=False)
+    total_units: Any = db.Column(db.BigInteger, default=0, nullable=False)
+    total_value: Any = db.Column(Numeric(precision=16, scale=2), default=0, nullable=False)
+    low_stock_count: Any = db.Column(db.Integer, default=0, nullable=False)
+    out_of_stock_count: Any = db.Column(db.Integer, default=0, nullable=False)
+    # Bumped by every product write; cheap validator for caches and conditional GETs
+    catalog_version: Any = db.Column(db.BigInteger, default=0, server_default='0', nullable=False)
+    updated_at: Any = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc),
+                                onupdate=lambda: datetime.now(timezone.utc))
+
+    def __repr__(self) -> str:
+        return f'<InventorySummary products={self.total_products} value={self.total_value}>'
@@ -0,0 +1,46 @@
+from app.models.db import db
+from typing import Any, List
+from datetime import datetime, timezone
+
+
+class OutboundEmail(db.Model):
+    """
+    Durable outbox of emails, delivered by `flask mail-worker`.
+
+    Requests enqueue a row and return; the worker claims due rows, sends
+    them over one SMTP connection per batch and retries failures with
+    exponential backoff. A row that keeps failing ends up 'dead' and stays
+    for inspection (see `flask mail-worker --requeue-dead`).
+    """
+    __tablename__: str = 'mail_outbox'
+    __table_args__ = (
+        # The worker's claim query: due rows in a given status, oldest first
+        db.Index('ix_mail_outbox_status_next_attempt_at', 'status', 'next_attempt_at'),
+    )
+
+    STATUS_PENDING = 'pending'
+    # Claimed by a worker; next_attempt_at is the lease expiry, after which another worker may retry it
+    STATUS_SENDING = 'sending'
+    STATUS_SENT = 'sent'
+    STATUS_DEAD = 'dead'
+
+    id: Any = db.Column(db.Integer, primary_key=True)
+    subject: Any = db.Column(db.String(255), nullable=False)
+    sender: Any = db.Column(db.String(255), nullable=False)
+    # Comma-separated addresses
+    recipients: Any = db.Column(db.Text, nullable=False)
+    body: Any = db.Column(db.Text, nullable=False)
+    html: Any = db.Column(db.Text, nullable=True)
+    status: Any = db.Column(db.String(16), default=STATUS_PENDING, nullable=False)
+    attempts: Any = db.Column(db.Integer, default=0, nullable=False)
+    next_attempt_at: Any = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+    last_error: Any = db.Column(db.Text, nullable=True)
+    created_at: Any = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+    sent_at: Any = db.Column(db.DateTime, nullable=True)
+
+    @property
+    def recipient_list(self) -> List[str]:
+        return [address for address in self.recipients.split(',') if address]
+
+    def __repr__(self) -> str:
+        return f'<OutboundEmail {self.id} to={self.recipients} status={self.status}>'
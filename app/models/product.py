@@ -1,17 +1,45 @@
 from app.models.db import db
 from typing import Any
-from sqlalchemy.types import Numeric 
+from sqlalchemy import event, text
+from sqlalchemy.orm import ORMExecuteState, Session, with_loader_criteria
+from sqlalchemy.types import Numeric
 
 class Product(db.Model):
+    """
+    A catalog item.
+
+    Deleting a product archives it (sets archived_at) so its stock ledger
+    keeps pointing at a real row. Archived products are left out of every
+    ORM query (see _hide_archived_products below) and free their SKU for
+    reuse; pass execution_options(include_archived=True) to see them.
+    """
     __tablename__: str = 'product'
-    
+    __table_args__ = (
+        # Composite index backing keyset pagination on (name, id)
+        db.Index('ix_product_name_id', 'name', 'id'),
+        # SKUs are unique among live products only
+        db.Index('ix_product_sku', 'sku', unique=True,
+                 postgresql_where=text('archived_at IS NULL'), sqlite_where=text('archived_at IS NULL')),
+    )
+
     id: Any = db.Column(db.Integer, primary_key=True)
     name: Any = db.Column(db.String(100), nullable=False, index=True)
-    sku: Any = db.Column(db.String(50), unique=True, nullable=False, index=True)
+    sku: Any = db.Column(db.String(50), nullable=False)
     description: Any = db.Column(db.Text)
     price: Any = db.Column(Numeric(precision=10, scale=2), nullable=False)
     stock_level: Any = db.Column(db.Integer, default=0, nullable=False)
     low_stock_threshold: Any = db.Column(db.Integer, default=10, nullable=False)
-    
+    archived_at: Any = db.Column(db.DateTime, nullable=True)
+
     def __repr__(self) -> str:
         return f'<Product {self.name}>'
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _hide_archived_products(state: ORMExecuteState) -> None:
+    if state.is_column_load or state.is_relationship_load or state.execution_options.get('include_archived'):
+        return
+    if state.is_select or state.is_update or state.is_delete:
+        state.statement = state.statement.options(
+            with_loader_criteria(Product, Product.archived_at.is_(None), include_aliases=True)
+        )
@@ -0,0 +1,54 @@
+from sqlalchemy import DDL, event
+
+from .product import Product
+
+# Full-text index over product name, SKU and description.
+#
+# PostgreSQL: a GIN index on a weighted tsvector expression. Queries must use
+# SEARCH_VECTOR_SQL verbatim so the planner matches them to the index.
+# SQLite: an external-content FTS5 table kept in sync by triggers, so every
+# write path (ORM, bulk executemany, upserts) updates it. Stock-only updates
+# do not touch the index.
+#
+# migrations/versions/f3b8d1e6a720_add_product_search_index.py creates the
+# same objects on existing databases; keep the two in step.
+
+SEARCH_VECTOR_SQL = (
+    "(setweight(to_tsvector('simple', coalesce(product.name, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(product.sku, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(product.description, '')), 'B'))"
+)
+
+FTS_TABLE = 'product_fts'
+
+POSTGRESQL_DDL = (
+    f"CREATE INDEX IF NOT EXISTS ix_product_search ON product USING gin ({SEARCH_VECTOR_SQL})",
+)
+
+SQLITE_DDL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    "name, sku, description, content='product', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    f"CREATE TRIGGER IF NOT EXISTS product_fts_ai AFTER INSERT ON product BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, name, sku, description) "
+    "VALUES (new.id, new.name, new.sku, new.description); END",
+    f"CREATE TRIGGER IF NOT EXISTS product_fts_ad AFTER DELETE ON product BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, sku, description) "
+    "VALUES ('delete', old.id, old.name, old.sku, old.description); END",
+    f"CREATE TRIGGER IF NOT EXISTS product_fts_au AFTER UPDATE OF name, sku, description ON product BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, sku, description) "
+    "VALUES ('delete', old.id, old.name, old.sku, old.description); "
+    f"INSERT INTO {FTS_TABLE}(rowid, name, sku, description) "
+    "VALUES (new.id, new.name, new.sku, new.description); END",
+    # Picks up rows left over from an earlier product table in the same file
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+)
+
+SQLITE_DROP_DDL = (f"DROP TABLE IF EXISTS {FTS_TABLE}",)
+
+for _statement in POSTGRESQL_DDL:
+    event.listen(Product.__table__, 'after_create', DDL(_statement).execute_if(dialect='postgresql'))
+for _statement in SQLITE_DDL:
+    event.listen(Product.__table__, 'after_create', DDL(_statement).execute_if(dialect='sqlite'))
+for _statement in SQLITE_DROP_DDL:
+    event.listen(Product.__table__, 'after_drop', DDL(_statement).execute_if(dialect='sqlite'))
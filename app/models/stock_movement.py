@@ -0,0 +1,51 @@
+from app.models.db import db
+from typing import Any
+from datetime import datetime, timezone
+
+
+class StockMovement(db.Model):
+    """Append-only ledger of stock changes. Rows are never updated or deleted, so products are archived, not deleted."""
+    __tablename__: str = 'stock_movement'
+    __table_args__ = (
+        # Replaying movements since a snapshot scans (product_id, id)
+        db.Index('ix_stock_movement_product_id_id', 'product_id', 'id'),
+    )
+
+    REASON_INITIAL = 'initial'
+    REASON_STOCK_IN = 'stock_in'
+    REASON_STOCK_OUT = 'stock_out'
+    REASON_ADJUSTMENT = 'adjustment'
+    REASON_CORRECTION = 'correction'
+
+    id: Any = db.Column(db.Integer, primary_key=True)
+    product_id: Any = db.Column(db.Integer, db.ForeignKey('product.id', ondelete='RESTRICT'), nullable=False)
+    delta: Any = db.Column(db.Integer, nullable=False)
+    reason: Any = db.Column(db.String(32), nullable=False)
+    user_id: Any = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='SET NULL'), nullable=True)
+    created_at: Any = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False, index=True)
+
+    def __repr__(self) -> str:
+        return f'<StockMovement product={self.product_id} delta={self.delta} reason={self.reason}>'
+
+
+class StockSnapshot(db.Model):
+    """
+    Periodic per-product stock level checkpoint.
+
+    stock_level is the on-hand quantity after applying every movement up to
+    and including last_movement_id, so point-in-time queries only replay
+    movements newer than that.
+    """
+    __tablename__: str = 'stock_snapshot'
+    __table_args__ = (
+        db.Index('ix_stock_snapshot_product_id_taken_at', 'product_id', 'taken_at'),
+    )
+
+    id: Any = db.Column(db.Integer, primary_key=True)
+    product_id: Any = db.Column(db.Integer, db.ForeignKey('product.id', ondelete='RESTRICT'), nullable=False)
+    stock_level: Any = db.Column(db.Integer, nullable=False)
+    last_movement_id: Any = db.Column(db.Integer, default=0, nullable=False)
+    taken_at: Any = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+
+    def __repr__(self) -> str:
+        return f'<StockSnapshot product={self.product_id} level={self.stock_level} at={self.taken_at}>'
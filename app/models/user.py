@@ -1,10 +1,13 @@
 from .db import db
-from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import UserMixin
 from datetime import datetime, timezone
 from typing import Optional
 from .role import Role, user_roles
+from .permission import Permission, role_permissions
+from app.utils.permission_cache import permission_cache, ResolvedPermissions
+from app.password_hasher import hash_password, verify_password, password_needs_rehash
 from flask import current_app
+from sqlalchemy import select
 from itsdangerous import URLSafeTimedSerializer as Serializer 
 
 
@@ -13,7 +16,7 @@ class User(db.Model, UserMixin):
     id: int = db.Column(db.Integer, primary_key=True)
     username: str = db.Column(db.String(64), unique=True, nullable=False, index=True)
     email: str = db.Column(db.String(120), unique=True, nullable=False, index=True)
-    password_hash: Optional[str] = db.Column(db.String(128))
+    password_hash: Optional[str] = db.Column(db.String(256))
     first_name: Optional[str] = db.Column(db.String(64))
     last_name: Optional[str] = db.Column(db.String(64))
     is_active: bool = db.Column(db.Boolean, default=True)
@@ -32,12 +35,20 @@ class User(db.Model, UserMixin):
         return f'<User {self.username}>'
 
     def set_password(self, password: str) -> None:
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
 
-    def check_password(self, password: str) -> bool:
+    def check_password(self, password: str, rehash: bool = False) -> bool:
+        """
+        Verify a password. With `rehash`, a correct password stored with an
+        outdated method or cost is re-hashed (the caller commits).
+        """
         if not self.password_hash:
             return False
-        return check_password_hash(self.password_hash, password)
+        if not verify_password(self.password_hash, password):
+            return False
+        if rehash and password_needs_rehash(self.password_hash):
+            self.set_password(password)
+        return True
 
     @property
     def full_name(self) -> str:
@@ -48,9 +59,29 @@ class User(db.Model, UserMixin):
         else:
             return self.username
 
+    def _load_permissions(self) -> ResolvedPermissions:
+        """Load the user's role and permission names with a single join query."""
+        rows = db.session.execute(
+            select(Role.name, Permission.name)
+            .select_from(user_roles)
+            .join(Role, Role.id == user_roles.c.role_id)
+            .outerjoin(role_permissions, role_permissions.c.role_id == Role.id)
+            .outerjoin(Permission, Permission.id == role_permissions.c.permission_id)
+            .where(user_roles.c.user_id == self.id)
+        ).all()
+        return ResolvedPermissions(
+            roles=frozenset(role for role, _ in rows),
+            permissions=frozenset(permission for _, permission in rows if permission is not None)
+        )
+
+    @property
+    def resolved_permissions(self) -> ResolvedPermissions:
+        """The user's role and permission names, cached per request (and optionally per process)."""
+        return permission_cache.resolve(self.id, self._load_permissions)
+
     def has_role(self, role_name: str) -> bool:
         """Check if a user has a specific role."""
-        return self.roles.filter(Role.name == role_name).count() > 0
+        return role_name in self.resolved_permissions.roles
 
     @property
     def is_admin(self) -> bool:
@@ -59,14 +90,8 @@ class User(db.Model, UserMixin):
 
     def has_permission(self, permission_name: str) -> bool:
         """Check if the user has a specific permission through any of their roles."""
-        if self.has_role('Admin'):
-            return True
-
-        for role in self.roles:
-            if role.has_permission(permission_name):
-                return True
-
-        return False
+        resolved = self.resolved_permissions
+        return 'Admin' in resolved.roles or permission_name in resolved.permissions
 
     # --- Password Reset Token Methods ---
     def get_reset_password_token(self, expires_sec: int = 1800) -> Optional[str]:
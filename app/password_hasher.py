@@ -0,0 +1,164 @@
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional
+
+from flask import Flask, current_app, has_app_context
+from werkzeug.exceptions import ServiceUnavailable
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from app.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+metrics.describe('password_hash_queue_depth', 'gauge', 'Password hash/verify jobs running or waiting in this process.')
+metrics.describe('password_hash_operations_total', 'counter', 'Password hashing operations by kind and result.')
+metrics.describe('password_hash_pool_restarts_total', 'counter', 'Hashing pools replaced after a worker process died.')
+metrics.describe('password_hash_duration_seconds', 'histogram', 'Time from submitting a password job to its result.')
+
+# Parts of a fully specified werkzeug method string, e.g. 'pbkdf2:sha256:600000'
+FULL_METHOD_PARTS = {'pbkdf2': 3, 'scrypt': 4}
+
+
+class PasswordHashingBusy(ServiceUnavailable):
+    """Raised when the hashing queue is full; a 503 with Retry-After."""
+    description = 'The server is busy signing people in. Please try again in a moment.'
+
+
+class PasswordHasher:
+    """
+    Runs password hashing and verification in a bounded process pool.
+
+    Key stretching is CPU-bound and holds the GIL, so inline it stalls every
+    other request on the worker. Here it runs in PASSWORD_HASH_WORKERS
+    processes (0: inline) with at most PASSWORD_HASH_MAX_PENDING jobs
+    queued or running per web process. A caller that cannot get a slot
+    within PASSWORD_HASH_QUEUE_TIMEOUT seconds gets PasswordHashingBusy.
+    If a pool process dies (e.g. OOM-killed), the pool is replaced and the
+    job retried once.
+
+    New hashes use PASSWORD_HASH_METHOD (a werkzeug method string such as
+    'pbkdf2:sha256:600000'); needs_rehash() tells the login path when a
+    stored hash was made with other parameters.
+    """
+
+    def __init__(self, app: Optional[Flask] = None) -> None:
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._slots: Optional[threading.BoundedSemaphore] = None
+        self._depth = 0
+        self._prefix: Optional[str] = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask) -> None:
+        self.method = app.config.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000')
+        self.workers = app.config.get('PASSWORD_HASH_WORKERS', 2)
+        self.max_pending = app.config.get('PASSWORD_HASH_MAX_PENDING', 32)
+        self.queue_timeout = app.config.get('PASSWORD_HASH_QUEUE_TIMEOUT', 5.0)
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        app.extensions['password_hasher'] = self
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn: forking a threaded web worker can copy held locks into the child
+                self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+            return self._executor
+
+    def _discard(self, executor: ProcessPoolExecutor) -> None:
+        """Drop a broken pool so the next job starts a new one; other threads may have replaced it already."""
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _submit(self, func: Callable[..., Any], *args: Any) -> Any:
+        executor = self._pool()
+        try:
+            return executor.submit(func, *args).result()
+        except BrokenProcessPool as e:
+            logger.error(f"Password hashing pool broke ({e}); starting a new one and retrying.")
+            metrics.inc('password_hash_pool_restarts_total')
+            self._discard(executor)
+            return self._pool().submit(func, *args).result()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, kind: str, func: Callable[..., Any], *args: Any) -> Any:
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            metrics.inc('password_hash_operations_total', {'kind': kind, 'result': 'rejected'})
+            logger.warning(f"Password hashing queue full ({self.max_pending} jobs); rejecting a {kind} request.")
+            raise PasswordHashingBusy(retry_after=max(1, int(self.queue_timeout)))
+        self._set_depth(1)
+        started = time.perf_counter()
+        try:
+            if self.workers > 0:
+                result = self._submit(func, *args)
+            else:
+                result = func(*args)
+        finally:
+            self._set_depth(-1)
+            self._slots.release()
+        metrics.observe('password_hash_duration_seconds', time.perf_counter() - started, {'kind': kind})
+        metrics.inc('password_hash_operations_total', {'kind': kind, 'result': 'ok'})
+        return result
+
+    def _set_depth(self, change: int) -> None:
+        with self._lock:
+            self._depth += change
+            depth = self._depth
+        metrics.set('password_hash_queue_depth', depth)
+
+    @property
+    def queue_depth(self) -> int:
+        return self._depth
+
+    def hash(self, password: str) -> str:
+        return self._run('hash', generate_password_hash, password, self.method)
+
+    def verify(self, pwhash: str, password: str) -> bool:
+        return self._run('verify', check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash: str) -> bool:
+        """True if `pwhash` was not made with the configured method and cost."""
+        if self._prefix is None:
+            parts = self.method.split(':')
+            if len(parts) >= FULL_METHOD_PARTS.get(parts[0], 1):
+                self._prefix = self.method
+            else:
+                # Partial method ('pbkdf2', 'scrypt'): hash once to learn werkzeug's default cost
+                self._prefix = self.hash('').split('$', 1)[0]
+        return pwhash.split('$', 1)[0] != self._prefix
+
+
+def get_password_hasher() -> Optional[PasswordHasher]:
+    """Return the current app's PasswordHasher, if one is installed."""
+    if not has_app_context():
+        return None
+    return current_app.extensions.get('password_hasher')
+
+
+def hash_password(password: str) -> str:
+    """Hash a password with the configured method, in the pool when there is one."""
+    hasher = get_password_hasher()
+    return hasher.hash(password) if hasher is not None else generate_password_hash(password)
+
+
+def verify_password(pwhash: str, password: str) -> bool:
+    """Check a password against a stored hash, in the pool when there is one."""
+    hasher = get_password_hasher()
+    return hasher.verify(pwhash, password) if hasher is not None else check_password_hash(pwhash, password)
+
+
+def password_needs_rehash(pwhash: str) -> bool:
+    """True if a stored hash should be replaced on the next successful login."""
+    hasher = get_password_hasher()
+    return hasher.needs_rehash(pwhash) if hasher is not None else False
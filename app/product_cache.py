@@ -0,0 +1,272 @@
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+from flask import Flask, current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from app.metrics import metrics
+from app.models import db, Product
+from app.utils.export import _json_default
+
+logger = logging.getLogger(__name__)
+
+metrics.describe('product_cache_requests_total', 'counter', 'Product cache lookups by tier and result.')
+
+PRODUCT_COLUMNS = tuple(c.key for c in Product.__table__.columns)
+
+
+class RedisProductStore:
+    """
+    Shared tier on any client with Redis-style mget()/setex()/incr()/eval(), e.g. redis.Redis.
+
+    Next to each cached row is a version counter that every invalidation
+    increments. get() returns the version along with the row, and set()
+    only writes if it is unchanged, so a worker that read the database
+    before another worker's write cannot put the old row back afterwards.
+    """
+
+    # Write the row only if the version is still the one read before the database query.
+    # KEYS: row, version. ARGV: expected version, ttl, payload. Returns 1 if written.
+    SET_IF_VERSION = """
+    if (redis.call('GET', KEYS[2]) or '0') ~= ARGV[1] then
+        return 0
+    end
+    redis.call('SETEX', KEYS[1], ARGV[2], ARGV[3])
+    return 1
+    """
+
+    def __init__(self, client: Any, prefix: str = 'product:', version_ttl: int = 86400) -> None:
+        self.client = client
+        self.prefix = prefix
+        # An expired counter reads as '0', which only makes in-flight writes fail, so any TTL is safe
+        self.version_ttl = version_ttl
+
+    def get(self, product_id: int) -> Tuple[Optional[Dict[str, Any]], str]:
+        """Return the cached row (or None) and the product's current version."""
+        raw, version = self.client.mget(f'{self.prefix}{product_id}', f'{self.prefix}{product_id}:version')
+        version = version.decode() if isinstance(version, bytes) else str(version or '0')
+        if raw is None:
+            return None, version
+        data = json.loads(raw)
+        data['price'] = Decimal(data['price']) if data.get('price') is not None else None
+        return data, version
+
+    def set(self, product_id: int, data: Dict[str, Any], ttl: int, version: Optional[str] = None) -> None:
+        """Cache a row; with `version` (from get()), only if no invalidation happened since."""
+        key = f'{self.prefix}{product_id}'
+        payload = json.dumps(data, default=_json_default)
+        if version is None:
+            self.client.setex(key, ttl, payload)
+        else:
+            self.client.eval(self.SET_IF_VERSION, 2, key, f'{key}:version', version, ttl, payload)
+
+    def delete(self, product_id: int) -> None:
+        key = f'{self.prefix}{product_id}'
+        # Bump the version first, so a write racing with the delete fails
+        self.client.incr(f'{key}:version')
+        self.client.expire(f'{key}:version', self.version_ttl)
+        self.client.delete(key)
+
+
+class ProductCache:
+    """
+    Read-through cache of product rows for ProductService.get_product_by_id.
+
+    Two tiers: an in-process LRU whose entries live PRODUCT_CACHE_TTL
+    seconds (0 disables it), and an optional shared tier (PRODUCT_CACHE_BACKEND,
+    e.g. Redis) that all workers read and invalidate. Rows are cached as
+    plain column dicts and turned back into session-attached Products
+    without a query.
+
+    Every write invalidates the product in both tiers: ORM changes are
+    picked up from session flushes, Core UPDATEs (stock deltas, bulk
+    upserts) call mark_products_changed(). Invalidation happens at flush
+    and again at commit, so no request re-caches the old row in between.
+    Other workers' local tiers catch up within the TTL. Shared-tier writes
+    are conditional on the product's version in the store, so a row read
+    before another worker's invalidation is not cached there.
+    """
+
+    def __init__(self, app: Optional[Flask] = None, shared: Any = None) -> None:
+        self.shared = shared
+        self.ttl = 0
+        self.shared_ttl = 0
+        self.max_entries = 0
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[int, tuple]' = OrderedDict()
+        # Bumped by every invalidation so a load that raced with one is not cached
+        self._generation = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask) -> None:
+        self.ttl = app.config.get('PRODUCT_CACHE_TTL', 10)
+        self.max_entries = app.config.get('PRODUCT_CACHE_MAX_ENTRIES', 10000)
+        self.shared_ttl = app.config.get('PRODUCT_CACHE_SHARED_TTL', 300)
+        if self.shared is None:
+            self.shared = self._shared_from_config(app)
+        app.extensions['product_cache'] = self
+
+    @staticmethod
+    def _shared_from_config(app: Flask) -> Any:
+        if app.config.get('PRODUCT_CACHE_BACKEND', 'null') != 'redis':
+            return None
+        try:
+            import redis
+            return RedisProductStore(redis.Redis.from_url(app.config['PRODUCT_CACHE_REDIS_URL']))
+        except (ImportError, KeyError) as e:
+            app.logger.warning(f"Redis product cache unavailable ({e}); using the in-process tier only.")
+            return None
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 or self.shared is not None
+
+    def get(self, product_id: int) -> Optional[Dict[str, Any]]:
+        """Return the cached row of a product, trying the local tier and then the shared one."""
+        return self._lookup(product_id)[0]
+
+    def _lookup(self, product_id: int) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """get(), plus the shared-tier version to hand to put() after a database read (None if unknown)."""
+        if self.ttl > 0:
+            with self._lock:
+                entry = self._entries.get(product_id)
+                if entry is not None and entry[0] > time.monotonic():
+                    self._entries.move_to_end(product_id)
+                    metrics.inc('product_cache_requests_total', {'tier': 'local', 'result': 'hit'})
+                    return dict(entry[1]), None
+                self._entries.pop(product_id, None)
+            metrics.inc('product_cache_requests_total', {'tier': 'local', 'result': 'miss'})
+
+        if self.shared is not None:
+            generation = self._generation
+            try:
+                data, version = self.shared.get(product_id)
+            except Exception as e:
+                logger.warning(f"Shared product cache read failed: {e}")
+                data, version = None, None
+            metrics.inc('product_cache_requests_total',
+                        {'tier': 'shared', 'result': 'hit' if data is not None else 'miss'})
+            if data is not None:
+                self._put_local(product_id, data, generation)
+                return data, version
+            return None, version
+        return None, None
+
+    def put(self, product_id: int, data: Dict[str, Any], generation: Optional[int] = None,
+            version: Optional[str] = None) -> None:
+        """
+        Cache a row in both tiers, unless an invalidation happened since `generation` was read.
+
+        `version` is the shared-tier version from before the row was read;
+        the shared write is skipped if another worker invalidated it since.
+        """
+        if generation is not None and generation != self._generation:
+            return
+        self._put_local(product_id, data, generation)
+        if self.shared is not None:
+            try:
+                self.shared.set(product_id, data, self.shared_ttl, version)
+            except Exception as e:
+                logger.warning(f"Shared product cache write failed: {e}")
+
+    def _put_local(self, product_id: int, data: Dict[str, Any], generation: Optional[int]) -> None:
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._entries[product_id] = (time.monotonic() + self.ttl, dict(data))
+            self._entries.move_to_end(product_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, product_ids: Iterable[int]) -> None:
+        product_ids = list(product_ids)
+        with self._lock:
+            self._generation += 1
+            for product_id in product_ids:
+                self._entries.pop(product_id, None)
+        if self.shared is not None:
+            for product_id in product_ids:
+                try:
+                    self.shared.delete(product_id)
+                except Exception as e:
+                    logger.warning(f"Shared product cache invalidation failed: {e}")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def load(self, product_id: int) -> Optional[Product]:
+        """Return the product attached to the current session, from the cache when possible."""
+        loaded = db.session.identity_map.get(db.session.identity_key(Product, product_id))
+        if loaded is not None:
+            # Still in the session after ProductService.delete_product archived it
+            return loaded if loaded.archived_at is None else None
+        if not self.enabled:
+            return db.session.get(Product, product_id)
+
+        data, version = self._lookup(product_id)
+        if data is not None:
+            product = Product(**data)
+            make_transient_to_detached(product)
+            return db.session.merge(product, load=False)
+
+        generation = self._generation
+        product = db.session.get(Product, product_id)
+        if product is not None:
+            self.put(product_id, {column: getattr(product, column) for column in PRODUCT_COLUMNS},
+                     generation, version)
+        return product
+
+
+def get_product_cache() -> Optional[ProductCache]:
+    """Return the current app's ProductCache, if one is installed."""
+    if not has_app_context():
+        return None
+    return current_app.extensions.get('product_cache')
+
+
+def mark_products_changed(product_ids: Iterable[int], session: Optional[Session] = None) -> None:
+    """
+    Invalidate products written outside the ORM unit of work (Core UPDATEs).
+
+    Drops them now and again when the session commits.
+    """
+    product_ids = set(product_ids)
+    if not product_ids:
+        return
+    session = session if session is not None else db.session()
+    session.info.setdefault('changed_product_ids', set()).update(product_ids)
+    cache = get_product_cache()
+    if cache is not None:
+        cache.invalidate(product_ids)
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_changed_products(session: Session, flush_context: Any) -> None:
+    changed: Set[int] = {obj.id for obj in list(session.dirty) + list(session.deleted)
+                         if isinstance(obj, Product) and obj.id is not None}
+    if changed:
+        mark_products_changed(changed, session)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_changed_products(session: Session) -> None:
+    changed = session.info.pop('changed_product_ids', None)
+    cache = get_product_cache()
+    if changed and cache is not None:
+        cache.invalidate(changed)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_changed_products(session: Session) -> None:
+    session.info.pop('changed_product_ids', None)
@@ -0,0 +1,311 @@
+import logging
+import re
+import threading
+import time
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from flask import Flask, current_app, has_app_context
+from sqlalchemy import column, func, literal_column, or_, select, table
+
+from app.models import db, Product
+from app.models.product_search import FTS_TABLE, SEARCH_VECTOR_SQL
+
+logger = logging.getLogger(__name__)
+
+# Keys are cut to this many characters; longer prefixes match on the cut key
+KEY_MAX_LENGTH = 32
+# Separates the key from the product id inside an index entry; sorts before any text
+ENTRY_SEPARATOR = '\x00'
+
+# Most rows the database fallback reads for one lookup before applying the index's order
+FALLBACK_CANDIDATES = 1000
+# Words as the full-text index splits them (see ProductService.search)
+TERM_RE = re.compile(r'[^\W_]+')
+
+LookupResult = Tuple[int, str, str]
+
+
+def normalize_key(text: Optional[str]) -> str:
+    """Casefold and collapse whitespace, as both keys and prefixes are matched."""
+    return ' '.join((text or '').casefold().split())
+
+
+class PrefixIndex:
+    """
+    Compact prefix index over product SKUs and names.
+
+    Rather than a node-per-character trie (hundreds of bytes per node in
+    Python), keys are kept in one sorted list of "key\\0id" strings: a
+    lookup bisects to the first key at or after the prefix and walks
+    forward while keys still start with it, which is the same traversal a
+    trie does. Each product is indexed under its SKU and under the start of
+    every word of its name, so "wid" finds "Blue Widget".
+    """
+
+    def __init__(self) -> None:
+        self._entries: List[str] = []
+        self._records: Dict[int, Tuple[str, str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    @staticmethod
+    def keys_for(sku: str, name: str) -> Set[str]:
+        keys = {normalize_key(sku)[:KEY_MAX_LENGTH]}
+        words = normalize_key(name).split(' ')
+        for i in range(len(words)):
+            keys.add(' '.join(words[i:])[:KEY_MAX_LENGTH])
+        keys.discard('')
+        return keys
+
+    @classmethod
+    def build(cls, rows: Iterable[LookupResult], max_products: Optional[int] = None) -> Optional['PrefixIndex']:
+        """
+        Build an index from (id, sku, name) rows with one sort.
+
+        Returns:
+            The index, or None if there are more than `max_products` rows.
+        """
+        index = cls()
+        for product_id, sku, name in rows:
+            if max_products is not None and len(index._records) >= max_products:
+                return None
+            index._records[product_id] = (sku, name)
+            index._entries.extend(f'{key}{ENTRY_SEPARATOR}{product_id}' for key in cls.keys_for(sku, name))
+        index._entries.sort()
+        return index
+
+    def upsert(self, product_id: int, sku: str, name: str) -> None:
+        self.remove(product_id)
+        self._records[product_id] = (sku, name)
+        for key in self.keys_for(sku, name):
+            insort(self._entries, f'{key}{ENTRY_SEPARATOR}{product_id}')
+
+    def remove(self, product_id: int) -> None:
+        record = self._records.pop(product_id, None)
+        if record is None:
+            return
+        for key in self.keys_for(*record):
+            entry = f'{key}{ENTRY_SEPARATOR}{product_id}'
+            i = bisect_left(self._entries, entry)
+            if i < len(self._entries) and self._entries[i] == entry:
+                del self._entries[i]
+
+    def lookup(self, prefix: str, limit: int) -> List[LookupResult]:
+        """Return up to `limit` (id, sku, name) matches, in key order."""
+        prefix = normalize_key(prefix)[:KEY_MAX_LENGTH]
+        if not prefix:
+            return []
+        results: List[LookupResult] = []
+        seen: Set[int] = set()
+        for i in range(bisect_left(self._entries, prefix), len(self._entries)):
+            entry = self._entries[i]
+            if not entry.startswith(prefix):
+                break
+            product_id = int(entry.rsplit(ENTRY_SEPARATOR, 1)[1])
+            if product_id in seen:
+                continue
+            seen.add(product_id)
+            record = self._records.get(product_id)
+            if record is None:
+                continue
+            results.append((product_id, *record))
+            if len(results) >= limit:
+                break
+        return results
+
+
+class ProductLookup:
+    """
+    Per-process typeahead index behind /products/lookup.
+
+    ProductService keeps the index current for writes made in this process
+    (see index_product / unindex_product / invalidate_product_lookup). Other
+    workers' writes show up when the index is rebuilt, every
+    PRODUCT_LOOKUP_REFRESH_SECONDS. Rebuilds run in a background thread
+    (PRODUCT_LOOKUP_BACKGROUND) while the old index keeps serving; the first
+    build starts with the process's first request. Until an index is ready,
+    or if the catalog has more than PRODUCT_LOOKUP_MAX_PRODUCTS products,
+    lookups fall back to a query on the full-text search index with the
+    same matching rule (see _query).
+
+    Lookups walk the index under the same lock as upsert() and remove(), so
+    a concurrent write cannot shift entries under them.
+    """
+
+    def __init__(self, app: Optional[Flask] = None) -> None:
+        self._lock = threading.Lock()
+        self._index: Optional[PrefixIndex] = None
+        self._built_at = 0.0
+        self._stale = False
+        self._building = False
+        # Hook updates made while a rebuild runs, replayed onto the new index
+        self._pending: Optional[List[Tuple[int, Optional[Tuple[str, str]]]]] = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask) -> None:
+        self.app = app
+        self.max_products = app.config.get('PRODUCT_LOOKUP_MAX_PRODUCTS', 250000)
+        self.refresh_seconds = app.config.get('PRODUCT_LOOKUP_REFRESH_SECONDS', 300)
+        self.background = app.config.get('PRODUCT_LOOKUP_BACKGROUND', True)
+        app.extensions['product_lookup'] = self
+        if self.background:
+            app.before_request(self._warm)
+
+    @property
+    def size(self) -> Optional[int]:
+        """Products in the current index, or None if there is none."""
+        index = self._index
+        return len(index) if index is not None else None
+
+    def _warm(self) -> None:
+        if not self._built_at:
+            self.rebuild(background=True)
+
+    def lookup(self, prefix: str, limit: int = 10) -> List[LookupResult]:
+        """Return up to `limit` (id, sku, name) products whose SKU or a name word starts with `prefix`."""
+        if not self._built_at or self._stale or (
+                self.refresh_seconds and time.monotonic() - self._built_at >= self.refresh_seconds):
+            self.rebuild(background=self.background)
+        with self._lock:
+            if self._index is not None:
+                return self._index.lookup(prefix, limit)
+        return self._query(prefix, limit)
+
+    @staticmethod
+    def _query(prefix: str, limit: int) -> List[LookupResult]:
+        """
+        Answer a lookup from the database with the index's rule: a casefolded
+        prefix of the SKU or of any word of the name.
+
+        The full-text search index (app/models/product_search.py) narrows
+        the candidates to products with a word starting with each word of
+        the prefix, then a throwaway PrefixIndex over them applies the
+        exact rule and order, so both paths agree. Only when a prefix
+        matches more than FALLBACK_CANDIDATES rows can the results differ.
+        Databases without that index, and prefixes without a word
+        character, use a lower() LIKE scan instead.
+        """
+        key = normalize_key(prefix)[:KEY_MAX_LENGTH]
+        if not key:
+            return []
+        terms = TERM_RE.findall(key)
+        stmt = select(Product.id, Product.sku, Product.name)
+        dialect = db.engine.dialect.name
+        if terms and dialect == 'postgresql':
+            stmt = (stmt.where(literal_column(SEARCH_VECTOR_SQL).op('@@')(
+                        func.to_tsquery('simple', ' & '.join(f"{t}:*" for t in terms))))
+                    .order_by(Product.id))
+        elif terms and dialect == 'sqlite':
+            fts = table(FTS_TABLE, column('rowid'))
+            match = '{name sku} : ' + ' '.join(f'"{t}"*' for t in terms)
+            stmt = (stmt.join(fts, fts.c.rowid == Product.id)
+                    .where(literal_column(FTS_TABLE).op('MATCH')(match))
+                    .order_by(Product.id))
+        else:
+            # Loose on whitespace (stored names may hold runs of it); the PrefixIndex pass is exact
+            pattern = key.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_').replace(' ', '%')
+            sku, name = func.lower(Product.sku), func.lower(Product.name)
+            stmt = (stmt.where(or_(sku.like(f'{pattern}%', escape='\\'),
+                                   name.like(f'{pattern}%', escape='\\'),
+                                   name.like(f'% {pattern}%', escape='\\')))
+                    .order_by(sku, Product.id))
+        rows = db.session.execute(stmt.limit(max(limit, FALLBACK_CANDIDATES)))
+        return PrefixIndex.build(tuple(row) for row in rows).lookup(key, limit)
+
+    def rebuild(self, background: bool = False) -> None:
+        """Rebuild the index from the product table, in a thread if `background`."""
+        with self._lock:
+            if self._building:
+                return
+            self._building = True
+            self._stale = False
+            self._pending = []
+        if background:
+            threading.Thread(target=self._rebuild_in_app_context, name='product-lookup-rebuild',
+                             daemon=True).start()
+        else:
+            self._rebuild()
+
+    def _rebuild_in_app_context(self) -> None:
+        with self.app.app_context():
+            self._rebuild()
+
+    def _rebuild(self) -> None:
+        index = None
+        started = time.perf_counter()
+        try:
+            rows = db.session.execute(
+                select(Product.id, Product.sku, Product.name).execution_options(yield_per=10000)
+            )
+            index = PrefixIndex.build(((r.id, r.sku, r.name) for r in rows), self.max_products)
+            rows.close()
+            if index is None:
+                logger.warning(f"Product lookup index disabled: more than {self.max_products} products; "
+                               f"lookups will use the full-text search index.")
+        except Exception as e:
+            db.session.rollback()
+            logger.warning(f"Could not build the product lookup index: {e}")
+        finally:
+            with self._lock:
+                if index is not None:
+                    for product_id, record in self._pending or ():
+                        if record is None:
+                            index.remove(product_id)
+                        else:
+                            index.upsert(product_id, *record)
+                self._index = index
+                self._pending = None
+                self._building = False
+                self._built_at = time.monotonic()
+        if index is not None:
+            logger.info(f"Built product lookup index: {len(index)} products "
+                        f"in {(time.perf_counter() - started) * 1000:.0f}ms")
+
+    def upsert(self, product_id: int, sku: str, name: str) -> None:
+        with self._lock:
+            if self._index is not None:
+                self._index.upsert(product_id, sku, name)
+            if self._pending is not None:
+                self._pending.append((product_id, (sku, name)))
+
+    def remove(self, product_id: int) -> None:
+        with self._lock:
+            if self._index is not None:
+                self._index.remove(product_id)
+            if self._pending is not None:
+                self._pending.append((product_id, None))
+
+    def invalidate(self) -> None:
+        """Rebuild on the next lookup (after bulk writes the hooks do not see row by row)."""
+        self._stale = True
+
+
+def get_product_lookup() -> Optional[ProductLookup]:
+    """Return the current app's ProductLookup, if one is installed."""
+    if not has_app_context():
+        return None
+    return current_app.extensions.get('product_lookup')
+
+
+def index_product(product: Product) -> None:
+    """Add or refresh a committed product in the lookup index (no-op without one)."""
+    lookup = get_product_lookup()
+    if lookup is not None:
+        lookup.upsert(product.id, product.sku, product.name)
+
+
+def unindex_product(product_id: int) -> None:
+    """Drop a deleted product from the lookup index (no-op without one)."""
+    lookup = get_product_lookup()
+    if lookup is not None:
+        lookup.remove(product_id)
+
+
+def invalidate_product_lookup() -> None:
+    """Schedule a full rebuild of the lookup index (no-op without one)."""
+    lookup = get_product_lookup()
+    if lookup is not None:
+        lookup.invalidate()
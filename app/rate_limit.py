@@ -0,0 +1,219 @@
+import logging
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from flask import Flask, current_app, has_app_context, request
+from werkzeug.exceptions import TooManyRequests
+
+from app.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+metrics.describe('rate_limit_rejections_total', 'counter', 'Requests rejected by rate limiting, by endpoint and key.')
+
+LIMIT_RE = re.compile(r'^\s*(\d+)\s*/\s*(\d*)\s*(second|minute|hour|day)s?\s*$')
+PERIOD_SECONDS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+# (key, capacity, refill tokens per second)
+Bucket = Tuple[str, int, float]
+
+
+def parse_limit(limit: str) -> Tuple[int, float]:
+    """
+    Parse '10/minute' (or '100/5 minutes') into a bucket (capacity, refill tokens per second).
+
+    Raises:
+        ValueError: If the limit is not in that form.
+    """
+    match = LIMIT_RE.match(limit)
+    if not match or int(match.group(1)) < 1:
+        raise ValueError(f"Invalid rate limit {limit!r}; expected e.g. '10/minute' or '100/5 minutes'.")
+    count, multiplier, period = int(match.group(1)), int(match.group(2) or 1), match.group(3)
+    return count, count / (multiplier * PERIOD_SECONDS[period])
+
+
+class MemoryBucketStore:
+    """Per-process token buckets, least recently used evicted beyond max_keys."""
+
+    def __init__(self, max_keys: int = 100000) -> None:
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._buckets: 'OrderedDict[str, Tuple[float, float]]' = OrderedDict()
+
+    def take(self, key: str, capacity: int, rate: float) -> Tuple[bool, float]:
+        """Take one token. Returns (allowed, seconds until a token is available)."""
+        rejected, retry_after = self.take_all([(key, capacity, rate)])
+        return rejected is None, retry_after
+
+    def take_all(self, buckets: Sequence[Bucket]) -> Tuple[Optional[int], float]:
+        """
+        Take one token from every (key, capacity, rate) bucket, or from none.
+
+        Returns:
+            (None, 0.0) if all buckets had a token, else the position of the
+            first empty bucket and the seconds until every empty one refills.
+        """
+        now = time.monotonic()
+        with self._lock:
+            levels = []
+            for key, capacity, rate in buckets:
+                tokens, updated = self._buckets.get(key, (capacity, now))
+                levels.append(min(capacity, tokens + (now - updated) * rate))
+            empty = [i for i, tokens in enumerate(levels) if tokens < 1]
+            for i, (key, _, _) in enumerate(buckets):
+                self._buckets[key] = (levels[i] if empty else levels[i] - 1, now)
+                self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        if not empty:
+            return None, 0.0
+        return empty[0], max((1 - levels[i]) / buckets[i][2] for i in empty)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+
+class RedisBucketStore:
+    """Token buckets shared by all workers, on any client with Redis-style eval(), e.g. redis.Redis."""
+
+    # Refill every bucket, then take from all of them or none, atomically and on the Redis server's clock.
+    # KEYS are the buckets, ARGV holds a capacity and rate per key. Returns {first empty bucket or 0, wait}.
+    SCRIPT = """
+        local t = redis.call('TIME')
+        local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+        local levels = {}
+        local empty = 0
+        local wait = 0
+        for i, key in ipairs(KEYS) do
+            local capacity = tonumber(ARGV[2 * i - 1])
+            local rate = tonumber(ARGV[2 * i])
+            local state = redis.call('HMGET', key, 'tokens', 'ts')
+            local tokens = tonumber(state[1]) or capacity
+            local ts = tonumber(state[2]) or now
+            tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+            levels[i] = tokens
+            if tokens < 1 then
+                if empty == 0 then
+                    empty = i
+                end
+                wait = math.max(wait, (1 - tokens) / rate)
+            end
+        end
+        for i, key in ipairs(KEYS) do
+            local capacity = tonumber(ARGV[2 * i - 1])
+            local rate = tonumber(ARGV[2 * i])
+            local tokens = levels[i]
+            if empty == 0 then
+                tokens = tokens - 1
+            end
+            redis.call('HSET', key, 'tokens', tostring(tokens), 'ts', tostring(now))
+            redis.call('EXPIRE', key, math.ceil(capacity / rate) + 1)
+        end
+        return {empty, tostring(wait)}
+    """
+
+    def __init__(self, client: Any, prefix: str = 'ratelimit:') -> None:
+        self.client = client
+        self.prefix = prefix
+
+    def take(self, key: str, capacity: int, rate: float) -> Tuple[bool, float]:
+        rejected, retry_after = self.take_all([(key, capacity, rate)])
+        return rejected is None, retry_after
+
+    def take_all(self, buckets: Sequence[Bucket]) -> Tuple[Optional[int], float]:
+        args: List[Any] = []
+        for _, capacity, rate in buckets:
+            args.extend((capacity, rate))
+        empty, wait = self.client.eval(self.SCRIPT, len(buckets),
+                                       *(f'{self.prefix}{key}' for key, _, _ in buckets), *args)
+        if not int(empty):
+            return None, 0.0
+        return int(empty) - 1, float(wait)
+
+
+class RateLimiter:
+    """
+    Token-bucket rate limiting for selected endpoints.
+
+    RATE_LIMITS maps an endpoint to its buckets, e.g.
+    {'auth.login': {'ip': '30/minute', 'username': '10/minute'}}. 'ip' is the
+    client address; any other name is a form field, so one username (or
+    email) is limited across all addresses. A request takes a token from
+    all of its buckets or, if any is empty, from none. Only POSTs are limited. The
+    check is a before_request hook installed ahead of any that touch the
+    database (see create_app), so a rejected request never reaches the
+    database or the password hasher; it gets a 429 with Retry-After. Buckets live in this process unless RATE_LIMIT_BACKEND is
+    'redis'. Behind a proxy, remote_addr must be the client's address (e.g.
+    werkzeug's ProxyFix) or every client shares the proxy's bucket.
+    """
+
+    def __init__(self, app: Optional[Flask] = None, store: Any = None) -> None:
+        self.store = store
+        self.limits: Dict[str, Dict[str, Tuple[int, float]]] = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask) -> None:
+        self.limits = {
+            endpoint: {key: parse_limit(limit) for key, limit in buckets.items()}
+            for endpoint, buckets in (app.config.get('RATE_LIMITS') or {}).items()
+        }
+        if self.store is None:
+            self.store = self._store_from_config(app)
+        app.extensions['rate_limiter'] = self
+        if app.config.get('RATE_LIMIT_ENABLED', True) and self.limits:
+            app.before_request(self._check)
+
+    @staticmethod
+    def _store_from_config(app: Flask) -> Any:
+        if app.config.get('RATE_LIMIT_BACKEND', 'memory') == 'redis':
+            try:
+                import redis
+                return RedisBucketStore(redis.Redis.from_url(app.config['RATE_LIMIT_REDIS_URL']))
+            except (ImportError, KeyError) as e:
+                app.logger.warning(f"Redis rate limit store unavailable ({e}); using per-process buckets.")
+        return MemoryBucketStore(app.config.get('RATE_LIMIT_MAX_KEYS', 100000))
+
+    def _check(self) -> None:
+        if request.method != 'POST':
+            return
+        limits = self.limits.get(request.endpoint or '')
+        if not limits:
+            return
+        names: List[str] = []
+        buckets: List[Bucket] = []
+        for key, (capacity, rate) in limits.items():
+            if key == 'ip':
+                value = request.remote_addr or 'unknown'
+            else:
+                value = (request.form.get(key) or '').strip().casefold()
+                if not value:
+                    continue
+            names.append(key)
+            buckets.append((f'{request.endpoint}:{key}:{value}', capacity, rate))
+        if not buckets:
+            return
+        try:
+            # All or nothing: a rejected username must not also spend the address's token
+            rejected, retry_after = self.store.take_all(buckets)
+        except Exception as e:
+            # Fail open: an unreachable shared store must not lock everyone out
+            logger.warning(f"Rate limit store failed: {e}")
+            return
+        if rejected is not None:
+            key = names[rejected]
+            metrics.inc('rate_limit_rejections_total', {'endpoint': request.endpoint, 'key': key})
+            logger.warning(f"Rate limited {request.endpoint} by {key} from {request.remote_addr}")
+            raise TooManyRequests(retry_after=max(1, math.ceil(retry_after)))
+
+
+def get_rate_limiter() -> Optional[RateLimiter]:
+    """Return the current app's RateLimiter, if one is installed."""
+    if not has_app_context():
+        return None
+    return current_app.extensions.get('rate_limiter')
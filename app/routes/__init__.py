@@ -1,6 +1,7 @@
 from .main import main_bp
 from .products import products_bp
 from .reports import reports_bp
+from .api_v1 import api_v1_bp
 
-__all__ = ['main_bp', 'products_bp', 'reports_bp']
+__all__ = ['main_bp', 'products_bp', 'reports_bp', 'api_v1_bp']
 
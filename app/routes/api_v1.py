@@ -0,0 +1,150 @@
+from flask import Blueprint, request, url_for, Response, current_app
+from typing import Any, Dict, List, Optional, Tuple
+from app.services.product_service import ProductService, PRODUCT_FIELDS
+from app.utils import serialize_response, parse_request_payload
+
+
+api_v1_bp = Blueprint("api_v1", __name__, url_prefix="/api/v1")
+
+# Fields a client may write; the id is assigned by the database
+WRITABLE_FIELDS = tuple(f for f in PRODUCT_FIELDS if f != 'id')
+
+
+def _error(status: int, message: str, errors: Optional[Dict[str, str]] = None) -> Response:
+    payload: Dict[str, Any] = {"error": message}
+    if errors:
+        payload["errors"] = errors
+    return serialize_response(payload, status=status)
+
+
+def _requested_fields() -> Tuple[Optional[List[str]], Optional[Response]]:
+    """Parse ?fields=a,b into a list of product fields (all of them when absent)."""
+    raw = request.args.get("fields")
+    if not raw:
+        return list(PRODUCT_FIELDS), None
+    fields = list(dict.fromkeys(f.strip() for f in raw.split(",") if f.strip()))
+    unknown = [f for f in fields if f not in PRODUCT_FIELDS]
+    if unknown or not fields:
+        return None, _error(400, f"Unknown field(s): {', '.join(unknown) or raw}. "
+                                 f"Choose from: {', '.join(PRODUCT_FIELDS)}.")
+    return fields, None
+
+
+def _product_body() -> Tuple[Optional[Dict[str, Any]], Optional[Response]]:
+    """Read a product object from the request body, as the strings ProductService validates."""
+    payload, ok = parse_request_payload()
+    if not ok or not isinstance(payload, dict):
+        return None, _error(400, "Expected a JSON (or MessagePack) object.")
+    unknown = [k for k in payload if k not in WRITABLE_FIELDS]
+    if unknown:
+        return None, _error(400, f"Unknown or read-only field(s): {', '.join(map(str, unknown))}.")
+    data: Dict[str, Any] = {}
+    for key, value in payload.items():
+        if isinstance(value, (dict, list)):
+            return None, _error(400, f"Field '{key}' must be a string or a number.")
+        # Numbers go through str() so floats like 5.5 fail integer validation instead of truncating
+        data[key] = value if value is None or isinstance(value, str) else str(value)
+    return data, None
+
+
+def _serialize_product(product: Any, fields: List[str]) -> Dict[str, Any]:
+    return {field: getattr(product, field) for field in fields}
+
+
+@api_v1_bp.route("/products", methods=["GET"])
+def list_products() -> Response:
+    fields, error = _requested_fields()
+    if error:
+        return error
+    page = ProductService.get_product_rows_page(
+        fields,
+        after=request.args.get("after"),
+        before=request.args.get("before"),
+        per_page=request.args.get("per_page", type=int),
+    )
+    return serialize_response({
+        "items": [{field: row._mapping[field] for field in fields} for row in page.items],
+        "per_page": page.per_page,
+        "next_cursor": page.next_cursor,
+        "prev_cursor": page.prev_cursor,
+    })
+
+
+@api_v1_bp.route("/products/batch-get", methods=["POST"])
+def batch_get_products() -> Response:
+    """Resolve up to PRODUCT_BATCH_GET_MAX_ITEMS products from {"skus": [...]} or {"ids": [...]}."""
+    fields, error = _requested_fields()
+    if error:
+        return error
+    payload, ok = parse_request_payload()
+    if not ok or not isinstance(payload, dict) or len({"skus", "ids"} & payload.keys()) != 1:
+        return _error(400, 'Expected an object with either "skus" (strings) or "ids" (integers).')
+
+    key = "skus" if "skus" in payload else "ids"
+    values = payload[key]
+    expected = str if key == "skus" else int
+    if not isinstance(values, list) or not all(
+            isinstance(v, expected) and not isinstance(v, bool) for v in values):
+        return _error(400, f'"{key}" must be a list of {"strings" if key == "skus" else "integers"}.')
+    max_items = current_app.config.get("PRODUCT_BATCH_GET_MAX_ITEMS", 1000)
+    if len(values) > max_items:
+        return _error(413, f"Batch too large; at most {max_items} {key} are accepted.")
+
+    if key == "skus":
+        found = ProductService.get_products_by_skus(values, fields=fields)
+    else:
+        found = ProductService.get_products_by_ids(values, fields=fields)
+    return serialize_response({
+        "products": {
+            str(k): ({field: row[field] for field in fields} if row is not None else None)
+            for k, row in found.items()
+        },
+        "missing": [k for k, row in found.items() if row is None],
+    })
+
+
+@api_v1_bp.route("/products/<int:product_id>", methods=["GET"])
+def get_product(product_id: int) -> Response:
+    fields, error = _requested_fields()
+    if error:
+        return error
+    product = ProductService.get_product_fields(product_id, fields)
+    if product is None:
+        return _error(404, "Product not found.")
+    return serialize_response(_serialize_product(product, fields))
+
+
+@api_v1_bp.route("/products", methods=["POST"])
+def create_product() -> Response:
+    data, error = _product_body()
+    if error:
+        return error
+    product, errors = ProductService.create_product(data)
+    if errors:
+        return _error(400, "Validation failed.", errors)
+    return serialize_response(
+        _serialize_product(product, list(PRODUCT_FIELDS)), status=201,
+        headers={"Location": url_for("api_v1.get_product", product_id=product.id)},
+    )
+
+
+@api_v1_bp.route("/products/<int:product_id>", methods=["PUT", "PATCH"])
+def update_product(product_id: int) -> Response:
+    data, error = _product_body()
+    if error:
+        return error
+    product, errors = ProductService.update_product(product_id, data)
+    if errors.get("_system") == "Product not found":
+        return _error(404, "Product not found.")
+    if errors:
+        return _error(400, "Validation failed.", errors)
+    return serialize_response(_serialize_product(product, list(PRODUCT_FIELDS)))
+
+
+@api_v1_bp.route("/products/<int:product_id>", methods=["DELETE"])
+def delete_product(product_id: int) -> Response:
+    if ProductService.get_product_by_id(product_id) is None:
+        return _error(404, "Product not found.")
+    if not ProductService.delete_product(product_id):
+        return _error(500, "A database error occurred while deleting the product.")
+    return Response(status=204)
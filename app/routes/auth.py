@@ -19,8 +19,7 @@ from app.forms.auth import (
 )
 from datetime import datetime
 from typing import Union
-from flask_mail import Message
-from app import mail
+from app.services.mail_service import MailService
 
 
 auth_bp = Blueprint("auth", __name__, url_prefix="/auth")
@@ -49,11 +48,9 @@ def send_password_reset_email(user: User) -> None:
         )
         return
 
-    msg = Message(
-        "Password Reset Request", sender=sender_email, recipients=[user.email]
-    )
+    subject = "Password Reset Request"
     reset_url = url_for("auth.reset_token", token=token, _external=True)
-    msg.body = f"""To reset your password, visit the following link:
+    body = f"""To reset your password, visit the following link:
             {reset_url}
         If you did not make this request then simply ignore this email and no changes will be made.
         This token is valid for 30 minutes.
@@ -63,20 +60,12 @@ def send_password_reset_email(user: User) -> None:
         current_app.logger.info("---- PASSWORD RESET EMAIL (SIMULATED) ----")
         current_app.logger.info(f"To: {user.email}")
         current_app.logger.info(f"From: {sender_email}")
-        current_app.logger.info(f"Subject: {msg.subject}")
-        current_app.logger.info(f"Body:\n{msg.body}")
+        current_app.logger.info(f"Subject: {subject}")
+        current_app.logger.info(f"Body:\n{body}")
         current_app.logger.info("---- END OF SIMULATED EMAIL ----")
 
-    try:
-        mail.send(msg)
-        if not current_app.config.get("MAIL_SUPPRESS_SEND"):
-            current_app.logger.info(
-                f"Password reset email actually attempted for {user.email}"
-            )
-    except Exception as e:
-        current_app.logger.error(
-            f"Failed to send password reset email to {user.email}: {e}", exc_info=True
-        )
+    # Queued for `flask mail-worker`, so the request never waits on SMTP
+    if MailService.enqueue(subject, [user.email], body, sender=sender_email) is None:
         flash(
             "There was an error sending the password reset email. Please try again later or contact support.",
             "danger",
@@ -92,7 +81,7 @@ def login():
     if form.validate_on_submit():
         user = User.query.filter_by(username=form.username.data).first()
 
-        if user and user.password_hash and user.check_password(form.password.data):
+        if user and user.password_hash and user.check_password(form.password.data, rehash=True):
             login_user(user, remember=form.remember_me.data)
             user.last_login = datetime.utcnow()
             db.session.commit()
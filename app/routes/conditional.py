@@ -0,0 +1,80 @@
+import hashlib
+from datetime import timezone
+from functools import wraps
+from typing import Any, Callable, Optional
+
+from flask import current_app, make_response, request, session
+from flask_login import current_user
+
+from app.db_replicas import require_version
+from app.services.inventory_summary_service import InventorySummaryService
+
+
+def _catalog_etag(catalog_version: int) -> str:
+    """
+    Build the validator for the current page from the catalog version.
+
+    Besides the catalog, the pages show the logged-in user's name, role and
+    last login, so those are part of the tag too. They come from the user
+    snapshot cache and cost no query on a hit. ETAG_SALT (default: the
+    per-process CACHE_BUSTER) changes the tag on every deploy; set it to the
+    release id so all workers hand out the same tags.
+    """
+    if current_user.is_authenticated:
+        permissions = current_user.resolved_permissions
+        user_part = (current_user.id, current_user.username, current_user.first_name, current_user.last_name,
+                     current_user.last_login, sorted(permissions.roles), sorted(permissions.permissions))
+    else:
+        user_part = None
+    salt = current_app.config.get('ETAG_SALT') or current_app.config.get('CACHE_BUSTER', '')
+    raw = repr((catalog_version, request.full_path, user_part, salt))
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def catalog_conditional(view: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Answer GET/HEAD requests for catalog pages with 304 when nothing changed.
+
+    The ETag is derived from InventorySummary.catalog_version, which every
+    product write through the services bumps, so a matching If-None-Match
+    is answered after one primary-key query and the view (and its product
+    queries) never runs. If-Modified-Since is not honoured, because a
+    timestamp cannot tell two users' versions of a page apart.
+    """
+    @wraps(view)
+    def wrapped(*args: Any, **kwargs: Any) -> Any:
+        # Pending flash messages must be rendered, never swallowed by a 304
+        if request.method not in ('GET', 'HEAD') or session.get('_flashes'):
+            return view(*args, **kwargs)
+
+        # From the primary: a lagging replica's version would let a stale page match
+        state = InventorySummaryService.get_catalog_state(on_primary=True)
+        if state is None:
+            return view(*args, **kwargs)
+        catalog_version, updated_at = state
+        # ...and the page itself must not be older than its tag
+        require_version(catalog_version, InventorySummaryService.get_catalog_version)
+        etag = _catalog_etag(catalog_version)
+
+        if request.if_none_match.contains_weak(etag):
+            response = current_app.response_class(status=304)
+        else:
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+
+        response.set_etag(etag, weak=True)
+        _set_last_modified(response, updated_at)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        response.vary.add('Cookie')
+        return response
+
+    return wrapped
+
+
+def _set_last_modified(response: Any, updated_at: Optional[Any]) -> None:
+    if updated_at is None:
+        return
+    if updated_at.tzinfo is None:
+        updated_at = updated_at.replace(tzinfo=timezone.utc)
+    response.last_modified = updated_at
@@ -1,22 +1,40 @@
-from flask import Blueprint, render_template
+from flask import Blueprint, render_template, request, current_app
 from app.models import Product
 from typing import List
-from app.utils import calculate_inventory_stats
+from app.services.product_service import ProductService
+from app.services.inventory_service import InventoryService
+from app.services.inventory_summary_service import InventorySummaryService
+from app.routes.conditional import catalog_conditional
 
 
 
 main_bp = Blueprint("main", __name__)
 
+
+def _get_requested_page():
+    """Resolve the keyset page requested via ?after=/?before=/?per_page= query args."""
+    return ProductService.get_products_page(
+        after=request.args.get("after"),
+        before=request.args.get("before"),
+        per_page=request.args.get("per_page", type=int),
+    )
+
 @main_bp.route("/")
+@catalog_conditional
 def product_list() -> str:
-    products: List[Product] = Product.query.all()
-    stats = calculate_inventory_stats(products)
-    return render_template("products/list.html", products=products, stats=stats)
+    page = _get_requested_page()
+    stats = InventorySummaryService.get_stats()
+    low_stock_products: List[Product] = InventoryService.get_low_stock_products(
+        limit=current_app.config.get("DASHBOARD_LOW_STOCK_ALERTS", 12)
+    )
+    return render_template("products/list.html", products=page.items, page=page,
+                           low_stock_products=low_stock_products, stats=stats)
 
 @main_bp.route("/inventory_status")
+@catalog_conditional
 def inventory_status() -> str:
-    products: List[Product] = Product.query.all()
-    stats = calculate_inventory_stats(products)
-    return render_template("inventory_status.html", products=products, stats=stats)
+    page = _get_requested_page()
+    stats = InventorySummaryService.get_stats()
+    return render_template("inventory_status.html", products=page.items, page=page, stats=stats)
 
 
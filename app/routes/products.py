@@ -1,13 +1,28 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, Response
-from app.models import db, Product
+from flask import (Blueprint, render_template, request, redirect, url_for, flash, Response, jsonify, current_app,
+                   send_from_directory, abort)
+from flask_login import current_user
+from app.models import db, Product, StockMovement
 from app.services.product_service import ProductService
-from app.forms.product import ProductForm, ConfirmDeleteForm
-from typing import Union
+from app.services.inventory_service import InventoryService
+from app.forms.product import ProductForm, ConfirmDeleteForm, ProductImportForm
+from app.services.product_import_service import ProductImportService
+from app.routes.conditional import catalog_conditional
+from app.product_lookup import get_product_lookup
+from typing import Union, List, Dict, Any, Optional
+import io
+import json
+import os
+import uuid
 
 
 # Initialize Product Blueprint
 products_bp = Blueprint("products", __name__, url_prefix="/products")
 
+
+def _current_user_id():
+    """ID of the logged-in user for the stock ledger, or None for anonymous requests."""
+    return current_user.id if current_user.is_authenticated else None
+
 # Route: Add Product
 @products_bp.route("/add", methods=["GET", "POST"])
 def add_product() -> Union[str, Response]:
@@ -60,7 +75,7 @@ def edit_product(product_id: int) -> Union[str, Response]:
 # Route: Delete product
 @products_bp.route("/delete/<int:product_id>", methods=["GET", "POST"]) 
 def delete_product(product_id: int) -> Union[str, Response]:
-    product = db.session.get(Product, product_id)
+    product = ProductService.get_product_by_id(product_id)
     if not product:
         flash('Product not found.', 'danger')
         return redirect(url_for("main.product_list"))
@@ -69,14 +84,11 @@ def delete_product(product_id: int) -> Union[str, Response]:
 
     if form.validate_on_submit():
       
-        try:
-            product_name = product.name # Store name before deleting
-            db.session.delete(product)
-            db.session.commit()
+        product_name = product.name # Store name before deleting
+        if ProductService.delete_product(product_id):
             flash(f'Product "{product_name}" deleted successfully!', 'success')
-        except Exception as e:
-            db.session.rollback()
-            flash(f'Error deleting product: {str(e)}', 'danger')
+        else:
+            flash('Error deleting product.', 'danger')
         return redirect(url_for("main.product_list"))
 
     # GET request - Show confirmation page
@@ -89,7 +101,7 @@ def delete_product(product_id: int) -> Union[str, Response]:
 # Route: Stock-in
 @products_bp.route("/stock/in/<int:product_id>", methods=["GET", "POST"])
 def stock_in(product_id: int) -> Union[str, Response]:
-    product = db.session.get(Product, product_id)
+    product = ProductService.get_product_by_id(product_id)
     if not product:
         flash('Product not found.', 'danger')
         return redirect(url_for('main.product_list'))
@@ -98,9 +110,15 @@ def stock_in(product_id: int) -> Union[str, Response]:
         try:
             quantity: int = int(request.form["quantity"])
             if quantity > 0:
-                product.stock_level += quantity
-                db.session.commit()
-                flash(f'{quantity} units added to stock for "{product.name}".', 'success')
+                _, error = InventoryService.apply_stock_delta(
+                    product_id, quantity, StockMovement.REASON_STOCK_IN, _current_user_id()
+                )
+                if error:
+                    db.session.rollback()
+                    flash(f'Error updating stock: {error}', 'danger')
+                else:
+                    db.session.commit()
+                    flash(f'{quantity} units added to stock for "{product.name}".', 'success')
             else:
                 flash('Please enter a positive quantity.', 'warning')
         except (ValueError, KeyError):
@@ -116,7 +134,7 @@ def stock_in(product_id: int) -> Union[str, Response]:
 # Route: Stock-out
 @products_bp.route("/stock/out/<int:product_id>", methods=["GET", "POST"])
 def stock_out(product_id: int) -> Union[str, Response]:
-    product = db.session.get(Product, product_id)
+    product = ProductService.get_product_by_id(product_id)
     if not product:
         flash('Product not found.', 'danger')
         return redirect(url_for('main.product_list'))
@@ -126,12 +144,20 @@ def stock_out(product_id: int) -> Union[str, Response]:
             quantity: int = int(request.form["quantity"])
             if quantity <= 0:
                  flash('Please enter a positive quantity.', 'warning')
-            elif product.stock_level >= quantity:
-                product.stock_level -= quantity
-                db.session.commit()
-                flash(f'{quantity} units removed from stock for "{product.name}".', 'success')
             else:
-                flash(f'Cannot remove {quantity} units. Only {product.stock_level} in stock.', 'warning')
+                # The availability check happens inside the UPDATE, not against the loaded row
+                _, error = InventoryService.apply_stock_delta(
+                    product_id, -quantity, StockMovement.REASON_STOCK_OUT, _current_user_id()
+                )
+                if error == "Product not found.":
+                    db.session.rollback()
+                    flash('Product not found.', 'danger')
+                elif error:
+                    db.session.rollback()
+                    flash(f'Cannot remove {quantity} units. Only {product.stock_level} in stock.', 'warning')
+                else:
+                    db.session.commit()
+                    flash(f'{quantity} units removed from stock for "{product.name}".', 'success')
         except (ValueError, KeyError):
             flash('Invalid quantity entered.', 'danger')
         except Exception as e:
@@ -143,4 +169,106 @@ def stock_out(product_id: int) -> Union[str, Response]:
     return render_template("products/stock_out.html", product=product)
 
 
+# --- Batch stock movements (scanner bursts) ---
+def _parse_stock_batch() -> Optional[List[Dict[str, Any]]]:
+    """Parse a JSON array (or {"items": [...]}) or an NDJSON body. Returns None if malformed."""
+    body = request.get_data(cache=False, as_text=True)
+    try:
+        if request.mimetype in ("application/x-ndjson", "application/ndjson"):
+            return [json.loads(line) for line in body.splitlines() if line.strip()]
+        payload = json.loads(body)
+    except ValueError:
+        return None
+    if isinstance(payload, dict):
+        payload = payload.get("items")
+    return payload if isinstance(payload, list) else None
+
+
+@products_bp.route("/stock/batch", methods=["POST"])
+def stock_batch() -> Union[Response, tuple]:
+    items = _parse_stock_batch()
+    if items is None:
+        return jsonify({"error": "Expected a JSON array or NDJSON lines of {sku, delta} items."}), 400
+
+    max_items = current_app.config.get("STOCK_BATCH_MAX_ITEMS", 5000)
+    if len(items) > max_items:
+        return jsonify({"error": f"Batch too large; at most {max_items} items are accepted."}), 413
+
+    try:
+        results = InventoryService.apply_stock_batch(items, user_id=_current_user_id())
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error applying stock batch: {e}", exc_info=True)
+        return jsonify({"error": "A database error occurred while applying the batch."}), 500
+
+    applied = sum(1 for r in results if r["status"] == "applied")
+    return jsonify({
+        "applied": applied,
+        "rejected": len(results) - applied,
+        "results": results,
+    })
+
+
+# --- Bulk CSV import ---
+def _import_errors_dir() -> str:
+    return os.path.join(current_app.instance_path, "import_errors")
+
+
+@products_bp.route("/import", methods=["GET", "POST"])
+def import_products() -> Union[str, Response]:
+    form = ProductImportForm()
+    if form.validate_on_submit():
+        os.makedirs(_import_errors_dir(), exist_ok=True)
+        error_name = f"{uuid.uuid4().hex}.csv"
+        error_path = os.path.join(_import_errors_dir(), error_name)
+
+        # Stream the (spooled) upload straight through the importer
+        upload = io.TextIOWrapper(form.csv_file.data.stream, encoding="utf-8-sig", newline="")
+        with open(error_path, "w", encoding="utf-8", newline="") as error_stream:
+            totals = ProductImportService.import_csv(upload, error_stream=error_stream)
+
+        if totals["rejected"]:
+            flash(f'Imported {totals["imported"]} products; {totals["rejected"]} rows were rejected.', 'warning')
+            return render_template("products/import.html", title="Import Products", form=form,
+                                   totals=totals, error_file=error_name)
+
+        os.remove(error_path)
+        flash(f'Imported {totals["imported"]} products.', 'success')
+        return redirect(url_for("main.product_list"))
+
+    return render_template("products/import.html", title="Import Products", form=form)
+
+
+@products_bp.route("/import/errors/<error_file>")
+def import_errors(error_file: str) -> Response:
+    name, ext = os.path.splitext(error_file)
+    if ext != ".csv" or len(name) != 32 or not all(c in "0123456789abcdef" for c in name):
+        abort(404)
+    return send_from_directory(_import_errors_dir(), error_file, as_attachment=True,
+                               download_name="import_errors.csv", mimetype="text/csv")
+
+
+
+# --- Search ---
+@products_bp.route("/search")
+@catalog_conditional
+def search() -> str:
+    results = ProductService.search(
+        request.args.get("q"),
+        page=request.args.get("page", 1, type=int),
+        per_page=request.args.get("per_page", type=int),
+    )
+    return render_template("products/search.html", title="Search Products", results=results)
+
 
+# --- Typeahead lookup (scanner and picker UIs) ---
+@products_bp.route("/lookup")
+def lookup() -> Response:
+    prefix = request.args.get("prefix", "")
+    max_results = current_app.config.get("PRODUCT_LOOKUP_MAX_RESULTS", 50)
+    limit = max(1, min(request.args.get("limit", 10, type=int), max_results))
+    matches = get_product_lookup().lookup(prefix, limit)
+    return jsonify({
+        "prefix": prefix,
+        "results": [{"id": product_id, "sku": sku, "name": name} for product_id, sku, name in matches],
+    })
@@ -1,28 +1,112 @@
 # app/routes/reports.py
-from flask import Blueprint, render_template
-from app.models import Product
-from typing import List
-from app.utils import format_currency
+from flask import Blueprint, render_template, request, abort, current_app, Response, stream_with_context
+from sqlalchemy import select
+from sqlalchemy.sql import Select
+from app.models import db, Product
+from typing import Any, Callable, List, Optional, Sequence, Union
+from app.routes.conditional import catalog_conditional
+from app.utils import format_currency, iter_csv, iter_ndjson, EXPORT_MIMETYPES
 
 
 reports_bp = Blueprint("reports", __name__, url_prefix="/reports")
 
+SUMMARY_COLUMNS = ('name', 'sku', 'price', 'stock_level', 'low_stock_threshold', 'status')
+VALUE_COLUMNS = ('name', 'sku', 'price', 'stock_level', 'total_value')
+
+
+def _export_format() -> Optional[str]:
+    """Return the requested export format, None for the HTML page; aborts with 400 if unknown."""
+    fmt = request.args.get('format', 'html').lower()
+    if fmt == 'html':
+        return None
+    if fmt not in EXPORT_MIMETYPES:
+        abort(400)
+    return fmt
+
+
+def _stock_status(stock_level: int, low_stock_threshold: int) -> str:
+    """Same status labels as the HTML reports."""
+    if stock_level <= 0:
+        return 'Out of Stock'
+    if stock_level <= low_stock_threshold:
+        return 'Low Stock'
+    return 'In Stock'
+
+
+def _summary_row(row: Any) -> Sequence[Any]:
+    return (row.name, row.sku, row.price, row.stock_level, row.low_stock_threshold,
+            _stock_status(row.stock_level, row.low_stock_threshold))
+
+
+def _stream_export(fmt: str, filename: str, columns: Sequence[str], stmt: Select,
+                   to_row: Callable[[Any], Sequence[Any]]) -> Response:
+    """
+    Stream a report query as CSV or NDJSON.
+
+    Rows are fetched `REPORT_EXPORT_BATCH_SIZE` at a time with yield_per (a
+    server-side cursor on PostgreSQL) and serialized as they arrive, so
+    memory stays flat regardless of catalog size.
+    """
+    batch_size = current_app.config.get('REPORT_EXPORT_BATCH_SIZE', 1000)
+
+    def rows():
+        result = db.session.execute(stmt.execution_options(yield_per=batch_size))
+        for row in result:
+            yield to_row(row)
+
+    serializer = iter_csv if fmt == 'csv' else iter_ndjson
+    response = Response(stream_with_context(serializer(columns, rows(), batch_size)),
+                        mimetype=EXPORT_MIMETYPES[fmt])
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}.{fmt}'
+    return response
+
+
 @reports_bp.route('/low_stock')
-def low_stock_report() -> str:
+@catalog_conditional
+def low_stock_report() -> Union[str, Response]:
+    fmt = _export_format()
+    if fmt:
+        stmt = (
+            select(Product.name, Product.sku, Product.price, Product.stock_level, Product.low_stock_threshold)
+            .where(Product.stock_level <= Product.low_stock_threshold)
+            .order_by(Product.name, Product.id)
+        )
+        return _stream_export(fmt, 'low_stock', SUMMARY_COLUMNS, stmt, _summary_row)
+
     low_stock_products: List[Product] = Product.query.filter(
         Product.stock_level <= Product.low_stock_threshold
     ).all()
     return render_template('reports/low_stock.html', products=low_stock_products)
 
 @reports_bp.route('/product_summary')
-def product_summary_report() -> str:
+@catalog_conditional
+def product_summary_report() -> Union[str, Response]:
+    fmt = _export_format()
+    if fmt:
+        stmt = (
+            select(Product.name, Product.sku, Product.price, Product.stock_level, Product.low_stock_threshold)
+            .order_by(Product.name, Product.id)
+        )
+        return _stream_export(fmt, 'product_summary', SUMMARY_COLUMNS, stmt, _summary_row)
+
     products: List[Product] = Product.query.order_by(Product.name).all()
     return render_template('reports/product_summary.html', products=products)
 
 @reports_bp.route('/product_value')
-def product_value_report() -> str:
+@catalog_conditional
+def product_value_report() -> Union[str, Response]:
+    fmt = _export_format()
+    if fmt:
+        stmt = (
+            select(Product.name, Product.sku, Product.price, Product.stock_level)
+            .order_by(Product.name, Product.id)
+        )
+        return _stream_export(
+            fmt, 'product_value', VALUE_COLUMNS, stmt,
+            lambda row: (row.name, row.sku, row.price, row.stock_level, row.price * row.stock_level)
+        )
+
     products: List[Product] = Product.query.all()
     total_value = sum(product.price * product.stock_level for product in products)
     formatted_value = format_currency(total_value)
     return render_template('reports/product_value.html', products=products, total_value=total_value, formatted_value=formatted_value)
-
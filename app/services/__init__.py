@@ -2,6 +2,10 @@ from .inventory_service import InventoryService
 from .product_service import ProductService
 from .user_service import UserService
 from .role_service import RoleService
+from .inventory_summary_service import InventorySummaryService
+from .product_import_service import ProductImportService
+from .mail_service import MailService
 
-__all__ = ['InventoryService', 'ProductService', 'UserService', 'RoleService']
+__all__ = ['InventoryService', 'ProductService', 'UserService', 'RoleService', 'InventorySummaryService',
+           'ProductImportService', 'MailService']
 
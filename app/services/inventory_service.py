@@ -1,13 +1,24 @@
-from app.models import db, Product
-from typing import List, Optional
+from app.models import db, Product, StockMovement, StockSnapshot
+from app.product_cache import mark_products_changed
+from app.utils import calculate_inventory_stats, stats_from_totals
+from typing import List, Optional, Dict, Any, Tuple
+from datetime import datetime, timezone
+from decimal import Decimal
+from flask import current_app
+from sqlalchemy import func, case, and_, or_, update, select, insert, literal
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.exc import SQLAlchemyError
 
 class InventoryService:
     @staticmethod
-    def get_low_stock_products() -> List[Product]:
-        """Get all products with stock below their threshold."""
-        return Product.query.filter(
+    def get_low_stock_products(limit: Optional[int] = None) -> List[Product]:
+        """Get products with stock below their threshold, optionally capped at `limit`."""
+        query = Product.query.filter(
             Product.stock_level <= Product.low_stock_threshold
-        ).all()
+        )
+        if limit is not None:
+            query = query.order_by(Product.stock_level, Product.id).limit(limit)
+        return query.all()
         
     @staticmethod
     def calculate_inventory_value() -> float:
@@ -16,15 +27,363 @@ class InventoryService:
         return sum(product.price * product.stock_level for product in products)
     
     @staticmethod
-    def adjust_stock(product_id: int, quantity: int) -> Optional[Product]:
-        """Adjust stock level for a product."""
-        product = db.session.get(Product, product_id)
-        if not product:
+    def aggregate_totals() -> Dict[str, Any]:
+        """
+        Compute raw inventory totals with a single aggregate SELECT.
+
+        Returns:
+            A dict with total_products, total_units, total_value,
+            low_stock_count and out_of_stock_count.
+
+        Raises:
+            SQLAlchemyError: If the aggregate query fails.
+        """
+        stock = Product.stock_level
+        threshold = Product.low_stock_threshold
+        is_low_stock = or_(
+            and_(stock > 0, stock <= threshold),
+            and_(stock <= 0, threshold >= 0),
+        )
+        row = db.session.query(
+            func.count(Product.id),
+            func.coalesce(func.sum(stock), 0),
+            func.coalesce(func.sum(Product.price * stock), 0),
+            func.coalesce(func.sum(case((is_low_stock, 1), else_=0)), 0),
+            func.coalesce(func.sum(case((stock <= 0, 1), else_=0)), 0),
+        ).one()
+
+        total_products, total_units, total_value, low_stock_count, out_of_stock_count = row
+        return {
+            'total_products': int(total_products),
+            'total_units': int(total_units),
+            'total_value': Decimal(str(total_value)).quantize(Decimal('0.01')),
+            'low_stock_count': int(low_stock_count),
+            'out_of_stock_count': int(out_of_stock_count)
+        }
+
+    @staticmethod
+    def get_inventory_stats() -> Dict[str, Any]:
+        """
+        Calculate dashboard statistics with a single aggregate SELECT.
+
+        Returns the same keys as app.utils.calculate_inventory_stats. If the
+        aggregate query fails, falls back to the Python implementation.
+        """
+        try:
+            totals = InventoryService.aggregate_totals()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            current_app.logger.warning(
+                f"Aggregate inventory stats query failed, falling back to Python: {e}"
+            )
+            return calculate_inventory_stats(Product.query.all())
+
+        return stats_from_totals(totals)
+
+    @staticmethod
+    def apply_stock_delta(product_id: int, quantity: int,
+                          reason: str = StockMovement.REASON_ADJUSTMENT,
+                          user_id: Optional[int] = None) -> Tuple[Optional[int], Optional[str]]:
+        """
+        Atomically add `quantity` (negative to remove) to a product's stock level.
+
+        Runs a single conditional UPDATE, so concurrent callers never lose
+        updates and a removal can never drive stock below zero:
+
+            UPDATE product SET stock_level = stock_level + :q
+            WHERE id = :id AND stock_level >= -:q
+
+        A successful change is appended to the stock movement ledger. Does not
+        commit; the caller's commit makes the change durable.
+
+        Returns:
+            A tuple of (new stock level or None, error message or None).
+        """
+        from app.services.inventory_summary_service import InventorySummaryService
+
+        stmt = update(Product).where(Product.id == product_id)
+        if quantity < 0:
+            stmt = stmt.where(Product.stock_level >= -quantity)
+        stmt = stmt.values(stock_level=Product.stock_level + quantity).execution_options(
+            synchronize_session=False
+        )
+
+        if db.engine.dialect.update_returning:
+            row = db.session.execute(
+                stmt.returning(Product.stock_level, Product.price, Product.low_stock_threshold)
+            ).first()
+        else:
+            # No RETURNING support: the UPDATE holds the row lock, so reading it back is safe
+            result = db.session.execute(stmt)
+            row = None
+            if result.rowcount:
+                row = db.session.execute(
+                    select(Product.stock_level, Product.price, Product.low_stock_threshold)
+                    .where(Product.id == product_id)
+                ).first()
+
+        if row is None:
+            if db.session.execute(select(Product.id).where(Product.id == product_id)).first() is None:
+                return None, "Product not found."
+            return None, "Insufficient stock."
+
+        new_level, price, threshold = row
+        InventoryService.record_movement(product_id, quantity, reason, user_id)
+        InventorySummaryService.apply_change(
+            InventorySummaryService.contribution(price, new_level - quantity, threshold),
+            InventorySummaryService.contribution(price, new_level, threshold),
+        )
+
+        InventoryService._sync_loaded_stock(product_id, new_level)
+        mark_products_changed([product_id])
+        return new_level, None
+
+    @staticmethod
+    def _sync_loaded_stock(product_id: int, new_level: int) -> None:
+        """Keep any Product instance already loaded in the session consistent with a Core UPDATE."""
+        product = db.session.identity_map.get(db.session.identity_key(Product, product_id))
+        if product is not None:
+            set_committed_value(product, 'stock_level', new_level)
+
+    @staticmethod
+    def adjust_stock(product_id: int, quantity: int, reason: str = StockMovement.REASON_ADJUSTMENT,
+                     user_id: Optional[int] = None) -> Optional[Product]:
+        """
+        Adjust stock level for a product with an atomic conditional UPDATE.
+
+        Returns:
+            The updated product, or None if the product does not exist or a
+            removal exceeds the stock on hand (stock is left unchanged).
+        """
+        new_level, error = InventoryService.apply_stock_delta(product_id, quantity, reason, user_id)
+        if error:
+            db.session.rollback()
             return None
-            
-        product.stock_level += quantity
-        if product.stock_level < 0:
-            product.stock_level = 0
-            
+
+        db.session.commit()
+        return db.session.get(Product, product_id)
+
+    @staticmethod
+    def apply_stock_batch(items: List[Dict[str, Any]], user_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Apply a burst of {sku, delta} stock movements and commit them as one transaction.
+
+        SKUs are resolved with one SELECT, items are checked in order against
+        the stock that was read, and all accepted deltas are applied with one
+        set-based conditional UPDATE. Each product's row must still hold
+        enough stock for its accepted items when the UPDATE runs. If a
+        concurrent write leaves too little, that product falls back to
+        per-item apply_stock_delta. Ledger rows are written with one
+        executemany, and the summary gets a single combined delta.
+
+        Returns:
+            One result dict per input item, in order, with 'sku', 'delta',
+            'status' ('applied', 'insufficient_stock', 'not_found' or
+            'invalid') and, when applied, the resulting 'stock_level'.
+        """
+        from app.services.inventory_summary_service import InventorySummaryService
+
+        results: List[Dict[str, Any]] = []
+        for item in items:
+            sku = item.get('sku') if isinstance(item, dict) else None
+            delta = item.get('delta') if isinstance(item, dict) else None
+            result = {'sku': sku, 'delta': delta, 'status': 'invalid'}
+            if isinstance(sku, str) and sku and isinstance(delta, int) and not isinstance(delta, bool) and delta:
+                result['status'] = None  # Pending
+            results.append(result)
+
+        pending = [r for r in results if r['status'] is None]
+        if not pending:
+            return results
+
+        rows = db.session.execute(
+            select(Product.id, Product.sku, Product.stock_level)
+            .where(Product.sku.in_({r['sku'] for r in pending}))
+        ).all()
+        by_sku = {row.sku: row for row in rows}
+
+        # Walk items in order against the level we read, per product
+        simulated: Dict[int, int] = {}
+        net: Dict[int, int] = {}
+        required: Dict[int, int] = {}
+        accepted: Dict[int, List[Dict[str, Any]]] = {}
+        for result in pending:
+            row = by_sku.get(result['sku'])
+            if row is None:
+                result['status'] = 'not_found'
+                continue
+            level = simulated.get(row.id, row.stock_level)
+            if level + result['delta'] < 0:
+                result['status'] = 'insufficient_stock'
+                continue
+            simulated[row.id] = level + result['delta']
+            net[row.id] = net.get(row.id, 0) + result['delta']
+            # Smallest starting level for which every accepted prefix stays >= 0
+            required[row.id] = max(required.get(row.id, 0), row.stock_level - simulated[row.id])
+            accepted.setdefault(row.id, []).append(result)
+
+        net = {product_id: delta for product_id, delta in net.items() if delta}
+        movements: List[Dict[str, Any]] = []
+        now = datetime.now(timezone.utc)
+
+        def record_applied(product_id: int, product_results: List[Dict[str, Any]], start_level: int) -> None:
+            level = start_level
+            for result in product_results:
+                level += result['delta']
+                result['status'] = 'applied'
+                result['stock_level'] = level
+                movements.append({
+                    'product_id': product_id,
+                    'delta': result['delta'],
+                    'reason': InventoryService._movement_reason(result['delta']),
+                    'user_id': user_id,
+                    'created_at': now,
+                })
+
+        for product_id in accepted.keys() - net.keys():
+            # Items cancelled out: the row is unchanged, but the movements happened
+            record_applied(product_id, accepted[product_id], by_sku[accepted[product_id][0]['sku']].stock_level)
+
+        updated: Dict[int, Any] = {}
+        if net and db.engine.dialect.update_returning:
+            stmt = (
+                update(Product)
+                .where(
+                    Product.id.in_(net.keys()),
+                    Product.stock_level >= case(required, value=Product.id, else_=0),
+                )
+                .values(stock_level=Product.stock_level + case(net, value=Product.id, else_=0))
+                .returning(Product.id, Product.stock_level, Product.price, Product.low_stock_threshold)
+                .execution_options(synchronize_session=False)
+            )
+            updated = {row.id: row for row in db.session.execute(stmt)}
+
+        before_totals: List[Dict[str, Any]] = []
+        after_totals: List[Dict[str, Any]] = []
+        for product_id, product_delta in net.items():
+            row = updated.get(product_id)
+            if row is None:
+                # Lost a race with another writer (or no RETURNING): apply one by one
+                for result in accepted[product_id]:
+                    new_level, error = InventoryService.apply_stock_delta(
+                        product_id, result['delta'], InventoryService._movement_reason(result['delta']), user_id
+                    )
+                    if error is None:
+                        result['status'] = 'applied'
+                    else:
+                        result['status'] = 'not_found' if error == "Product not found." else 'insufficient_stock'
+                    if new_level is not None:
+                        result['stock_level'] = new_level
+                continue
+
+            record_applied(product_id, accepted[product_id], row.stock_level - product_delta)
+            before_totals.append(InventorySummaryService.contribution(
+                row.price, row.stock_level - product_delta, row.low_stock_threshold))
+            after_totals.append(InventorySummaryService.contribution(
+                row.price, row.stock_level, row.low_stock_threshold))
+            InventoryService._sync_loaded_stock(product_id, row.stock_level)
+        mark_products_changed(updated.keys())
+
+        if movements:
+            db.session.execute(insert(StockMovement), movements)
+        if updated:
+            InventorySummaryService.apply_change(
+                InventorySummaryService.combine(before_totals),
+                InventorySummaryService.combine(after_totals),
+            )
         db.session.commit()
-        return product
+        return results
+
+    @staticmethod
+    def _movement_reason(delta: int) -> str:
+        """Ledger reason for a scanner movement, based on its direction."""
+        return StockMovement.REASON_STOCK_IN if delta > 0 else StockMovement.REASON_STOCK_OUT
+
+    # --- Stock Movement Ledger ---
+    @staticmethod
+    def record_movement(product_id: int, delta: int, reason: str, user_id: Optional[int] = None) -> None:
+        """Append a movement to the ledger. Does not commit."""
+        if not delta:
+            return
+        db.session.execute(insert(StockMovement).values(
+            product_id=product_id,
+            delta=delta,
+            reason=reason,
+            user_id=user_id,
+            created_at=datetime.now(timezone.utc),
+        ))
+
+    @staticmethod
+    def get_movements(product_id: int, limit: int = 50) -> List[StockMovement]:
+        """Get the most recent stock movements for a product, newest first."""
+        return (
+            StockMovement.query.filter(StockMovement.product_id == product_id)
+            .order_by(StockMovement.id.desc())
+            .limit(limit)
+            .all()
+        )
+
+    @staticmethod
+    def get_stock_level_at(product_id: int, at: datetime) -> int:
+        """
+        Reconstruct a product's on-hand quantity at a point in time.
+
+        Starts from the latest snapshot taken at or before `at` and replays
+        only the movements recorded after it.
+        """
+        snapshot = (
+            StockSnapshot.query.filter(
+                StockSnapshot.product_id == product_id,
+                StockSnapshot.taken_at <= at,
+            )
+            .order_by(StockSnapshot.taken_at.desc(), StockSnapshot.id.desc())
+            .first()
+        )
+        base_level = snapshot.stock_level if snapshot else 0
+        last_movement_id = snapshot.last_movement_id if snapshot else 0
+
+        replayed = db.session.execute(
+            select(func.coalesce(func.sum(StockMovement.delta), 0)).where(
+                StockMovement.product_id == product_id,
+                StockMovement.id > last_movement_id,
+                StockMovement.created_at <= at,
+            )
+        ).scalar_one()
+        return int(base_level) + int(replayed)
+
+    @staticmethod
+    def take_snapshots() -> int:
+        """
+        Checkpoint the stock level of every product that has moved since its
+        last snapshot, with one INSERT ... SELECT.
+
+        Returns:
+            The number of snapshot rows written.
+        """
+        latest_movement = (
+            select(func.max(StockMovement.id))
+            .where(StockMovement.product_id == Product.id)
+            .correlate(Product)
+            .scalar_subquery()
+        )
+        latest_snapshot = (
+            select(func.max(StockSnapshot.last_movement_id))
+            .where(StockSnapshot.product_id == Product.id)
+            .correlate(Product)
+            .scalar_subquery()
+        )
+        moved = select(
+            Product.id,
+            Product.stock_level,
+            latest_movement,
+            literal(datetime.now(timezone.utc), type_=db.DateTime),
+        ).where(latest_movement > func.coalesce(latest_snapshot, 0))
+
+        result = db.session.execute(
+            insert(StockSnapshot).from_select(
+                ['product_id', 'stock_level', 'last_movement_id', 'taken_at'], moved
+            )
+        )
+        db.session.commit()
+        return result.rowcount
+
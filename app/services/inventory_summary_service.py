@@ -0,0 +1,182 @@
+from app.models import db, Product, InventorySummary
+from app.services.inventory_service import InventoryService
+from app.utils import stats_from_totals
+from typing import Dict, Any, Optional, List, Tuple
+from datetime import datetime
+from decimal import Decimal
+from flask import current_app
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+SUMMARY_FIELDS = ('total_products', 'total_units', 'total_value', 'low_stock_count', 'out_of_stock_count')
+
+
+class InventorySummaryService:
+    """
+    Maintains the materialized InventorySummary row.
+
+    Writers call apply_change() with the product's contribution before and
+    after the write, inside the same transaction as the product change, so
+    the totals commit (or roll back) together with it.
+    """
+
+    @staticmethod
+    def contribution(price: Any, stock_level: Any, low_stock_threshold: Any) -> Dict[str, Any]:
+        """Return what a single product with these values adds to the summary totals."""
+        stock = int(stock_level or 0)
+        threshold = int(low_stock_threshold or 0)
+        is_low_stock = (0 < stock <= threshold) or (stock <= 0 and threshold >= 0)
+        return {
+            'total_products': 1,
+            'total_units': stock,
+            'total_value': Decimal(str(price or 0)) * stock,
+            'low_stock_count': int(is_low_stock),
+            'out_of_stock_count': int(stock <= 0)
+        }
+
+    @staticmethod
+    def snapshot(product: Optional[Product]) -> Optional[Dict[str, Any]]:
+        """Return the current contribution of a Product, or None if there is no product."""
+        if product is None:
+            return None
+        return InventorySummaryService.contribution(
+            product.price, product.stock_level, product.low_stock_threshold
+        )
+
+    @staticmethod
+    def combine(contributions: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Sum several contributions so they can be applied as one change."""
+        return {field: sum(c[field] for c in contributions) for field in SUMMARY_FIELDS}
+
+    @staticmethod
+    def apply_change(before: Optional[Dict[str, Any]], after: Optional[Dict[str, Any]]) -> None:
+        """
+        Apply the difference between two contributions to the summary row.
+
+        Pass before=None for an insert and after=None for a delete. Every
+        call bumps catalog_version, even when the totals do not move (e.g. a
+        rename). Does not commit; the caller's commit makes the change durable.
+        """
+        before = before or {}
+        after = after or {}
+        deltas = {field: after.get(field, 0) - before.get(field, 0) for field in SUMMARY_FIELDS}
+        values = {
+            getattr(InventorySummary, field): getattr(InventorySummary, field) + delta
+            for field, delta in deltas.items() if delta
+        }
+        values[InventorySummary.catalog_version] = InventorySummary.catalog_version + 1
+
+        stmt = (
+            update(InventorySummary)
+            .where(InventorySummary.id == InventorySummary.SINGLETON_ID)
+            .values(values)
+            .execution_options(synchronize_session=False)
+        )
+        result = db.session.execute(stmt)
+        if result.rowcount == 0 and not InventorySummaryService._seed():
+            # Another first writer inserted the row meanwhile; add this change to its totals
+            if db.session.execute(stmt).rowcount == 0:
+                raise SQLAlchemyError("Inventory summary row is missing after a conflicting insert")
+
+    @staticmethod
+    def _seed() -> bool:
+        """
+        Create the missing summary row from the table (which already includes the caller's change).
+
+        Returns:
+            False if a concurrent writer inserted the row first. Only the
+            savepoint is rolled back, so the caller's transaction carries on.
+        """
+        try:
+            with db.session.begin_nested():
+                InventorySummaryService.rebuild(commit=False)
+        except IntegrityError:
+            return False
+        return True
+
+    @staticmethod
+    def rebuild(commit: bool = True) -> InventorySummary:
+        """Recompute the summary row from the product table."""
+        db.session.flush()
+        totals = InventoryService.aggregate_totals()
+        summary = db.session.get(InventorySummary, InventorySummary.SINGLETON_ID, populate_existing=True)
+        if summary is None:
+            summary = InventorySummary(id=InventorySummary.SINGLETON_ID, catalog_version=0)
+            db.session.add(summary)
+        for field in SUMMARY_FIELDS:
+            setattr(summary, field, totals[field])
+        summary.catalog_version = (summary.catalog_version or 0) + 1
+        if commit:
+            db.session.commit()
+        return summary
+
+    @staticmethod
+    def check_drift() -> Dict[str, Dict[str, Any]]:
+        """
+        Compare the stored summary with a fresh aggregate over the product table.
+
+        Returns:
+            A dict keyed by field name with {'stored': ..., 'actual': ...} for
+            every field that differs. Empty if the summary is accurate.
+        """
+        totals = InventoryService.aggregate_totals()
+        summary = db.session.get(InventorySummary, InventorySummary.SINGLETON_ID, populate_existing=True)
+        drift: Dict[str, Dict[str, Any]] = {}
+        for field in SUMMARY_FIELDS:
+            stored = getattr(summary, field) if summary is not None else None
+            if field == 'total_value' and stored is not None:
+                stored = Decimal(stored).quantize(Decimal('0.01'))
+            if stored != totals[field]:
+                drift[field] = {'stored': stored, 'actual': totals[field]}
+        return drift
+
+    @staticmethod
+    def get_catalog_state(on_primary: bool = False) -> Optional[Tuple[int, Optional[datetime]]]:
+        """
+        Return (catalog_version, updated_at) with one primary-key lookup.
+
+        Args:
+            on_primary: Read the primary even when this request's reads go
+                to a read replica (see app/db_replicas.py).
+
+        Returns:
+            The change counter and the time of the last product write, or
+            None if the summary row has not been built yet (callers should
+            then skip caching).
+        """
+        try:
+            row = db.session.execute(
+                select(InventorySummary.catalog_version, InventorySummary.updated_at)
+                .where(InventorySummary.id == InventorySummary.SINGLETON_ID),
+                bind_arguments={'bind': db.engine} if on_primary else None,
+            ).first()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            current_app.logger.warning(f"Could not read catalog version: {e}")
+            return None
+        return (row.catalog_version, row.updated_at) if row is not None else None
+
+    @staticmethod
+    def get_catalog_version() -> Optional[int]:
+        """Return the catalog change counter, or None if the summary row has not been built yet."""
+        state = InventorySummaryService.get_catalog_state()
+        return state[0] if state is not None else None
+
+    @staticmethod
+    def get_stats() -> Dict[str, Any]:
+        """
+        Read dashboard stats from the summary row in O(1).
+
+        Falls back to the aggregate query if the summary has not been built yet.
+        """
+        try:
+            summary = db.session.get(InventorySummary, InventorySummary.SINGLETON_ID)
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            current_app.logger.warning(f"Could not read inventory summary: {e}")
+            summary = None
+
+        if summary is None:
+            return InventoryService.get_inventory_stats()
+
+        return stats_from_totals({field: getattr(summary, field) for field in SUMMARY_FIELDS})
@@ -0,0 +1,247 @@
+import logging
+import random
+import smtplib
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+from flask import current_app
+from flask_mail import BadHeaderError, Message
+from sqlalchemy import delete, func, select, update
+
+from app.metrics import metrics
+from app.models import db, OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+metrics.describe('mail_outbox_enqueued_total', 'counter', 'Emails added to the outbox.')
+metrics.describe('mail_outbox_deliveries_total', 'counter', 'Outbox delivery attempts by result (sent, retry, dead).')
+
+# Errors that concern one message; anything else is treated as a broken connection
+MESSAGE_ERRORS = (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError,
+                  smtplib.SMTPNotSupportedError, BadHeaderError, AssertionError, UnicodeError)
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class MailService:
+    """
+    Queues outbound email in the mail_outbox table and delivers it from a worker.
+
+    Requests call enqueue(), which only inserts a row. `flask mail-worker`
+    calls deliver_batch() in a loop: it claims up to MAIL_OUTBOX_BATCH_SIZE
+    due rows, sends them over one SMTP connection and commits each result.
+    Failed messages are retried after MAIL_OUTBOX_RETRY_BASE_SECONDS,
+    doubling per attempt up to MAIL_OUTBOX_RETRY_MAX_SECONDS, and are marked
+    dead after MAIL_OUTBOX_MAX_ATTEMPTS. Only errors about a message count
+    as attempts; when the SMTP connection fails the batch is released for a
+    later retry without using any. Delivery is at-least-once: a worker
+    that dies mid-batch leaves rows claimed until their lease
+    (MAIL_OUTBOX_LEASE_SECONDS) expires, and they are then sent again.
+    """
+
+    @staticmethod
+    def enqueue(subject: str, recipients: Iterable[str], body: str,
+                sender: Optional[str] = None, html: Optional[str] = None) -> Optional[OutboundEmail]:
+        """
+        Add an email to the outbox and commit it.
+
+        Returns:
+            The queued OutboundEmail, or None if it could not be stored.
+        """
+        sender = sender or current_app.config.get('MAIL_DEFAULT_SENDER')
+        recipients = [address.strip() for address in recipients if address and address.strip()]
+        if not sender or not recipients:
+            logger.error(f"Cannot queue email '{subject}': a sender and at least one recipient are required.")
+            return None
+
+        email = OutboundEmail(subject=subject, sender=sender, recipients=','.join(recipients),
+                              body=body, html=html)
+        try:
+            db.session.add(email)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Database error while queueing email '{subject}': {e}", exc_info=True)
+            return None
+        metrics.inc('mail_outbox_enqueued_total')
+        logger.info(f"Queued email {email.id} '{subject}' to {email.recipients}")
+        return email
+
+    @staticmethod
+    def claim_batch(limit: Optional[int] = None) -> List[OutboundEmail]:
+        """
+        Claim due emails for this worker and count the attempt.
+
+        A row is due when it is pending and its retry time has come, or when
+        another worker's claim on it has expired. The claim is a conditional
+        UPDATE, so concurrent workers never claim the same row.
+        """
+        config = current_app.config
+        limit = limit or config.get('MAIL_OUTBOX_BATCH_SIZE', 50)
+        now = _utcnow()
+        due = (OutboundEmail.status.in_([OutboundEmail.STATUS_PENDING, OutboundEmail.STATUS_SENDING]),
+               OutboundEmail.next_attempt_at <= now)
+
+        ids = db.session.execute(
+            select(OutboundEmail.id).where(*due)
+            .order_by(OutboundEmail.next_attempt_at, OutboundEmail.id).limit(limit)
+        ).scalars().all()
+        if not ids:
+            db.session.rollback()
+            return []
+
+        claim = (
+            update(OutboundEmail)
+            .where(OutboundEmail.id.in_(ids), *due)
+            .values(status=OutboundEmail.STATUS_SENDING, attempts=OutboundEmail.attempts + 1,
+                    next_attempt_at=now + timedelta(seconds=config.get('MAIL_OUTBOX_LEASE_SECONDS', 300)))
+            .execution_options(synchronize_session=False)
+        )
+        if db.engine.dialect.update_returning:
+            claimed = set(db.session.execute(claim.returning(OutboundEmail.id)).scalars())
+        else:
+            claimed = {email_id for email_id in ids
+                       if db.session.execute(claim.where(OutboundEmail.id == email_id)).rowcount}
+        db.session.commit()
+        if not claimed:
+            return []
+        return db.session.execute(
+            select(OutboundEmail).where(OutboundEmail.id.in_(claimed))
+            .order_by(OutboundEmail.next_attempt_at, OutboundEmail.id)
+        ).scalars().all()
+
+    @staticmethod
+    def deliver_batch(limit: Optional[int] = None) -> Dict[str, int]:
+        """
+        Claim and send one batch over a single SMTP connection.
+
+        Returns:
+            Counts of 'sent', 'retry' and 'dead' emails (all zero when nothing was due).
+        """
+        counts = {'sent': 0, 'retry': 0, 'dead': 0}
+        emails = MailService.claim_batch(limit)
+        if not emails:
+            return counts
+
+        mail_state = current_app.extensions['mail']
+        connection: Any = None
+        try:
+            for position, email in enumerate(emails):
+                try:
+                    if connection is None:
+                        connection = mail_state.connect()
+                        connection.__enter__()
+                    connection.send(Message(email.subject, sender=email.sender, recipients=email.recipient_list,
+                                            body=email.body, html=email.html))
+                except MESSAGE_ERRORS as e:
+                    counts[MailService._record_failure(email, e)] += 1
+                    continue
+                except Exception as e:
+                    # The connection is unusable (server down, timeout, auth): hand the rest back uncounted
+                    logger.warning(f"SMTP connection failed, releasing {len(emails) - position} emails: {e}")
+                    counts['retry'] += MailService._release(emails[position:], e)
+                    MailService._close(connection)
+                    connection = None
+                    break
+                email.status = OutboundEmail.STATUS_SENT
+                email.sent_at = _utcnow()
+                email.last_error = None
+                db.session.commit()
+                metrics.inc('mail_outbox_deliveries_total', {'result': 'sent'})
+                counts['sent'] += 1
+        finally:
+            MailService._close(connection)
+
+        logger.info(f"Mail outbox batch: {counts['sent']} sent, {counts['retry']} to retry, {counts['dead']} dead")
+        return counts
+
+    @staticmethod
+    def _record_failure(email: OutboundEmail, error: Exception) -> str:
+        """Schedule a retry with exponential backoff, or mark the email dead. Returns the result."""
+        config = current_app.config
+        email.last_error = f"{type(error).__name__}: {error}"[:2000]
+        if email.attempts >= config.get('MAIL_OUTBOX_MAX_ATTEMPTS', 8):
+            email.status = OutboundEmail.STATUS_DEAD
+            result = 'dead'
+            logger.error(f"Giving up on email {email.id} to {email.recipients} after "
+                         f"{email.attempts} attempts: {email.last_error}")
+        else:
+            delay = min(config.get('MAIL_OUTBOX_RETRY_BASE_SECONDS', 30) * 2 ** (email.attempts - 1),
+                        config.get('MAIL_OUTBOX_RETRY_MAX_SECONDS', 3600))
+            # Up to 10% jitter so a backlog from one outage does not retry in lockstep
+            delay += random.uniform(0, delay / 10)
+            email.status = OutboundEmail.STATUS_PENDING
+            email.next_attempt_at = _utcnow() + timedelta(seconds=delay)
+            result = 'retry'
+            logger.warning(f"Email {email.id} attempt {email.attempts} failed, retrying in {delay:.0f}s: "
+                           f"{email.last_error}")
+        db.session.commit()
+        metrics.inc('mail_outbox_deliveries_total', {'result': result})
+        return result
+
+    @staticmethod
+    def _release(emails: List[OutboundEmail], error: Exception) -> int:
+        """
+        Return claimed emails to the queue without counting the attempt claim_batch recorded.
+
+        Used when the SMTP connection fails, which says nothing about the
+        messages themselves, so an outage cannot dead-letter a batch. Each
+        email waits as long as it has already been queued, between
+        MAIL_OUTBOX_RETRY_BASE_SECONDS and MAIL_OUTBOX_RETRY_MAX_SECONDS, so
+        retries back off over a long outage. Returns how many were released.
+        """
+        config = current_app.config
+        now = _utcnow()
+        for email in emails:
+            created_at = email.created_at
+            if created_at.tzinfo is None:
+                created_at = created_at.replace(tzinfo=timezone.utc)
+            delay = min(max(config.get('MAIL_OUTBOX_RETRY_BASE_SECONDS', 30), (now - created_at).total_seconds()),
+                        config.get('MAIL_OUTBOX_RETRY_MAX_SECONDS', 3600))
+            delay += random.uniform(0, delay / 10)
+            email.attempts = max(0, email.attempts - 1)
+            email.status = OutboundEmail.STATUS_PENDING
+            email.next_attempt_at = now + timedelta(seconds=delay)
+            email.last_error = f"{type(error).__name__}: {error}"[:2000]
+        db.session.commit()
+        metrics.inc('mail_outbox_deliveries_total', {'result': 'retry'}, len(emails))
+        return len(emails)
+
+    @staticmethod
+    def _close(connection: Any) -> None:
+        if connection is None:
+            return
+        try:
+            connection.__exit__(None, None, None)
+        except Exception as e:
+            logger.debug(f"Error closing SMTP connection: {e}")
+
+    @staticmethod
+    def requeue_dead() -> int:
+        """Give every dead email a fresh set of attempts. Returns how many were requeued."""
+        result = db.session.execute(
+            update(OutboundEmail).where(OutboundEmail.status == OutboundEmail.STATUS_DEAD)
+            .values(status=OutboundEmail.STATUS_PENDING, attempts=0, next_attempt_at=_utcnow())
+        )
+        db.session.commit()
+        return result.rowcount
+
+    @staticmethod
+    def purge_sent(older_than_days: int) -> int:
+        """Delete sent emails older than `older_than_days`. Returns how many were deleted."""
+        result = db.session.execute(
+            delete(OutboundEmail).where(OutboundEmail.status == OutboundEmail.STATUS_SENT,
+                                        OutboundEmail.sent_at < _utcnow() - timedelta(days=older_than_days))
+        )
+        db.session.commit()
+        return result.rowcount
+
+    @staticmethod
+    def queue_stats() -> Dict[str, int]:
+        """Number of outbox rows per status."""
+        rows = db.session.execute(
+            select(OutboundEmail.status, func.count()).group_by(OutboundEmail.status)
+        ).all()
+        return {status: count for status, count in rows}
@@ -0,0 +1,229 @@
+import csv
+import io
+from decimal import Decimal
+from itertools import islice
+from typing import Any, Callable, Dict, IO, Iterator, List, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import insert, select
+
+from app.models import db, Product, StockMovement
+from app.product_lookup import invalidate_product_lookup
+from app.services.inventory_summary_service import InventorySummaryService
+from app.services.product_service import ProductService
+
+IMPORT_COLUMNS = ('name', 'sku', 'description', 'price', 'stock_level', 'low_stock_threshold')
+NAME_MAX_LENGTH = 100
+SKU_MAX_LENGTH = 50
+
+
+class ProductImportService:
+    """
+    Streams a product CSV into the catalog in chunks.
+
+    Each chunk is validated in Python, checked for existing SKUs with one
+    IN query, inserted with a single executemany (COPY on PostgreSQL) and
+    committed, so memory stays flat and a bad chunk never undoes earlier ones.
+    """
+
+    @staticmethod
+    def import_csv(stream: IO[str], chunk_size: Optional[int] = None,
+                   error_stream: Optional[IO[str]] = None,
+                   progress: Optional[Callable[[Dict[str, int]], None]] = None,
+                   upsert: bool = False) -> Dict[str, int]:
+        """
+        Import products from a CSV text stream with a header row.
+
+        Args:
+            stream: Text stream of CSV data. Columns: name, sku, description,
+                price, stock_level, low_stock_threshold (description and the
+                numeric columns are optional).
+            chunk_size: Rows per chunk; defaults to PRODUCT_IMPORT_CHUNK_SIZE.
+            error_stream: Optional text stream that receives rejected rows as
+                CSV with their line number and error message.
+            progress: Optional callback invoked after each chunk with the
+                running totals.
+            upsert: Update products whose SKU already exists instead of
+                rejecting them (see ProductService.bulk_upsert). Empty cells
+                keep the stored value.
+
+        Returns:
+            A dict with 'rows', 'imported' and 'rejected' counts; in upsert
+            mode also 'inserted', 'updated' and 'unchanged', and 'imported'
+            counts the rows that were written.
+        """
+        chunk_size = chunk_size or current_app.config.get('PRODUCT_IMPORT_CHUNK_SIZE', 1000)
+        reader = csv.DictReader(stream)
+        error_writer = None
+        if error_stream is not None:
+            error_writer = csv.writer(error_stream)
+            error_writer.writerow(('line',) + IMPORT_COLUMNS + ('error',))
+
+        totals = {'rows': 0, 'imported': 0, 'rejected': 0}
+        if upsert:
+            totals.update(inserted=0, updated=0, unchanged=0)
+        seen_skus: set = set()
+        for chunk in ProductImportService._chunks(reader, chunk_size):
+            if upsert:
+                written, rejected = ProductImportService._upsert_chunk(chunk, seen_skus, totals)
+            else:
+                written, rejected = ProductImportService._import_chunk(chunk, seen_skus)
+
+            totals['rows'] += len(chunk)
+            totals['imported'] += written
+            totals['rejected'] += len(rejected)
+            if error_writer is not None:
+                for line, row, error in sorted(rejected, key=lambda r: r[0]):
+                    error_writer.writerow((line,) + tuple(row.get(c) or '' for c in IMPORT_COLUMNS) + (error,))
+            if progress is not None:
+                progress(dict(totals))
+
+        return totals
+
+    @staticmethod
+    def _import_chunk(chunk: List[Tuple[int, Dict[str, Any]]], seen_skus: set
+                      ) -> Tuple[int, List[Tuple[int, Dict[str, Any], str]]]:
+        """Validate, insert and commit one chunk. Returns the number inserted and the rejects."""
+        valid, rejected = ProductImportService._validate_chunk(chunk, seen_skus)
+        if not valid:
+            return 0, rejected
+        try:
+            ProductImportService._insert_chunk(valid)
+            db.session.commit()
+            invalidate_product_lookup()
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"Product import chunk failed: {e}", exc_info=True)
+            rejected.extend((line, row, "Database error while inserting this chunk.") for line, row in valid)
+            return 0, rejected
+        return len(valid), rejected
+
+    @staticmethod
+    def _upsert_chunk(chunk: List[Tuple[int, Dict[str, Any]]], seen_skus: set, totals: Dict[str, int]
+                      ) -> Tuple[int, List[Tuple[int, Dict[str, Any], str]]]:
+        """Upsert one chunk through ProductService.bulk_upsert. Returns the number written and the rejects."""
+        rejected: List[Tuple[int, Dict[str, Any], str]] = []
+        pending: List[Tuple[int, Dict[str, Any]]] = []
+        for line, raw in chunk:
+            sku = (raw.get('sku') or '').strip()
+            if sku and sku in seen_skus:
+                rejected.append((line, raw, "sku: Duplicate SKU in this file."))
+                continue
+            seen_skus.add(sku)
+            pending.append((line, raw))
+
+        # Blank cells are left out so the stored value is kept
+        rows = [{c: (raw.get(c) or '').strip() for c in IMPORT_COLUMNS if (raw.get(c) or '').strip()}
+                for _, raw in pending]
+        result = ProductService.bulk_upsert(rows, chunk_size=len(rows) or 1)
+        for index, errors in result['errors'].items():
+            line, raw = pending[index]
+            rejected.append((line, raw, "; ".join(f"{k}: {v}" for k, v in errors.items())))
+        for key in ('inserted', 'updated', 'unchanged'):
+            totals[key] += result[key]
+        return result['inserted'] + result['updated'], rejected
+
+    @staticmethod
+    def _chunks(reader: csv.DictReader, size: int) -> Iterator[List[Tuple[int, Dict[str, Any]]]]:
+        """Yield lists of (line number, row) pairs of at most `size` rows."""
+        numbered = ((reader.line_num, row) for row in reader)
+        while True:
+            chunk = list(islice(numbered, size))
+            if not chunk:
+                return
+            yield chunk
+
+    @staticmethod
+    def _validate_chunk(chunk: List[Tuple[int, Dict[str, Any]]], seen_skus: set
+                        ) -> Tuple[List[Tuple[int, Dict[str, Any]]], List[Tuple[int, Dict[str, Any], str]]]:
+        """Split a chunk into insertable rows and (line, row, error) rejects."""
+        valid: List[Tuple[int, Dict[str, Any]]] = []
+        rejected: List[Tuple[int, Dict[str, Any], str]] = []
+
+        for line, raw in chunk:
+            row = {c: (raw.get(c) or '').strip() for c in IMPORT_COLUMNS}
+            # Missing optional numeric columns fall back to the create_product defaults
+            data = {c: v for c, v in row.items() if v != '' or c in ('name', 'sku')}
+            errors = ProductService._validate_product_format(data)
+            if len(row['name']) > NAME_MAX_LENGTH:
+                errors['name'] = f"Name must be at most {NAME_MAX_LENGTH} characters."
+            if len(row['sku']) > SKU_MAX_LENGTH:
+                errors['sku'] = f"SKU must be at most {SKU_MAX_LENGTH} characters."
+            if not errors and row['sku'] in seen_skus:
+                errors['sku'] = "Duplicate SKU in this file."
+            if errors:
+                rejected.append((line, raw, "; ".join(f"{k}: {v}" for k, v in errors.items())))
+                continue
+            seen_skus.add(row['sku'])
+            valid.append((line, row))
+
+        if valid:
+            existing = set(db.session.execute(
+                select(Product.sku).where(Product.sku.in_([row['sku'] for _, row in valid]))
+            ).scalars())
+            if existing:
+                rejected.extend(
+                    (line, row, "sku: This SKU is already in use by another product.")
+                    for line, row in valid if row['sku'] in existing
+                )
+                valid = [(line, row) for line, row in valid if row['sku'] not in existing]
+
+        return valid, rejected
+
+    @staticmethod
+    def _insert_chunk(valid: List[Tuple[int, Dict[str, Any]]]) -> None:
+        """Insert a validated chunk plus its ledger entries and summary delta. Does not commit."""
+        records = [{
+            'name': row['name'],
+            'sku': row['sku'],
+            'description': row['description'],
+            'price': Decimal(row['price'] or '0'),
+            'stock_level': int(row['stock_level'] or 0),
+            'low_stock_threshold': int(row['low_stock_threshold'] or 0),
+        } for _, row in valid]
+
+        if not (db.engine.dialect.name == 'postgresql' and ProductImportService._copy_records(records)):
+            db.session.execute(insert(Product), records)
+
+        ids = dict(db.session.execute(
+            select(Product.sku, Product.id).where(Product.sku.in_([r['sku'] for r in records]))
+        ).all())
+        movements = [{
+            'product_id': ids[r['sku']],
+            'delta': r['stock_level'],
+            'reason': StockMovement.REASON_INITIAL,
+        } for r in records if r['stock_level']]
+        if movements:
+            db.session.execute(insert(StockMovement), movements)
+
+        InventorySummaryService.apply_change(None, InventorySummaryService.combine([
+            InventorySummaryService.contribution(r['price'], r['stock_level'], r['low_stock_threshold'])
+            for r in records
+        ]))
+
+    @staticmethod
+    def _copy_records(records: List[Dict[str, Any]]) -> bool:
+        """
+        Load records with PostgreSQL COPY through the session's connection.
+
+        Returns:
+            False if the driver has no copy_expert (non-psycopg2), so the
+            caller can fall back to executemany.
+        """
+        cursor = db.session.connection().connection.cursor()
+        if not hasattr(cursor, 'copy_expert'):
+            cursor.close()
+            return False
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for r in records:
+            writer.writerow(tuple(r[c] for c in IMPORT_COLUMNS))
+        buffer.seek(0)
+        try:
+            cursor.copy_expert(
+                f"COPY product ({', '.join(IMPORT_COLUMNS)}) FROM STDIN WITH (FORMAT csv)", buffer
+            )
+        finally:
+            cursor.close()
+        return True
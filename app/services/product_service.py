@@ -1,28 +1,53 @@
-from app.models import db, Product
-from typing import Dict, Any, Tuple, Optional
+from app.models import db, Product, StockMovement
+from app.services.inventory_service import InventoryService
+from app.services.inventory_summary_service import InventorySummaryService
+from app.models.product_search import SEARCH_VECTOR_SQL, FTS_TABLE
+from app.product_lookup import index_product, unindex_product, invalidate_product_lookup
+from app.product_cache import get_product_cache, mark_products_changed
+from app.utils.pagination import KeysetPage, SearchPage, encode_cursor, decode_cursor
+from typing import Dict, Any, Tuple, Optional, Iterable, List
 from decimal import Decimal, InvalidOperation
+from datetime import datetime, timezone
+from itertools import islice
+from flask import current_app
+from sqlalchemy import tuple_, select, insert, update, bindparam, or_, and_, func, literal_column, column, table
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import load_only
+import hashlib
 import logging
+import re
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Columns a bulk upsert writes; the SKU is the conflict key
+UPSERT_FIELDS = ('name', 'description', 'price', 'stock_level', 'low_stock_threshold')
+UPSERT_DEFAULTS = {'description': '', 'price': Decimal('0'), 'stock_level': 0, 'low_stock_threshold': 0}
+
+# Product columns exposed by the API and selectable with ?fields=
+PRODUCT_FIELDS = ('id', 'name', 'sku', 'description', 'price', 'stock_level', 'low_stock_threshold')
+
+# Search terms are runs of letters and digits; everything else separates them
+SEARCH_TERM_RE = re.compile(r'[^\W_]+')
+SEARCH_MAX_TERMS = 8
+# bm25 column weights for the SQLite FTS table: name, sku, description
+FTS_WEIGHTS = (10.0, 10.0, 1.0)
+
 
 
 class ProductService:
 
      # --- Validate Product Data --- 
     @staticmethod
-    def validate_product_data(product_data: Dict[str, Any], product_id: Optional[int] = None) -> Dict[str, str]:
-        """
-        Validates raw product data.
-
-        Args:
-            data: A dictionary containing product attributes (potentially strings).
+    def _validate_product_format(product_data: Dict[str, Any], product_id: Optional[int] = None) -> Dict[str, str]:
+        """Validate presence and numeric format rules, no DB access."""
+        errors = ProductService._validate_required_fields(product_data, product_id=product_id)
+        errors.update(ProductService._validate_numeric_fields(product_data))
+        return errors
 
-        Returns:
-            A dictionary of validation errors, empty if valid.
-            Keys are field names, values are error messages.
-        """
+    @staticmethod
+    def _validate_required_fields(product_data: Dict[str, Any], product_id: Optional[int] = None) -> Dict[str, str]:
+        """Name and SKU must be given for a new product and may not be blanked by an update."""
         errors: Dict[str, str] = {}
 
         if product_id is None:
@@ -35,6 +60,13 @@ class ProductService:
         elif product_data.get('sku') == '': 
              errors['sku'] = "SKU cannot be empty."
 
+        return errors
+
+    @staticmethod
+    def _validate_numeric_fields(product_data: Dict[str, Any]) -> Dict[str, str]:
+        """Price, stock level and threshold, when present, must be non-negative numbers."""
+        errors: Dict[str, str] = {}
+
         # --- Numeric Fields ---
         numeric_fields = {
             'price': "Price must be a valid number.",
@@ -62,6 +94,22 @@ class ProductService:
                              errors[field] = f"{field.capitalize()} cannot be negative."
                 except (InvalidOperation, ValueError, TypeError):
                     errors[field] = error_message
+
+        return errors
+
+    @staticmethod
+    def validate_product_data(product_data: Dict[str, Any], product_id: Optional[int] = None) -> Dict[str, str]:
+        """
+        Validates raw product data.
+
+        Args:
+            data: A dictionary containing product attributes (potentially strings).
+
+        Returns:
+            A dictionary of validation errors, empty if valid.
+            Keys are field names, values are error messages.
+        """
+        errors = ProductService._validate_product_format(product_data, product_id=product_id)
             
         # --- SKU Uniqueness Check -- 
         sku = product_data.get('sku')
@@ -109,7 +157,11 @@ class ProductService:
                 low_stock_threshold=low_stock_threshold
             )
             db.session.add(product)
+            db.session.flush() # Assigns product.id for the opening ledger entry
+            InventoryService.record_movement(product.id, stock_level, StockMovement.REASON_INITIAL)
+            InventorySummaryService.apply_change(None, InventorySummaryService.snapshot(product))
             db.session.commit()
+            index_product(product)
             logger.info(f"Product created successfully: {product.sku}")
             return product, {} # Return product and empty error dict on success
 
@@ -125,17 +177,219 @@ class ProductService:
     
     @staticmethod
     def get_product_by_id(product_id: int) -> Optional[Product]:
-         """Gets a product by its ID using the efficient 'get' method."""
+         """
+         Gets a product by its ID, served from the product cache when possible.
+
+         For reads only: a cached row may lag another worker's write by up to
+         PRODUCT_CACHE_TTL seconds, so write paths load the row themselves.
+         """
 
          logger.debug(f"Attempting to retrieve product with ID: {product_id}")
-         product = db.session.get(Product, product_id)
+         cache = get_product_cache()
+         product = cache.load(product_id) if cache is not None else db.session.get(Product, product_id)
          if product:
              logger.debug(f"Product found: {product.sku}")
          else:
              logger.debug(f"Product with ID {product_id} not found.")
          return product
 
-    
+
+
+    @staticmethod
+    def get_products_page(after: Optional[str] = None, before: Optional[str] = None,
+                          per_page: Optional[int] = None) -> KeysetPage:
+        """
+        Returns one page of products ordered by (name, id) using keyset pagination.
+
+        The page boundary is expressed as a row-value comparison against the
+        (name, id) index, so deep pages cost the same as the first one.
+
+        Args:
+            after: Cursor of the last row of the previous page (walk forward).
+            before: Cursor of the first row of the next page (walk backward).
+            per_page: Page size; defaults to PRODUCTS_PER_PAGE and is capped
+                at PRODUCTS_MAX_PER_PAGE.
+
+        Returns:
+            A KeysetPage with the items and the next/prev cursors.
+        """
+        return ProductService._keyset_page(select(Product), after, before, per_page, scalars=True)
+
+    @staticmethod
+    def get_product_rows_page(fields: Iterable[str], after: Optional[str] = None, before: Optional[str] = None,
+                              per_page: Optional[int] = None) -> KeysetPage:
+        """
+        Like get_products_page, but selects only `fields` (plus the name/id
+        sort key) and returns Core rows instead of Product objects, so large
+        pages skip ORM identity-map and object construction costs.
+        """
+        table = Product.__table__
+        columns = list(dict.fromkeys(['id', 'name', *fields]))
+        stmt = select(*(table.c[name] for name in columns)).where(table.c.archived_at.is_(None))
+        return ProductService._keyset_page(stmt, after, before, per_page, scalars=False)
+
+    @staticmethod
+    def _keyset_page(stmt: Any, after: Optional[str], before: Optional[str], per_page: Optional[int],
+                     scalars: bool) -> KeysetPage:
+        """Apply the (name, id) keyset window to `stmt` and build the page; rows must expose .name and .id."""
+        default_size = current_app.config.get('PRODUCTS_PER_PAGE', 50)
+        max_size = current_app.config.get('PRODUCTS_MAX_PER_PAGE', 200)
+        per_page = max(1, min(per_page or default_size, max_size))
+
+        after_key = decode_cursor(after)
+        before_key = decode_cursor(before) if after_key is None else None
+        sort_key = tuple_(Product.name, Product.id)
+
+        if before_key is not None:
+            stmt = stmt.where(sort_key < before_key).order_by(Product.name.desc(), Product.id.desc())
+        else:
+            if after_key is not None:
+                stmt = stmt.where(sort_key > after_key)
+            stmt = stmt.order_by(Product.name, Product.id)
+
+        # Fetch one extra row to know whether another page exists
+        result = db.session.execute(stmt.limit(per_page + 1))
+        rows = list(result.scalars().all() if scalars else result.all())
+        has_more = len(rows) > per_page
+        items = rows[:per_page]
+
+        if before_key is not None:
+            items.reverse()
+            has_next, has_prev = True, has_more
+        else:
+            has_next, has_prev = has_more, after_key is not None
+
+        page = KeysetPage(items=items, per_page=per_page)
+        if items:
+            if has_next:
+                page.next_cursor = encode_cursor(items[-1].name, items[-1].id)
+            if has_prev:
+                page.prev_cursor = encode_cursor(items[0].name, items[0].id)
+        elif before_key is not None:
+            # Walked back past the start; let the caller resume from the cursor
+            page.next_cursor = before
+        elif after_key is not None:
+            # Walked off the end; the cursor itself leads back to the last page
+            page.prev_cursor = after
+        return page
+
+    @staticmethod
+    def get_product_fields(product_id: int, fields: Iterable[str]) -> Optional[Product]:
+        """Load one product with only `fields` populated (load_only); other attributes load on access."""
+        columns = [getattr(Product, name) for name in dict.fromkeys(['id', *fields])]
+        return db.session.execute(
+            select(Product).options(load_only(*columns)).where(Product.id == product_id)
+        ).scalar_one_or_none()
+
+    @staticmethod
+    def get_products_by_skus(skus: Iterable[str], fields: Optional[Iterable[str]] = None,
+                             chunk_size: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Resolve many SKUs at once with chunked IN queries on the unique sku index.
+
+        Args:
+            skus: SKUs to look up; duplicates are resolved once.
+            fields: If given, only these columns are selected and each hit
+                is a plain dict (Core rows, no ORM objects or identity map).
+                Otherwise hits are Product objects.
+            chunk_size: SKUs per IN query; defaults to PRODUCT_BATCH_CHUNK_SIZE.
+
+        Returns:
+            A dict keyed by every requested SKU, in request order; SKUs
+            with no product map to None.
+        """
+        return ProductService._get_products_by_column('sku', skus, fields, chunk_size)
+
+    @staticmethod
+    def get_products_by_ids(ids: Iterable[int], fields: Optional[Iterable[str]] = None,
+                            chunk_size: Optional[int] = None) -> Dict[int, Any]:
+        """Like get_products_by_skus, keyed by product id."""
+        return ProductService._get_products_by_column('id', ids, fields, chunk_size)
+
+    @staticmethod
+    def _get_products_by_column(key: str, values: Iterable[Any], fields: Optional[Iterable[str]],
+                                chunk_size: Optional[int]) -> Dict[Any, Any]:
+        chunk_size = chunk_size or current_app.config.get('PRODUCT_BATCH_CHUNK_SIZE', 500)
+        found: Dict[Any, Any] = dict.fromkeys(values)
+        pending = iter(list(found))
+
+        table = Product.__table__
+        if fields is None:
+            stmt = select(Product)
+        else:
+            stmt = select(*(table.c[name] for name in dict.fromkeys([key, *fields]))).where(
+                table.c.archived_at.is_(None))
+
+        while True:
+            chunk = list(islice(pending, chunk_size))
+            if not chunk:
+                break
+            result = db.session.execute(stmt.where(table.c[key].in_(chunk)))
+            if fields is None:
+                for product in result.scalars():
+                    found[getattr(product, key)] = product
+            else:
+                for row in result:
+                    found[row._mapping[key]] = row._asdict()
+        return found
+
+    @staticmethod
+    def search(query: Optional[str], page: int = 1, per_page: Optional[int] = None) -> SearchPage:
+        """
+        Full-text search over product name, SKU and description.
+
+        Every term must match, as a word prefix ("wid 12" finds "Widget
+        1200"). Results are ranked by relevance, name and SKU hits above
+        description hits, and served from the full-text index: a GIN
+        tsvector index on PostgreSQL, the FTS5 table on SQLite. Other
+        databases fall back to unindexed ILIKE matching ordered by name.
+
+        Args:
+            query: The user's search text.
+            page: 1-based page number.
+            per_page: Page size; defaults to PRODUCTS_PER_PAGE and is capped
+                at PRODUCTS_MAX_PER_PAGE.
+
+        Returns:
+            A SearchPage. No total is counted (that would scan every match);
+            has_next comes from fetching one extra row.
+        """
+        default_size = current_app.config.get('PRODUCTS_PER_PAGE', 50)
+        max_size = current_app.config.get('PRODUCTS_MAX_PER_PAGE', 200)
+        per_page = max(1, min(per_page or default_size, max_size))
+        page = max(1, page or 1)
+        result = SearchPage(query=(query or '').strip(), page=page, per_page=per_page)
+
+        terms = [t.lower() for t in SEARCH_TERM_RE.findall(query or '')][:SEARCH_MAX_TERMS]
+        if not terms:
+            return result
+
+        dialect = db.engine.dialect.name
+        if dialect == 'postgresql':
+            vector = literal_column(SEARCH_VECTOR_SQL)
+            ts_query = func.to_tsquery('simple', ' & '.join(f"{t}:*" for t in terms))
+            stmt = (select(Product)
+                    .where(vector.op('@@')(ts_query))
+                    .order_by(func.ts_rank_cd(vector, ts_query).desc(), Product.id))
+        elif dialect == 'sqlite':
+            fts = table(FTS_TABLE, column('rowid'))
+            # Quoted so words like AND/NOT/NEAR are searched for, not parsed as operators
+            match = ' '.join(f'"{t}"*' for t in terms)
+            stmt = (select(Product)
+                    .join(fts, fts.c.rowid == Product.id)
+                    .where(literal_column(FTS_TABLE).op('MATCH')(match))
+                    .order_by(func.bm25(literal_column(FTS_TABLE), *FTS_WEIGHTS), Product.id))
+        else:
+            stmt = (select(Product)
+                    .where(and_(*(or_(Product.name.ilike(f"%{t}%"), Product.sku.ilike(f"%{t}%"),
+                                      Product.description.ilike(f"%{t}%")) for t in terms)))
+                    .order_by(Product.name, Product.id))
+
+        rows = db.session.execute(stmt.limit(per_page + 1).offset((page - 1) * per_page)).scalars().all()
+        result.items = rows[:per_page]
+        result.has_next = len(rows) > per_page
+        return result
+
     @staticmethod
     def update_product(product_id: int, product_data: Dict[str, Any]) -> Tuple[Optional[Product], Dict[str, str]]:
         """
@@ -149,7 +403,8 @@ class ProductService:
             A tuple containing (Updated Product object or None, dictionary of errors).
         """
         logger.info(f"Attempting to update product ID: {product_id} with data: {product_data}")
-        product = ProductService.get_product_by_id(product_id)
+        # Fresh from the database: the ledger and summary deltas are computed from these values
+        product = db.session.get(Product, product_id, populate_existing=True)
         if not product:
             logger.warning(f"Update failed: Product with ID {product_id} not found.")
             return None, {'_system': 'Product not found'}
@@ -162,6 +417,7 @@ class ProductService:
 
         # Update attributes if they are present in the data dictionary
         updated = False
+        before = InventorySummaryService.snapshot(product)
         try:
             if 'name' in product_data and product.name != product_data['name']:
                 product.name = product_data['name']
@@ -180,6 +436,9 @@ class ProductService:
             if 'stock_level' in product_data:
                 new_stock = int(product_data['stock_level'])
                 if product.stock_level != new_stock:
+                    InventoryService.record_movement(
+                        product_id, new_stock - product.stock_level, StockMovement.REASON_CORRECTION
+                    )
                     product.stock_level = new_stock
                     updated = True
             if 'low_stock_threshold' in product_data:
@@ -193,7 +452,9 @@ class ProductService:
                  return product, {} # No changes, return success but indicate no update needed
 
             db.session.add(product) # Add the modified object to the session
+            InventorySummaryService.apply_change(before, InventorySummaryService.snapshot(product))
             db.session.commit()
+            index_product(product)
             logger.info(f"Product updated successfully: {product.sku} (ID: {product_id})")
             return product, {}
 
@@ -206,25 +467,231 @@ class ProductService:
             logger.error(f"Database error during product update ID {product_id}: {e}", exc_info=True)
             return None, {'_database': "A database error occurred while updating the product."}
 
-    # Add other necessary service methods, e.g., delete_product, get_all_products...
-    # @staticmethod
-    # def delete_product(product_id: int) -> bool:
-    #     """Deletes a product by ID. Returns True on success, False otherwise."""
-    #     product = ProductService.get_product_by_id(product_id)
-    #     if product:
-    #         try:
-    #             db.session.delete(product)
-    #             db.session.commit()
-    #             logger.info(f"Product deleted successfully: ID {product_id}")
-    #             return True
-    #         except Exception as e:
-    #             db.session.rollback()
-    #             logger.error(f"Database error deleting product ID {product_id}: {e}", exc_info=True)
-    #             return False
-    #     else:
-    #         logger.warning(f"Delete failed: Product ID {product_id} not found.")
-    #         return False
-    
-   
-        
-   
\ No newline at end of file
+    @staticmethod
+    def delete_product(product_id: int) -> bool:
+        """
+        Deletes a product by ID. Returns True on success, False otherwise.
+
+        The row is archived rather than removed, so its stock ledger and
+        snapshots stay intact for auditing; it disappears from every
+        listing, lookup and total, and its SKU can be reused.
+        """
+        product = db.session.get(Product, product_id, populate_existing=True)
+        if product:
+            try:
+                before = InventorySummaryService.snapshot(product)
+                product.archived_at = datetime.now(timezone.utc)
+                InventorySummaryService.apply_change(before, None)
+                db.session.commit()
+                unindex_product(product_id)
+                logger.info(f"Product deleted successfully: ID {product_id}")
+                return True
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Database error deleting product ID {product_id}: {e}", exc_info=True)
+                return False
+        else:
+            logger.warning(f"Delete failed: Product ID {product_id} not found.")
+            return False
+
+    @staticmethod
+    def bulk_upsert(rows: Iterable[Dict[str, Any]], chunk_size: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Inserts or updates products keyed on SKU, e.g. for a nightly catalog sync.
+
+        Each chunk is compared against the stored rows with one IN query;
+        rows whose field hash matches what is stored are skipped, and the
+        rest are written with one INSERT ... ON CONFLICT (sku) DO UPDATE
+        (PostgreSQL and SQLite) or an insert/update executemany pair on other
+        databases. Stock changes are recorded in the ledger and the summary
+        row is updated once per chunk. Each chunk is committed on its own.
+
+        Args:
+            rows: Product dicts; 'sku' is required, 'name' only for new SKUs.
+                Fields left out of a row keep their stored values.
+            chunk_size: Rows per chunk; defaults to PRODUCT_IMPORT_CHUNK_SIZE.
+
+        Returns:
+            A dict with 'inserted', 'updated', 'unchanged' and 'rejected'
+            counts, plus 'errors' mapping each rejected row's position in
+            `rows` to its dictionary of errors.
+        """
+        chunk_size = chunk_size or current_app.config.get('PRODUCT_IMPORT_CHUNK_SIZE', 1000)
+        result: Dict[str, Any] = {'inserted': 0, 'updated': 0, 'unchanged': 0, 'rejected': 0, 'errors': {}}
+        seen_skus: set = set()
+        numbered = enumerate(rows)
+
+        while True:
+            chunk = list(islice(numbered, chunk_size))
+            if not chunk:
+                break
+
+            records: List[Tuple[int, Dict[str, Any]]] = []
+            for index, data in chunk:
+                errors = ProductService._validate_upsert_row(data)
+                if not errors and data['sku'] in seen_skus:
+                    errors['sku'] = "Duplicate SKU in this batch."
+                if errors:
+                    result['errors'][index] = errors
+                    continue
+                seen_skus.add(data['sku'])
+                records.append((index, ProductService._normalize_upsert_row(data)))
+
+            if not records:
+                continue
+            try:
+                counts, missing_names = ProductService._upsert_chunk(records)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Database error during product upsert: {e}", exc_info=True)
+                for index, _ in records:
+                    result['errors'][index] = {'_database': "A database error occurred while syncing this chunk."}
+                continue
+
+            for index in missing_names:
+                result['errors'][index] = {'name': "Name is required."}
+            for key, count in counts.items():
+                result[key] += count
+            if counts['inserted'] or counts['updated']:
+                invalidate_product_lookup()
+
+        result['rejected'] = len(result['errors'])
+        logger.info(f"Product upsert finished: {result['inserted']} inserted, {result['updated']} updated, "
+                    f"{result['unchanged']} unchanged, {result['rejected']} rejected")
+        return result
+
+    @staticmethod
+    def _validate_upsert_row(data: Dict[str, Any]) -> Dict[str, str]:
+        """Format checks for one upsert row; a missing name is checked later, once we know the SKU is new."""
+        if not data.get('sku'):
+            return {'sku': "Sku is required."}
+        # Absent fields are allowed, and the SKU is the upsert key, so there is no uniqueness check
+        errors = ProductService._validate_numeric_fields(data)
+        if data.get('name') == '':
+            errors['name'] = "Name cannot be empty."
+        for field in ('name', 'sku'):
+            max_length = Product.__table__.c[field].type.length
+            if data.get(field) and len(str(data[field])) > max_length:
+                errors[field] = f"{field.capitalize()} must be at most {max_length} characters."
+        return errors
+
+    @staticmethod
+    def _normalize_upsert_row(data: Dict[str, Any]) -> Dict[str, Any]:
+        """Convert a validated row to column values, keeping only the fields it provides."""
+        record: Dict[str, Any] = {'sku': str(data['sku'])}
+        for field in UPSERT_FIELDS:
+            if field not in data:
+                continue
+            value = data[field]
+            if field == 'price':
+                value = Decimal(str(value))
+            elif field in ('stock_level', 'low_stock_threshold'):
+                value = int(value)
+            elif value is None:
+                value = ''
+            record[field] = value
+        return record
+
+    @staticmethod
+    def _field_hash(record: Dict[str, Any]) -> str:
+        """Hash the upserted fields of a record, normalized so stored and incoming values compare equal."""
+        parts = [
+            str(Decimal(str(record['price'] or 0)).quantize(Decimal('0.01'))) if field == 'price'
+            else str(record[field] if record[field] is not None else '')
+            for field in UPSERT_FIELDS
+        ]
+        return hashlib.sha1('\x1f'.join(parts).encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _upsert_chunk(records: List[Tuple[int, Dict[str, Any]]]) -> Tuple[Dict[str, int], List[int]]:
+        """
+        Write one validated chunk plus its ledger entries and summary delta. Does not commit.
+
+        Returns:
+            The inserted/updated/unchanged counts and the positions of new
+            SKUs that were skipped because they had no name.
+        """
+        table = Product.__table__
+        stored = {
+            row.sku: row._asdict() for row in db.session.execute(
+                select(table.c.id, table.c.sku, *(table.c[f] for f in UPSERT_FIELDS))
+                .where(table.c.sku.in_([r['sku'] for _, r in records]), table.c.archived_at.is_(None))
+            )
+        }
+
+        counts = {'inserted': 0, 'updated': 0, 'unchanged': 0}
+        missing_names: List[int] = []
+        inserts: List[Dict[str, Any]] = []
+        updates: List[Tuple[Dict[str, Any], Dict[str, Any]]] = []
+        for index, record in records:
+            current = stored.get(record['sku'])
+            if current is None:
+                if not record.get('name'):
+                    missing_names.append(index)
+                    continue
+                inserts.append({**UPSERT_DEFAULTS, **record})
+                continue
+            merged = {**{f: current[f] for f in UPSERT_FIELDS}, **record}
+            if ProductService._field_hash(merged) == ProductService._field_hash(current):
+                counts['unchanged'] += 1
+            else:
+                updates.append((current, merged))
+        counts['inserted'] = len(inserts)
+        counts['updated'] = len(updates)
+
+        changed = inserts + [merged for _, merged in updates]
+        if not changed:
+            return counts, missing_names
+
+        dialect = db.engine.dialect.name
+        if dialect in ('postgresql', 'sqlite'):
+            dialect_insert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+            stmt = dialect_insert(table)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[table.c.sku],
+                index_where=table.c.archived_at.is_(None),
+                set_={f: stmt.excluded[f] for f in UPSERT_FIELDS},
+                # Guards rows that changed to the same values since we read them
+                where=or_(*(table.c[f].is_distinct_from(stmt.excluded[f]) for f in UPSERT_FIELDS)),
+            )
+            db.session.execute(stmt, changed)
+        else:
+            if inserts:
+                db.session.execute(insert(table), inserts)
+            if updates:
+                db.session.execute(
+                    update(table).where(table.c.sku == bindparam('b_sku'), table.c.archived_at.is_(None))
+                    .values({f: bindparam(f'b_{f}') for f in UPSERT_FIELDS}),
+                    [{'b_sku': merged['sku'], **{f'b_{f}': merged[f] for f in UPSERT_FIELDS}}
+                     for _, merged in updates]
+                )
+
+        new_ids = {}
+        if inserts:
+            new_ids = dict(db.session.execute(
+                select(table.c.sku, table.c.id)
+                .where(table.c.sku.in_([r['sku'] for r in inserts]), table.c.archived_at.is_(None))
+            ).all())
+        movements = [{
+            'product_id': new_ids[r['sku']],
+            'delta': r['stock_level'],
+            'reason': StockMovement.REASON_INITIAL,
+        } for r in inserts if r['stock_level']]
+        movements.extend({
+            'product_id': current['id'],
+            'delta': merged['stock_level'] - current['stock_level'],
+            'reason': StockMovement.REASON_CORRECTION,
+        } for current, merged in updates if merged['stock_level'] != current['stock_level'])
+        if movements:
+            db.session.execute(insert(StockMovement), movements)
+
+        def contribution(r: Dict[str, Any]) -> Dict[str, Any]:
+            return InventorySummaryService.contribution(r['price'], r['stock_level'], r['low_stock_threshold'])
+
+        mark_products_changed(current['id'] for current, _ in updates)
+        InventorySummaryService.apply_change(
+            InventorySummaryService.combine([contribution(current) for current, _ in updates]),
+            InventorySummaryService.combine([contribution(r) for r in changed]),
+        )
+        return counts, missing_names
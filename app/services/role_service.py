@@ -1,5 +1,6 @@
 from typing import List, Optional, Tuple
 from app.models import db, Role, Permission
+from app.utils.permission_cache import permission_cache
 from flask import current_app
 
 class RoleService:
@@ -46,6 +47,8 @@ class RoleService:
             # Directly assign the list of Permission objects to the relationship.
             role.permissions = selected_permissions
             db.session.commit()
+            # Any user holding this role may be cached; drop them all
+            permission_cache.invalidate()
             current_app.logger.info(f"Updated permissions for role ID {role_id} ('{role.name}')")
             return role, None # Return updated role and no error
         except Exception as e:
@@ -4,6 +4,7 @@ from app.models.db import db
 from app.models.user import User
 from app.models.oauth import OAuth 
 from app.models.role import Role
+from app.utils.permission_cache import permission_cache
 
 class UserService:
     @staticmethod
@@ -87,6 +88,7 @@ class UserService:
         
         try:
             db.session.commit()
+            permission_cache.invalidate(user_id)
             return user, {}
         except Exception as e:
             db.session.rollback()
@@ -113,6 +115,7 @@ class UserService:
 
             db.session.delete(user)
             db.session.commit()
+            permission_cache.invalidate(user_id)
             current_app.logger.info(f"Successfully deleted user with ID: {user_id}") 
             return True
         except Exception:
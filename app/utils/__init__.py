@@ -1,11 +1,29 @@
 
-from .formatter import format_currency, calculate_inventory_stats
+from .formatter import format_currency, calculate_inventory_stats, stats_from_totals
 from .helpers import generate_sku, get_app_config
+from .pagination import encode_cursor, decode_cursor, KeysetPage, SearchPage
+from .export import iter_csv, iter_ndjson, EXPORT_MIMETYPES
+from .serialization import serialize_response, parse_request_payload, encode_payload
+from .permission_cache import permission_cache, PermissionCache, ResolvedPermissions
 
 __all__ = [ 
     'format_currency', 
     'calculate_inventory_stats',
+    'stats_from_totals',
     'generate_sku',
-    'get_app_config'
+    'get_app_config',
+    'encode_cursor',
+    'decode_cursor',
+    'KeysetPage',
+    'SearchPage',
+    'iter_csv',
+    'iter_ndjson',
+    'EXPORT_MIMETYPES',
+    'serialize_response',
+    'parse_request_payload',
+    'encode_payload',
+    'permission_cache',
+    'PermissionCache',
+    'ResolvedPermissions'
 ]
 
@@ -0,0 +1,61 @@
+import csv
+import io
+import json
+from decimal import Decimal
+from typing import Any, Iterable, Iterator, Sequence
+
+EXPORT_MIMETYPES = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def _json_default(value: Any) -> Any:
+    """Serialize Decimals as strings so money values keep their exact precision."""
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def iter_csv(columns: Sequence[str], rows: Iterable[Sequence[Any]], batch_size: int = 1000) -> Iterator[str]:
+    """Yield CSV text for `rows`, the header first and then `batch_size` rows per chunk.
+
+    Args:
+        columns: Header names, in the same order as the row values.
+        rows: Iterable of row value sequences; consumed lazily.
+        batch_size: Rows buffered before a chunk is yielded.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    # Send the header straight away so the client sees the first byte immediately
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+
+    pending = 0
+    for row in rows:
+        writer.writerow(row)
+        pending += 1
+        if pending >= batch_size:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    if pending:
+        yield buffer.getvalue()
+
+
+def iter_ndjson(columns: Sequence[str], rows: Iterable[Sequence[Any]], batch_size: int = 1000) -> Iterator[str]:
+    """Yield newline-delimited JSON objects keyed by `columns`, `batch_size` rows per chunk."""
+    lines = []
+    first = True
+    for row in rows:
+        lines.append(json.dumps(dict(zip(columns, row)), default=_json_default, separators=(',', ':')))
+        # Flush the first row on its own so the client sees the first byte immediately
+        if first or len(lines) >= batch_size:
+            first = False
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
@@ -68,4 +68,20 @@ def calculate_inventory_stats(products: List[Any]) -> Dict[str, Any]:
         'avg_stock': round(float(avg_stock), 1), 
         'low_stock_count': low_stock_count,
         'out_of_stock_count': out_of_stock_count
-    }
\ No newline at end of file
+    }
+
+
+def stats_from_totals(totals: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the dashboard stats dict from precomputed inventory totals."""
+
+    total_products = int(totals.get('total_products') or 0)
+    total_units = int(totals.get('total_units') or 0)
+    avg_stock = (Decimal(total_units) / Decimal(total_products)) if total_products > 0 else Decimal(0)
+
+    return {
+        'total_products': total_products,
+        'total_value': Decimal(totals.get('total_value') or 0),
+        'avg_stock': round(float(avg_stock), 1),
+        'low_stock_count': int(totals.get('low_stock_count') or 0),
+        'out_of_stock_count': int(totals.get('out_of_stock_count') or 0)
+    }
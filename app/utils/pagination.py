@@ -0,0 +1,59 @@
+import base64
+import json
+from dataclasses import dataclass, field
+from typing import Any, List, Optional, Tuple
+
+
+def encode_cursor(name: str, product_id: int) -> str:
+    """Encode a (name, id) sort key as an opaque, URL-safe cursor string."""
+    raw = json.dumps([name, product_id], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Tuple[str, int]]:
+    """Decode a cursor produced by encode_cursor.
+
+    Returns:
+        The (name, id) tuple, or None if the cursor is missing or malformed.
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        name, product_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        if not isinstance(name, str) or not isinstance(product_id, int):
+            return None
+        return name, product_id
+    except (ValueError, TypeError):
+        return None
+
+
+@dataclass
+class KeysetPage:
+    """A single page of a keyset-paginated result."""
+    items: List[Any] = field(default_factory=list)
+    per_page: int = 0
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self) -> bool:
+        return self.prev_cursor is not None
+
+
+@dataclass
+class SearchPage:
+    """A single page of ranked search results, numbered from 1."""
+    items: List[Any] = field(default_factory=list)
+    query: str = ''
+    page: int = 1
+    per_page: int = 0
+    has_next: bool = False
+
+    @property
+    def has_prev(self) -> bool:
+        return self.page > 1
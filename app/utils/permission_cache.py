@@ -0,0 +1,106 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, FrozenSet, NamedTuple, Optional, Tuple
+
+from flask import current_app, g, has_app_context
+
+
+class ResolvedPermissions(NamedTuple):
+    """The role and permission names a user holds, resolved in one query."""
+    roles: FrozenSet[str]
+    permissions: FrozenSet[str]
+
+
+class PermissionCache:
+    """
+    Two-level cache of ResolvedPermissions keyed by user id.
+
+    The first level lives on `flask.g`, so a request resolves a user's
+    permissions at most once. The optional second level is a bounded LRU in
+    this process, enabled by PERMISSION_CACHE_TTL > 0. Entries in both levels
+    are tagged with a version counter, bumped whenever role permissions
+    change, so one bump invalidates every cached user at once.
+
+    Invalidation is process-local: other workers see the change when their
+    entries expire, so keep the TTL short.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[int, Tuple[int, float, ResolvedPermissions]]' = OrderedDict()
+        self._version = 0
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def init_app(self, app) -> None:
+        """Start every request with an empty per-request level, even if the app context is reused."""
+        app.before_request(self._reset_request_level)
+
+    @staticmethod
+    def _reset_request_level() -> None:
+        g.pop('_resolved_permissions', None)
+
+    def resolve(self, user_id: Optional[int], loader: Callable[[], ResolvedPermissions]) -> ResolvedPermissions:
+        """Return the cached permissions for `user_id`, calling `loader` on a miss."""
+        if user_id is None or not has_app_context():
+            return loader()
+
+        version = self._version
+        per_request: Dict[int, Tuple[int, ResolvedPermissions]] = g.setdefault('_resolved_permissions', {})
+        cached = per_request.get(user_id)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        ttl = current_app.config.get('PERMISSION_CACHE_TTL', 0)
+        value = self._get(user_id, version) if ttl > 0 else None
+        if value is None:
+            value = loader()
+            if ttl > 0:
+                self._put(user_id, version, value, ttl,
+                          current_app.config.get('PERMISSION_CACHE_MAX_ENTRIES', 1024))
+        per_request[user_id] = (version, value)
+        return value
+
+    def invalidate(self, user_id: Optional[int] = None) -> None:
+        """Forget one user's permissions, or everyone's when user_id is None."""
+        with self._lock:
+            if user_id is None:
+                self._version += 1
+                self._entries.clear()
+            else:
+                self._entries.pop(user_id, None)
+        if has_app_context():
+            per_request = g.get('_resolved_permissions')
+            if per_request:
+                if user_id is None:
+                    per_request.clear()
+                else:
+                    per_request.pop(user_id, None)
+
+    def _get(self, user_id: int, version: int) -> Optional[ResolvedPermissions]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            entry_version, expires_at, value = entry
+            if entry_version != version or expires_at <= time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return value
+
+    def _put(self, user_id: int, version: int, value: ResolvedPermissions, ttl: int, max_entries: int) -> None:
+        with self._lock:
+            # A concurrent invalidate() may have bumped the version while we loaded
+            if version != self._version:
+                return
+            self._entries[user_id] = (version, time.monotonic() + ttl, value)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > max_entries:
+                self._entries.popitem(last=False)
+
+
+permission_cache = PermissionCache()
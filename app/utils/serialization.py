@@ -0,0 +1,63 @@
+import json
+from typing import Any, Dict, Optional, Tuple
+
+from flask import Response, request
+
+from .export import _json_default
+
+# Optional fast encoders; the stdlib json module is the fallback
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - depends on the environment
+    msgpack = None
+
+JSON_MIMETYPE = 'application/json'
+MSGPACK_MIMETYPES = ('application/msgpack', 'application/x-msgpack')
+
+
+def negotiate_mimetype() -> str:
+    """Pick the response type from the Accept header: MessagePack if asked for and available, else JSON."""
+    offered = [JSON_MIMETYPE] + (list(MSGPACK_MIMETYPES) if msgpack is not None else [])
+    best = request.accept_mimetypes.best_match(offered, default=JSON_MIMETYPE)
+    # Prefer JSON on a tie (e.g. Accept: */*)
+    if best != JSON_MIMETYPE and request.accept_mimetypes[best] <= request.accept_mimetypes[JSON_MIMETYPE]:
+        return JSON_MIMETYPE
+    return best
+
+
+def encode_payload(payload: Any, mimetype: str) -> bytes:
+    """Encode `payload` as MessagePack or compact JSON; Decimals become strings."""
+    if mimetype in MSGPACK_MIMETYPES:
+        return msgpack.packb(payload, default=_json_default, use_bin_type=True)
+    if orjson is not None:
+        return orjson.dumps(payload, default=_json_default)
+    return json.dumps(payload, default=_json_default, separators=(',', ':')).encode('utf-8')
+
+
+def serialize_response(payload: Any, status: int = 200, headers: Optional[Dict[str, str]] = None) -> Response:
+    """Build a response for `payload` in the format the client accepts."""
+    mimetype = negotiate_mimetype()
+    return Response(encode_payload(payload, mimetype), status=status, mimetype=mimetype, headers=headers)
+
+
+def parse_request_payload() -> Tuple[Any, bool]:
+    """
+    Decode a JSON or MessagePack request body.
+
+    Returns:
+        (payload, ok); ok is False when the body is missing or malformed.
+    """
+    body = request.get_data(cache=False)
+    if not body:
+        return None, False
+    try:
+        if request.mimetype in MSGPACK_MIMETYPES and msgpack is not None:
+            return msgpack.unpackb(body, raw=False), True
+        return (orjson.loads(body) if orjson is not None else json.loads(body)), True
+    except ValueError:
+        return None, False
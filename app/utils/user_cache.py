@@ -0,0 +1,176 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Set, Union
+
+from flask import abort, current_app, has_app_context
+from flask_login import UserMixin, logout_user
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.models.db import db
+from app.models.user import User
+from app.utils.permission_cache import permission_cache
+
+SNAPSHOT_FIELDS = ('id', 'username', 'email', 'first_name', 'last_name', 'is_active', 'last_login')
+
+
+class UserSnapshot(UserMixin):
+    """
+    A logged-in user rebuilt from the cache without touching the database.
+
+    Reads of the snapshot fields and permission checks are served from the
+    cached data. Anything else (password checks, writes, relationships) loads
+    the real User row once and delegates to it for the rest of the request.
+    """
+
+    def __init__(self, data: Dict[str, Any]) -> None:
+        object.__setattr__(self, '_data', data)
+        object.__setattr__(self, '_user', None)
+
+    def get_real_user(self) -> User:
+        """
+        Load (once) and return the User row behind this snapshot.
+
+        If the row is gone (deleted by another worker while this one still
+        had the snapshot cached), the entry is dropped and the request ends
+        as a logged-out one, through the login manager's unauthorized handler.
+        """
+        if self._user is None:
+            user = db.session.get(User, self._data['id'])
+            if user is None:
+                invalidate_user(self._data['id'])
+                logout_user()
+                abort(current_app.login_manager.unauthorized())
+            object.__setattr__(self, '_user', user)
+        return self._user
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith('__'):
+            raise AttributeError(name)
+        if self._user is None and name in self._data:
+            return self._data[name]
+        return getattr(self.get_real_user(), name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(self.get_real_user(), name, value)
+
+    def __repr__(self) -> str:
+        return f'<User {self._data["username"]} (cached)>'
+
+    @property
+    def is_active(self) -> bool:
+        if self._user is not None:
+            return bool(self._user.is_active)
+        return bool(self._data['is_active'])
+
+    @property
+    def resolved_permissions(self):
+        """Cached permissions, unless role permissions changed since the snapshot was taken."""
+        if self._user is None and self._data['permissions_version'] == permission_cache.version:
+            return self._data['permissions']
+        return self.get_real_user().resolved_permissions
+
+    # The User helpers only read attributes the snapshot provides
+    full_name = User.full_name
+    has_role = User.has_role
+    is_admin = User.is_admin
+    has_permission = User.has_permission
+
+
+class UserCache:
+    """
+    Per-app, per-process TTL/LRU cache of user snapshots for the Flask-Login loader.
+
+    Entries are dropped when a session flushes or commits changes to (or
+    deletes) a User, which covers UserService.update_user/delete_user,
+    password changes and logins. Other workers see changes when their
+    entries expire after USER_CACHE_TTL seconds. So a user deactivated,
+    stripped of a role or with a reset password keeps their session on the
+    other workers for up to that long; that is why the cache is off (0)
+    unless a deployment opts in. A deleted user is logged out as soon as a
+    request needs more than the snapshot holds.
+    """
+
+    def __init__(self, ttl: int, max_entries: int) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[int, tuple]' = OrderedDict()
+        # Bumped by every invalidation so a load that raced with one is not cached
+        self._generation = 0
+
+    def load(self, user_id: int) -> Optional[Union[User, UserSnapshot]]:
+        """Return a snapshot for `user_id`, or the User row on a miss (caching its snapshot)."""
+        if self.ttl <= 0:
+            return db.session.get(User, user_id)
+
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(user_id)
+                return UserSnapshot(entry[1])
+            self._entries.pop(user_id, None)
+            generation = self._generation
+
+        user = db.session.get(User, user_id)
+        if user is None:
+            return None
+        data = {field: getattr(user, field) for field in SNAPSHOT_FIELDS}
+        data['permissions_version'] = permission_cache.version
+        data['permissions'] = user.resolved_permissions
+
+        with self._lock:
+            if generation == self._generation:
+                self._entries[user_id] = (time.monotonic() + self.ttl, data)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return user
+
+    def invalidate(self, user_id: Optional[int] = None) -> None:
+        """Forget one user, or every user when user_id is None."""
+        with self._lock:
+            self._generation += 1
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(user_id, None)
+
+    def init_app(self, app) -> None:
+        app.extensions['user_cache'] = self
+
+
+def get_user_cache() -> Optional[UserCache]:
+    """Return the current app's UserCache, if one is installed."""
+    if not has_app_context():
+        return None
+    return current_app.extensions.get('user_cache')
+
+
+def invalidate_user(user_id: Optional[int] = None) -> None:
+    """Drop a user's cached snapshot in the current app (no-op without one)."""
+    cache = get_user_cache()
+    if cache is not None:
+        cache.invalidate(user_id)
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_changed_users(session: Session, flush_context: Any) -> None:
+    changed: Set[int] = session.info.setdefault('changed_user_ids', set())
+    for obj in list(session.dirty) + list(session.deleted):
+        if isinstance(obj, User) and obj.id is not None:
+            changed.add(obj.id)
+            # Drop now as well, so this request never reads its own stale entry
+            invalidate_user(obj.id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_changed_users(session: Session) -> None:
+    # Again after commit, in case another request re-cached the old row meanwhile
+    for user_id in session.info.pop('changed_user_ids', ()):
+        invalidate_user(user_id)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_changed_users(session: Session) -> None:
+    session.info.pop('changed_user_ids', None)
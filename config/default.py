@@ -1,3 +1,4 @@
+import json
 import os 
 
 class Config:
@@ -11,6 +12,88 @@ class Config:
     # --- Other Common Base Settings (Non-Secrets) ---
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Product listing pagination (keyset on name, id)
+    PRODUCTS_PER_PAGE = int(os.environ.get("PRODUCTS_PER_PAGE") or 50)
+    PRODUCTS_MAX_PER_PAGE = int(os.environ.get("PRODUCTS_MAX_PER_PAGE") or 200)
+    # Maximum number of low-stock alerts shown on the dashboard
+    DASHBOARD_LOW_STOCK_ALERTS = 12
+    # Maximum number of items accepted by the batch stock movement endpoint
+    STOCK_BATCH_MAX_ITEMS = int(os.environ.get("STOCK_BATCH_MAX_ITEMS") or 5000)
+    # Rows per chunk for bulk CSV product imports
+    PRODUCT_IMPORT_CHUNK_SIZE = int(os.environ.get("PRODUCT_IMPORT_CHUNK_SIZE") or 1000)
+    # Keys per IN query for batch product lookups, and the most keys one batch-get request may send
+    PRODUCT_BATCH_CHUNK_SIZE = int(os.environ.get("PRODUCT_BATCH_CHUNK_SIZE") or 500)
+    PRODUCT_BATCH_GET_MAX_ITEMS = int(os.environ.get("PRODUCT_BATCH_GET_MAX_ITEMS") or 1000)
+    # Rows fetched per round trip (and flushed per chunk) by streaming report exports
+    REPORT_EXPORT_BATCH_SIZE = int(os.environ.get("REPORT_EXPORT_BATCH_SIZE") or 1000)
+    # Seconds a user's resolved permissions are cached per process; 0 disables
+    # the process cache and leaves only the per-request one
+    PERMISSION_CACHE_TTL = int(os.environ.get("PERMISSION_CACHE_TTL") or 0)
+    PERMISSION_CACHE_MAX_ENTRIES = int(os.environ.get("PERMISSION_CACHE_MAX_ENTRIES") or 1024)
+    # Seconds the login user loader may serve a cached user snapshot; 0 (the default) always reads the row.
+    # Opt in only if a delay is acceptable: invalidation is per process, so a user deactivated or with a reset
+    # password keeps their session on the other workers for up to this long
+    USER_CACHE_TTL = int(os.environ.get("USER_CACHE_TTL") or 0)
+    USER_CACHE_MAX_ENTRIES = int(os.environ.get("USER_CACHE_MAX_ENTRIES") or 4096)
+    # Per-request SQL query counting (Server-Timing header and request log line)
+    SQL_INSTRUMENTATION_ENABLED = os.environ.get("SQL_INSTRUMENTATION_ENABLED", "true").lower() in ("true", "1", "yes")
+    # Statements slower than this many milliseconds are logged with their parameters
+    SQL_SLOW_QUERY_MS = float(os.environ.get("SQL_SLOW_QUERY_MS") or 250)
+    # Prometheus-format request/DB/template metrics served at METRICS_PATH
+    METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "true").lower() in ("true", "1", "yes")
+    METRICS_PATH = os.environ.get("METRICS_PATH") or "/metrics"
+    # Shared directory for aggregating metrics across gunicorn workers; unset keeps them per process
+    METRICS_MULTIPROC_DIR = os.environ.get("METRICS_MULTIPROC_DIR") or os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    METRICS_FLUSH_INTERVAL = float(os.environ.get("METRICS_FLUSH_INTERVAL") or 1.0)
+    # {% cache %} template fragments: 'lru' (in-process), 'redis' (FRAGMENT_CACHE_REDIS_URL) or 'null'
+    FRAGMENT_CACHE_BACKEND = os.environ.get("FRAGMENT_CACHE_BACKEND") or "lru"
+    FRAGMENT_CACHE_REDIS_URL = os.environ.get("FRAGMENT_CACHE_REDIS_URL")
+    FRAGMENT_CACHE_MAX_ENTRIES = int(os.environ.get("FRAGMENT_CACHE_MAX_ENTRIES") or 1024)
+    FRAGMENT_CACHE_DEFAULT_TTL = int(os.environ.get("FRAGMENT_CACHE_DEFAULT_TTL") or 300)
+    # In-process SKU/name typeahead index behind /products/lookup; rebuilt every
+    # PRODUCT_LOOKUP_REFRESH_SECONDS (0: only on demand). It takes roughly 400 bytes per product; above
+    # PRODUCT_LOOKUP_MAX_PRODUCTS it is not built and lookups query the full-text search index instead
+    PRODUCT_LOOKUP_MAX_PRODUCTS = int(os.environ.get("PRODUCT_LOOKUP_MAX_PRODUCTS") or 250000)
+    PRODUCT_LOOKUP_REFRESH_SECONDS = int(os.environ.get("PRODUCT_LOOKUP_REFRESH_SECONDS", 300))
+    PRODUCT_LOOKUP_BACKGROUND = os.environ.get("PRODUCT_LOOKUP_BACKGROUND", "true").lower() in ("true", "1", "yes")
+    PRODUCT_LOOKUP_MAX_RESULTS = 50
+    # Read-through product cache: an in-process LRU whose entries live PRODUCT_CACHE_TTL seconds
+    # (0 disables it) plus an optional tier shared by all workers, 'redis' (PRODUCT_CACHE_REDIS_URL) or 'null'
+    PRODUCT_CACHE_TTL = int(os.environ.get("PRODUCT_CACHE_TTL", 10))
+    PRODUCT_CACHE_MAX_ENTRIES = int(os.environ.get("PRODUCT_CACHE_MAX_ENTRIES") or 10000)
+    PRODUCT_CACHE_BACKEND = os.environ.get("PRODUCT_CACHE_BACKEND") or "null"
+    PRODUCT_CACHE_REDIS_URL = os.environ.get("PRODUCT_CACHE_REDIS_URL")
+    PRODUCT_CACHE_SHARED_TTL = int(os.environ.get("PRODUCT_CACHE_SHARED_TTL") or 300)
+    # Password hashing runs in PASSWORD_HASH_WORKERS processes (0: inline) with at most
+    # PASSWORD_HASH_MAX_PENDING jobs per web process; callers wait PASSWORD_HASH_QUEUE_TIMEOUT
+    # seconds for a slot before getting a 503. Hashes made with another method are upgraded at login
+    PASSWORD_HASH_METHOD = os.environ.get("PASSWORD_HASH_METHOD") or "pbkdf2:sha256:600000"
+    PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", 2))
+    PASSWORD_HASH_MAX_PENDING = int(os.environ.get("PASSWORD_HASH_MAX_PENDING") or 32)
+    PASSWORD_HASH_QUEUE_TIMEOUT = float(os.environ.get("PASSWORD_HASH_QUEUE_TIMEOUT") or 5)
+    # Token buckets for POSTs to the given endpoints: 'ip' per client address, other keys name a
+    # form field (one username/email across all addresses). RATE_LIMITS may be set as JSON
+    RATE_LIMIT_ENABLED = os.environ.get("RATE_LIMIT_ENABLED", "true").lower() in ("true", "1", "yes")
+    RATE_LIMITS = json.loads(os.environ["RATE_LIMITS"]) if os.environ.get("RATE_LIMITS") else {
+        "auth.login": {"ip": "30/minute", "username": "10/minute"},
+        "auth.request_reset_token": {"ip": "10/minute", "email": "3/hour"},
+    }
+    # 'memory' (per process) or 'redis' (RATE_LIMIT_REDIS_URL, shared by all workers)
+    RATE_LIMIT_BACKEND = os.environ.get("RATE_LIMIT_BACKEND") or "memory"
+    RATE_LIMIT_REDIS_URL = os.environ.get("RATE_LIMIT_REDIS_URL")
+    RATE_LIMIT_MAX_KEYS = int(os.environ.get("RATE_LIMIT_MAX_KEYS") or 100000)
+    # Mixed into catalog page ETags; set to the release id so all workers agree (default: per-process CACHE_BUSTER)
+    ETAG_SALT = os.environ.get("ETAG_SALT")
+
+    # Read replicas (comma-separated DATABASE_REPLICA_URLS) serve GET/HEAD requests to DB_REPLICA_BLUEPRINTS;
+    # a user's reads stay on the primary for DB_REPLICA_READ_YOUR_WRITES_SECONDS after their own write, and
+    # a replica that fails to connect is skipped for DB_REPLICA_RETRY_SECONDS
+    SQLALCHEMY_REPLICA_URIS = [uri.strip() for uri in (os.environ.get("DATABASE_REPLICA_URLS") or "").split(",")
+                               if uri.strip()]
+    DB_REPLICA_BLUEPRINTS = ["main", "reports"]
+    DB_REPLICA_READ_YOUR_WRITES_SECONDS = float(os.environ.get("DB_REPLICA_READ_YOUR_WRITES_SECONDS") or 10)
+    DB_REPLICA_RETRY_SECONDS = float(os.environ.get("DB_REPLICA_RETRY_SECONDS") or 30)
+
     # Mail server settings - general defaults
     MAIL_SERVER = os.environ.get("MAIL_SERVER")
     MAIL_PORT = int(os.environ.get("MAIL_PORT") or 25)
@@ -27,3 +110,12 @@ class Config:
         "1",
         "t",
     ]
+    # Outbound mail is queued in the mail_outbox table and sent by `flask mail-worker`. Failed
+    # sends retry after MAIL_OUTBOX_RETRY_BASE_SECONDS, doubling up to MAIL_OUTBOX_RETRY_MAX_SECONDS,
+    # until MAIL_OUTBOX_MAX_ATTEMPTS; a claimed batch is retried by another worker after MAIL_OUTBOX_LEASE_SECONDS
+    MAIL_OUTBOX_BATCH_SIZE = int(os.environ.get("MAIL_OUTBOX_BATCH_SIZE") or 50)
+    MAIL_OUTBOX_MAX_ATTEMPTS = int(os.environ.get("MAIL_OUTBOX_MAX_ATTEMPTS") or 8)
+    MAIL_OUTBOX_RETRY_BASE_SECONDS = int(os.environ.get("MAIL_OUTBOX_RETRY_BASE_SECONDS") or 30)
+    MAIL_OUTBOX_RETRY_MAX_SECONDS = int(os.environ.get("MAIL_OUTBOX_RETRY_MAX_SECONDS") or 3600)
+    MAIL_OUTBOX_LEASE_SECONDS = int(os.environ.get("MAIL_OUTBOX_LEASE_SECONDS") or 300)
+    MAIL_OUTBOX_POLL_SECONDS = float(os.environ.get("MAIL_OUTBOX_POLL_SECONDS") or 5)
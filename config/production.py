@@ -1,5 +1,34 @@
 from .default import Config
 import os 
+from typing import Any, Dict, Optional
+
+
+def engine_options(database_uri: Optional[str]) -> Dict[str, Any]:
+    """
+    SQLALCHEMY_ENGINE_OPTIONS for a server database, from DB_* environment variables.
+
+    Size the pool per process: each gunicorn worker holds up to
+    DB_POOL_SIZE + DB_MAX_OVERFLOW connections, shared by its threads.
+    Pre-ping and recycling drop connections that died in a failover or were
+    closed by the server or a proxy. DB_STATEMENT_TIMEOUT_MS is set per
+    connection on PostgreSQL. PoolMetrics (app/db_pool.py) runs these pools
+    as InstrumentedQueuePools. SQLite keeps SQLAlchemy's defaults.
+    """
+    if not database_uri or database_uri.startswith("sqlite"):
+        return {}
+    options: Dict[str, Any] = {
+        "pool_size": int(os.environ.get("DB_POOL_SIZE") or 10),
+        "max_overflow": int(os.environ.get("DB_MAX_OVERFLOW", 5)),
+        # Seconds to wait for a free connection before raising, instead of queueing forever
+        "pool_timeout": float(os.environ.get("DB_POOL_TIMEOUT") or 10),
+        "pool_recycle": int(os.environ.get("DB_POOL_RECYCLE") or 1800),
+        "pool_pre_ping": os.environ.get("DB_POOL_PRE_PING", "true").lower() in ("true", "1", "yes"),
+    }
+    statement_timeout_ms = int(os.environ.get("DB_STATEMENT_TIMEOUT_MS", 30000))
+    if statement_timeout_ms and database_uri.startswith("postgresql"):
+        options["connect_args"] = {"options": f"-c statement_timeout={statement_timeout_ms}"}
+    return options
+
 
 class ProductionConfig(Config):
     DEBUG=False
@@ -8,6 +37,9 @@ class ProductionConfig(Config):
     if DATABASE_URL:
         SQLALCHEMY_DATABASE_URI = DATABASE_URL
 
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(DATABASE_URL or Config.SQLALCHEMY_DATABASE_URI)
+    SQLALCHEMY_REPLICA_ENGINE_OPTIONS = engine_options(next(iter(Config.SQLALCHEMY_REPLICA_URIS), None))
+
     # Additional security settings for production
     SESSION_COOKIE_SECURE = True
     SESSION_COOKIE_HTTPONLY = True
@@ -8,6 +8,9 @@ class TestingConfig(Config):
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
     WTF_CSRF_ENABLED = False
     MAIL_SUPPRESS_SEND = True  # Suppress actual email sending during tests
+    PRODUCT_LOOKUP_BACKGROUND = False  # Build the lookup index inline, on first use
+    PASSWORD_HASH_WORKERS = 0  # Hash inline
+    PASSWORD_HASH_METHOD = "pbkdf2:sha256:1000"  # Cheap hashes keep the suite fast
 
     # Optional: set a fixed SECRET_KEY for predictable test sessions if needed
     # SECRET_KEY = 'testing-secret-key' # Use the one from base/env unless needed for tests
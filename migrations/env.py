@@ -51,6 +51,15 @@ def get_metadata():
     return target_db.metadata
 
 
+def include_object(object, name, type_, reflected, compare_to):
+    # Full-text search objects are created by raw DDL (app/models/product_search.py),
+    # so autogenerate must not try to drop them
+    if reflected and compare_to is None and name and (
+            name.startswith('product_fts') or name == 'ix_product_search'):
+        return False
+    return True
+
+
 def run_migrations_offline():
     """Run migrations in 'offline' mode.
 
@@ -93,6 +102,7 @@ def run_migrations_online():
     conf_args = current_app.extensions['migrate'].configure_args
     if conf_args.get("process_revision_directives") is None:
         conf_args["process_revision_directives"] = process_revision_directives
+    conf_args.setdefault("include_object", include_object)
 
     connectable = get_engine()
 
@@ -0,0 +1,26 @@
+"""Add composite (name, id) index on product for keyset pagination
+
+Revision ID: 8c3a1f27d5b4
+Revises: 2d4ee14144a5
+Create Date: 2026-10-18 09:12:31.418220
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c3a1f27d5b4'
+down_revision = '2d4ee14144a5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('product', schema=None) as batch_op:
+        batch_op.create_index('ix_product_name_id', ['name', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('product', schema=None) as batch_op:
+        batch_op.drop_index('ix_product_name_id')
@@ -0,0 +1,50 @@
+"""Add inventory_summary table with running inventory totals
+
+Revision ID: b71e4c9a0f32
+Revises: 8c3a1f27d5b4
+Create Date: 2026-10-18 10:02:47.903114
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b71e4c9a0f32'
+down_revision = '8c3a1f27d5b4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('inventory_summary',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('total_products', sa.Integer(), nullable=False),
+    sa.Column('total_units', sa.BigInteger(), nullable=False),
+    sa.Column('total_value', sa.Numeric(precision=16, scale=2), nullable=False),
+    sa.Column('low_stock_count', sa.Integer(), nullable=False),
+    sa.Column('out_of_stock_count', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+    # Seed the singleton row from the existing catalog
+    op.execute("""
+        INSERT INTO inventory_summary
+            (id, total_products, total_units, total_value, low_stock_count, out_of_stock_count, updated_at)
+        SELECT
+            1,
+            COUNT(id),
+            COALESCE(SUM(stock_level), 0),
+            COALESCE(SUM(price * stock_level), 0),
+            COALESCE(SUM(CASE
+                WHEN (stock_level > 0 AND stock_level <= low_stock_threshold)
+                  OR (stock_level <= 0 AND low_stock_threshold >= 0) THEN 1 ELSE 0 END), 0),
+            COALESCE(SUM(CASE WHEN stock_level <= 0 THEN 1 ELSE 0 END), 0),
+            CURRENT_TIMESTAMP
+        FROM product
+    """)
+
+
+def downgrade():
+    op.drop_table('inventory_summary')
@@ -0,0 +1,33 @@
+"""Widen user.password_hash for configurable hashing methods
+
+Revision ID: b8d4f1a2c605
+Revises: a6c2e4f8b913
+Create Date: 2026-10-18 20:11:36.518402
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8d4f1a2c605'
+down_revision = 'a6c2e4f8b913'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # scrypt hashes are about 160 characters
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.alter_column('password_hash',
+               existing_type=sa.String(length=128),
+               type_=sa.String(length=256),
+               existing_nullable=True)
+
+
+def downgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.alter_column('password_hash',
+               existing_type=sa.String(length=256),
+               type_=sa.String(length=128),
+               existing_nullable=True)
@@ -0,0 +1,34 @@
+"""Archive products instead of deleting them
+
+Revision ID: c5e1a9d3f70b
+Revises: b8d4f1a2c605
+Create Date: 2026-10-19 09:42:17.205381
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5e1a9d3f70b'
+down_revision = 'b8d4f1a2c605'
+branch_labels = None
+depends_on = None
+
+LIVE = sa.text('archived_at IS NULL')
+
+
+def upgrade():
+    # Plain ALTERs rather than batch mode: a SQLite table rebuild would drop the full-text triggers
+    op.add_column('product', sa.Column('archived_at', sa.DateTime(), nullable=True))
+    # SKUs only need to be unique among live products
+    op.drop_index('ix_product_sku', table_name='product')
+    op.create_index('ix_product_sku', 'product', ['sku'], unique=True,
+                    postgresql_where=LIVE, sqlite_where=LIVE)
+
+
+def downgrade():
+    # Archived products still own ledger rows, so they cannot be dropped here; fails if a SKU was reused
+    op.drop_index('ix_product_sku', table_name='product')
+    op.create_index('ix_product_sku', 'product', ['sku'], unique=True)
+    op.drop_column('product', 'archived_at')
@@ -0,0 +1,62 @@
+"""Add stock_movement ledger and stock_snapshot tables
+
+Revision ID: d4f0a6b1c8e7
+Revises: b71e4c9a0f32
+Create Date: 2026-10-18 11:24:05.771642
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4f0a6b1c8e7'
+down_revision = 'b71e4c9a0f32'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('stock_movement',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('delta', sa.Integer(), nullable=False),
+    sa.Column('reason', sa.String(length=32), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['product_id'], ['product.id'], ondelete='RESTRICT'),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='SET NULL'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('stock_movement', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_stock_movement_created_at'), ['created_at'], unique=False)
+        batch_op.create_index('ix_stock_movement_product_id_id', ['product_id', 'id'], unique=False)
+
+    op.create_table('stock_snapshot',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('stock_level', sa.Integer(), nullable=False),
+    sa.Column('last_movement_id', sa.Integer(), nullable=False),
+    sa.Column('taken_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['product_id'], ['product.id'], ondelete='RESTRICT'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('stock_snapshot', schema=None) as batch_op:
+        batch_op.create_index('ix_stock_snapshot_product_id_taken_at', ['product_id', 'taken_at'], unique=False)
+
+    # Baseline: existing stock levels become each product's opening snapshot
+    op.execute("""
+        INSERT INTO stock_snapshot (product_id, stock_level, last_movement_id, taken_at)
+        SELECT id, stock_level, 0, CURRENT_TIMESTAMP FROM product
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('stock_snapshot', schema=None) as batch_op:
+        batch_op.drop_index('ix_stock_snapshot_product_id_taken_at')
+    op.drop_table('stock_snapshot')
+
+    with op.batch_alter_table('stock_movement', schema=None) as batch_op:
+        batch_op.drop_index('ix_stock_movement_product_id_id')
+        batch_op.drop_index(batch_op.f('ix_stock_movement_created_at'))
+    op.drop_table('stock_movement')
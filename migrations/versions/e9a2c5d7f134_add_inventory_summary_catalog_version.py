@@ -0,0 +1,26 @@
+"""Add catalog_version change counter to inventory_summary
+
+Revision ID: e9a2c5d7f134
+Revises: d4f0a6b1c8e7
+Create Date: 2026-10-18 14:12:36.218904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e9a2c5d7f134'
+down_revision = 'd4f0a6b1c8e7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('inventory_summary', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('catalog_version', sa.BigInteger(), server_default='0', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('inventory_summary', schema=None) as batch_op:
+        batch_op.drop_column('catalog_version')
@@ -0,0 +1,60 @@
+"""Add full-text search index over product name, sku and description
+
+Revision ID: f3b8d1e6a720
+Revises: e9a2c5d7f134
+Create Date: 2026-10-18 16:04:52.731160
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3b8d1e6a720'
+down_revision = 'e9a2c5d7f134'
+branch_labels = None
+depends_on = None
+
+# Mirrors app/models/product_search.py at the time of this revision
+SEARCH_VECTOR_SQL = (
+    "(setweight(to_tsvector('simple', coalesce(product.name, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(product.sku, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(product.description, '')), 'B'))"
+)
+
+SQLITE_UPGRADE = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS product_fts USING fts5("
+    "name, sku, description, content='product', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    "CREATE TRIGGER IF NOT EXISTS product_fts_ai AFTER INSERT ON product BEGIN "
+    "INSERT INTO product_fts(rowid, name, sku, description) "
+    "VALUES (new.id, new.name, new.sku, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS product_fts_ad AFTER DELETE ON product BEGIN "
+    "INSERT INTO product_fts(product_fts, rowid, name, sku, description) "
+    "VALUES ('delete', old.id, old.name, old.sku, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS product_fts_au AFTER UPDATE OF name, sku, description ON product BEGIN "
+    "INSERT INTO product_fts(product_fts, rowid, name, sku, description) "
+    "VALUES ('delete', old.id, old.name, old.sku, old.description); "
+    "INSERT INTO product_fts(rowid, name, sku, description) "
+    "VALUES (new.id, new.name, new.sku, new.description); END",
+    "INSERT INTO product_fts(product_fts) VALUES ('rebuild')",
+)
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute(f"CREATE INDEX IF NOT EXISTS ix_product_search ON product USING gin ({SEARCH_VECTOR_SQL})")
+    elif dialect == 'sqlite':
+        for statement in SQLITE_UPGRADE:
+            op.execute(statement)
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_product_search")
+    elif dialect == 'sqlite':
+        for trigger in ('product_fts_ai', 'product_fts_ad', 'product_fts_au'):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS product_fts")
@@ -0,0 +1,151 @@
+"""Test connection pool metrics and the production engine options."""
+import threading
+import time
+
+import pytest
+from flask import Flask
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+from app import create_app
+from app.db_pool import InstrumentedQueuePool, PoolMetrics
+from app.metrics import metrics
+from app.models import db
+from config.production import engine_options
+from config.testing import TestingConfig
+
+LABELS = {'engine': 'default'}
+
+
+@pytest.fixture
+def pool_app(tmp_path):
+    """An app on a SQLite file behind a two-connection instrumented pool, like a small server database pool."""
+    app = Flask(__name__)
+    app.config.update(
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'stress.db'}",
+        SQLALCHEMY_ENGINE_OPTIONS={'poolclass': InstrumentedQueuePool, 'pool_size': 2, 'max_overflow': 0, 'pool_timeout': 2},
+    )
+    db.init_app(app)
+    PoolMetrics(app)
+    with app.app_context():
+        yield app
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+def _wait_count():
+    state = metrics.get('db_pool_checkout_wait_seconds', LABELS)
+    return state[2] if state else 0
+
+
+def test_only_instrumented_pools_are_reported(pool_app, app, tmp_path):
+    """Test that the instrumented pool is named and sized, and other pools are left as they are."""
+    with pool_app.app_context():
+        assert db.engine.pool.metrics_name == 'default'
+        assert db.engine.pool.capacity == 2
+    with app.app_context():
+        assert not isinstance(db.engine.pool, InstrumentedQueuePool)
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'plain.db'}", poolclass=QueuePool)
+    PoolMetrics().instrument(engine, 'plain')
+    assert type(engine.pool) is QueuePool
+    engine.dispose()
+
+
+def test_checkouts_under_contention(pool_app):
+    """Test wait time, saturation and the checked-out gauge with more threads than connections."""
+    engine = db.engine
+    checkouts = _wait_count()
+    waited = (metrics.get('db_pool_checkout_wait_seconds', LABELS) or [None, 0.0])[1]
+    peak = []
+
+    def work():
+        with engine.connect() as conn:
+            conn.execute(text('SELECT 1'))
+            peak.append(metrics.get('db_pool_saturation', LABELS))
+            time.sleep(0.05)
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert _wait_count() == checkouts + 8
+    assert max(peak) == 1.0
+    # Six threads queued behind two connections held for 50ms each: about 0.6s of waiting in total
+    assert metrics.get('db_pool_checkout_wait_seconds', LABELS)[1] - waited > 0.3
+    assert metrics.get('db_pool_checked_out', LABELS) == 0
+    assert metrics.get('db_pool_saturation', LABELS) == 0
+
+
+def test_checkout_timeouts_are_counted(pool_app):
+    """Test that a checkout giving up after pool_timeout is counted and still timed."""
+    engine = db.engine
+    engine.pool._timeout = 0.05
+    timeouts = metrics.get('db_pool_checkout_timeouts_total', LABELS) or 0
+    checkouts = _wait_count()
+
+    with engine.connect(), engine.connect():
+        assert metrics.get('db_pool_saturation', LABELS) == 1.0
+        with pytest.raises(PoolTimeoutError):
+            engine.connect()
+
+    assert metrics.get('db_pool_checkout_timeouts_total', LABELS) == timeouts + 1
+    assert _wait_count() == checkouts + 3
+
+
+def test_dispose_keeps_instrumentation(pool_app):
+    """Test that the pool recreated by engine.dispose() is still instrumented."""
+    engine = db.engine
+    engine.dispose()
+    assert isinstance(engine.pool, InstrumentedQueuePool)
+    assert engine.pool.metrics_name == 'default'
+
+
+def test_production_engine_options(monkeypatch):
+    """Test the pool and statement timeout options for PostgreSQL, and none for SQLite."""
+    assert engine_options('sqlite:///inventory.db') == {}
+    assert engine_options(None) == {}
+
+    options = engine_options('postgresql://app@db/inventory')
+    assert options['pool_size'] == 10 and options['max_overflow'] == 5
+    assert options['pool_pre_ping'] is True and options['pool_recycle'] == 1800
+    assert options['connect_args'] == {'options': '-c statement_timeout=30000'}
+
+    monkeypatch.setenv('DB_POOL_SIZE', '20')
+    monkeypatch.setenv('DB_POOL_PRE_PING', 'false')
+    monkeypatch.setenv('DB_STATEMENT_TIMEOUT_MS', '0')
+    options = engine_options('postgresql+psycopg2://app@db/inventory')
+    assert options['pool_size'] == 20 and options['pool_pre_ping'] is False
+    assert 'connect_args' not in options
+    assert 'connect_args' not in engine_options('mysql://app@db/inventory')
+
+
+def test_sized_pools_are_configured_as_instrumented():
+    """Test that configure_pools picks InstrumentedQueuePool for pool options only, without touching the config class."""
+    server = engine_options('postgresql://app@db/inventory')
+    app = Flask(__name__)
+    app.config.update(SQLALCHEMY_ENGINE_OPTIONS=server, SQLALCHEMY_REPLICA_ENGINE_OPTIONS={'pool_pre_ping': True})
+    PoolMetrics.configure_pools(app)
+
+    assert app.config['SQLALCHEMY_ENGINE_OPTIONS']['poolclass'] is InstrumentedQueuePool
+    assert app.config['SQLALCHEMY_ENGINE_OPTIONS']['pool_size'] == server['pool_size']
+    assert 'poolclass' not in server
+    assert app.config['SQLALCHEMY_REPLICA_ENGINE_OPTIONS'] == {'pool_pre_ping': True}
+
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {'pool_size': 2, 'poolclass': QueuePool}
+    PoolMetrics.configure_pools(app)
+    assert app.config['SQLALCHEMY_ENGINE_OPTIONS']['poolclass'] is QueuePool
+
+
+def test_create_app_instruments_configured_pools(tmp_path, monkeypatch):
+    """Test that an app whose engine options size the pool gets an instrumented, named pool."""
+    monkeypatch.setattr(TestingConfig, 'SQLALCHEMY_DATABASE_URI', f"sqlite:///{tmp_path / 'sized.db'}")
+    monkeypatch.setattr(TestingConfig, 'SQLALCHEMY_ENGINE_OPTIONS', {'pool_size': 3}, raising=False)
+    app = create_app('testing')
+    with app.app_context():
+        assert isinstance(db.engine.pool, InstrumentedQueuePool)
+        assert db.engine.pool.capacity == 3 + 10
+        db.engine.dispose()
@@ -0,0 +1,156 @@
+"""Test read-replica routing with two SQLite files as primary and replica."""
+import logging
+import re
+
+import pytest
+from sqlalchemy import select, update
+
+from app import create_app
+from app.db_replicas import PIN_SESSION_KEY, replica_reads
+from app.metrics import metrics
+from app.models import db, InventorySummary, Product
+from app.services import InventorySummaryService
+from config.testing import TestingConfig
+
+
+def _product(name, sku, stock_level=5):
+    return Product(name=name, sku=sku, price=1, stock_level=stock_level, low_stock_threshold=10)
+
+
+def _replicate_summary(app):
+    """Copy the primary's summary row (and so its catalog version) to the replica."""
+    summary = db.session.execute(select(InventorySummary.__table__)).mappings().one()
+    with app.extensions['db_replicas'].engines[1].begin() as conn:
+        conn.execute(InventorySummary.__table__.delete())
+        conn.execute(InventorySummary.__table__.insert(), [dict(summary)])
+
+
+@pytest.fixture
+def replica_app(tmp_path, monkeypatch):
+    """An app whose primary and replica are separate SQLite files holding different products."""
+    monkeypatch.setattr(TestingConfig, 'SQLALCHEMY_DATABASE_URI', f"sqlite:///{tmp_path / 'primary.db'}")
+    monkeypatch.setattr(TestingConfig, 'SQLALCHEMY_REPLICA_URIS', [
+        f"sqlite:///{tmp_path / 'missing' / 'replica.db'}",  # cannot be opened
+        f"sqlite:///{tmp_path / 'replica.db'}",
+    ])
+    app = create_app('testing')
+    router = app.extensions['db_replicas']
+    with app.app_context():
+        db.create_all()
+        db.metadata.create_all(router.engines[1])
+        db.session.add(_product('Primary Widget', 'PRI-1'))
+        InventorySummaryService.rebuild()
+        # Stand in for replication: the replica holds a different snapshot
+        with router.engines[1].begin() as conn:
+            conn.execute(Product.__table__.insert(), [
+                {'name': 'Replica Widget', 'sku': 'REP-1', 'price': 1, 'stock_level': 5, 'low_stock_threshold': 10},
+            ])
+        _replicate_summary(app)
+    # A fresh context, as if the seeding writes happened in another process
+    with app.app_context():
+        yield app
+        db.session.remove()
+        db.drop_all()
+        router.dispose()
+
+
+def test_dashboard_and_reports_read_from_the_replica(replica_app):
+    """Test that routed GETs read the replica and other routes read the primary."""
+    client = replica_app.test_client()
+    failures = metrics.get('db_replica_failures_total', {'engine': 'replica_0'}) or 0
+
+    for url in ('/reports/product_summary', '/reports/low_stock?format=csv', '/'):
+        body = client.get(url).get_data(as_text=True)
+        assert 'Replica Widget' in body and 'Primary Widget' not in body, url
+    # The unreachable replica was tried once, then skipped
+    assert metrics.get('db_replica_failures_total', {'engine': 'replica_0'}) == failures + 1
+
+    body = client.get('/products/search?q=Widget').get_data(as_text=True)
+    assert 'Primary Widget' in body and 'Replica Widget' not in body
+
+
+def test_replica_queries_are_instrumented(replica_app, caplog):
+    """Test that statements run on a replica count toward Server-Timing and the slow-query log."""
+    client = replica_app.test_client()
+    client.get('/reports/product_summary')  # the dead replica is skipped from here on
+    sql = replica_app.extensions['sql_instrumentation']
+    sql.slow_query_ms = 0
+    try:
+        with caplog.at_level(logging.WARNING, logger='app.instrumentation'):
+            response = client.get('/reports/product_summary')
+    finally:
+        sql.slow_query_ms = replica_app.config['SQL_SLOW_QUERY_MS']
+
+    assert 'Replica Widget' in response.get_data(as_text=True)
+    header = next(h for h in response.headers.getlist('Server-Timing') if h.startswith('db;'))
+    assert int(re.search(r'desc="(\d+) queries"', header).group(1)) >= 1
+    assert any(r.getMessage().startswith('slow_query ') and 'FROM product' in r.getMessage()
+               for r in caplog.records)
+
+
+def test_lagging_replica_is_bypassed(replica_app):
+    """Test that a page is read from the primary while the replica is behind its catalog version."""
+    client = replica_app.test_client()
+    etag = client.get('/reports/product_summary').headers['ETag']
+
+    db.session.execute(update(InventorySummary).values(catalog_version=InventorySummary.catalog_version + 1))
+    db.session.commit()
+    response = client.get('/reports/product_summary', headers={'If-None-Match': etag})
+    assert response.status_code == 200 and response.headers['ETag'] != etag
+    body = response.get_data(as_text=True)
+    assert 'Primary Widget' in body and 'Replica Widget' not in body
+
+
+def test_reads_follow_own_writes(replica_app):
+    """Test that a user's reads stay on the primary for the read-your-writes window after a write."""
+    client = replica_app.test_client()
+    product_id = db.session.execute(select(Product.id).where(Product.sku == 'PRI-1')).scalar_one()
+
+    response = client.post(f'/products/stock/in/{product_id}', data={'quantity': 3})
+    assert response.status_code == 302
+    body = client.get('/reports/product_summary').get_data(as_text=True)
+    assert 'Primary Widget' in body and 'Replica Widget' not in body
+
+    # Once the replica has caught up, another user, and this one after the window, read it again
+    _replicate_summary(replica_app)
+    assert 'Replica Widget' in replica_app.test_client().get('/reports/product_summary').get_data(as_text=True)
+    with client.session_transaction() as session:
+        session[PIN_SESSION_KEY] = 0
+    assert 'Replica Widget' in client.get('/reports/product_summary').get_data(as_text=True)
+
+
+def test_writes_stay_on_the_primary(replica_app):
+    """Test that writes and reads after them use the primary, even inside replica_reads()."""
+    with replica_reads():
+        assert db.session.scalars(select(Product.sku)).all() == ['REP-1']
+        db.session.add(_product('Second Widget', 'PRI-2'))
+        db.session.commit()
+        assert sorted(db.session.scalars(select(Product.sku)).all()) == ['PRI-1', 'PRI-2']
+    db.session.commit()
+    assert sorted(db.session.scalars(select(Product.sku)).all()) == ['PRI-1', 'PRI-2']
+
+
+def test_falls_back_to_the_primary(replica_app):
+    """Test that reads fall back to the primary when no replica can be reached."""
+    router = replica_app.extensions['db_replicas']
+    router._down_until[1] = float('inf')
+    fallbacks = metrics.get('db_replica_transactions_total', {'engine': 'primary'}) or 0
+    with replica_reads():
+        assert db.session.scalars(select(Product.sku)).all() == ['PRI-1']
+    assert metrics.get('db_replica_transactions_total', {'engine': 'primary'}) == fallbacks + 1
+
+
+def test_round_robin(replica_app, tmp_path):
+    """Test that transactions alternate between healthy replicas."""
+    router = replica_app.extensions['db_replicas']
+    (tmp_path / 'missing').mkdir()
+    db.metadata.create_all(router.engines[0])
+    router._down_until.clear()
+    before = [metrics.get('db_replica_transactions_total', {'engine': f'replica_{i}'}) or 0 for i in range(2)]
+
+    with replica_reads():
+        for _ in range(4):
+            db.session.scalars(select(Product.sku)).all()
+            db.session.commit()
+    assert [metrics.get('db_replica_transactions_total', {'engine': f'replica_{i}'}) for i in range(2)] == \
+        [before[0] + 2, before[1] + 2]
@@ -0,0 +1,69 @@
+"""Test the {% cache %} template fragment cache."""
+from flask import render_template_string
+from app.fragment_cache import LRUFragmentStore, RedisFragmentStore
+from app.metrics import metrics
+from app.services.inventory_summary_service import InventorySummaryService
+from app.services.product_service import ProductService
+
+TEMPLATE = "{% cache 'rows', 60 %}{% for p in products %}{{ p }};{% endfor %}{% endcache %}"
+
+
+def _render(app, products):
+    """Render TEMPLATE as one request would, running the before_request hooks."""
+    with app.test_request_context():
+        app.preprocess_request()
+        return render_template_string(TEMPLATE, products=products)
+
+
+class FakeRedis:
+    """Local stand-in for a Redis client."""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def setex(self, key, ttl, value):
+        self.data[key] = value.encode('utf-8')
+
+
+def test_fragment_is_cached_until_the_catalog_changes(app, sample_products):
+    """Test that a fragment is served from the store until a product write bumps the version."""
+    InventorySummaryService.rebuild()
+    assert _render(app, ['a', 'b']) == 'a;b;'
+    hits = metrics.get('fragment_cache_requests_total', {'result': 'hit'})
+    # Different context on purpose: the cached fragment wins
+    assert _render(app, ['changed']) == 'a;b;'
+    assert metrics.get('fragment_cache_requests_total', {'result': 'hit'}) == hits + 1
+
+    ProductService.update_product(sample_products[0].id, {'name': 'Renamed'})
+    assert _render(app, ['changed']) == 'changed;'
+
+
+def test_fragment_renders_uncached_without_a_summary_row(app):
+    """Test that a missing catalog version disables caching instead of serving stale output."""
+    assert _render(app, ['a']) == 'a;'
+    assert _render(app, ['b']) == 'b;'
+
+
+def test_pluggable_stores(app, sample_products):
+    """Test the Redis-style store and the LRU bound."""
+    InventorySummaryService.rebuild()
+    client = FakeRedis()
+    app.extensions['fragment_cache'].store = RedisFragmentStore(client)
+    _render(app, ['x'])
+    assert [key.startswith('fragment:') for key in client.data] == [True]
+    assert _render(app, ['y']) == 'x;'
+
+    store = LRUFragmentStore(max_entries=2)
+    for key in ('a', 'b', 'c'):
+        store.set(key, key, 60)
+    assert store.get('a') is None and store.get('c') == 'c'
+
+
+def test_dashboard_reports_template_render_time(app, client, sample_products):
+    """Test the per-template Server-Timing entries."""
+    response = client.get('/inventory_status')
+    timings = response.headers.getlist('Server-Timing')
+    assert any('desc="inventory_status.html"' in t for t in timings)
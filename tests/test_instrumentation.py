@@ -0,0 +1,39 @@
+"""Test the per-request SQL instrumentation."""
+import logging
+import re
+
+
+def test_server_timing_header_counts_queries(client, sample_products):
+    """Test that each response reports its query count and DB time."""
+    response = client.get('/reports/product_summary')
+    assert response.status_code == 200
+
+    header = next(h for h in response.headers.getlist('Server-Timing') if h.startswith('db;'))
+    match = re.match(r'db;dur=([\d.]+);desc="(\d+) queries", app;dur=([\d.]+)', header)
+    assert match is not None
+    assert int(match.group(2)) >= 1
+    assert float(match.group(1)) <= float(match.group(3))
+
+
+def test_request_log_line(client, sample_products, caplog):
+    """Test the structured per-request log line."""
+    with caplog.at_level(logging.INFO, logger='app.instrumentation'):
+        client.get('/reports/low_stock')
+
+    lines = [r.getMessage() for r in caplog.records if r.getMessage().startswith('request ')]
+    assert len(lines) == 1
+    assert 'path=/reports/low_stock' in lines[0]
+    assert 'endpoint=reports.low_stock_report' in lines[0]
+    assert re.search(r'queries=\d+ db_ms=[\d.]+', lines[0])
+
+
+def test_slow_queries_are_logged_with_parameters(app, client, sample_products, caplog):
+    """Test that statements over SQL_SLOW_QUERY_MS are logged with their parameters."""
+    app.extensions['sql_instrumentation'].slow_query_ms = 0
+    with caplog.at_level(logging.WARNING, logger='app.instrumentation'):
+        client.get('/reports/product_value?format=csv').get_data()
+
+    slow = [r.getMessage() for r in caplog.records if r.getMessage().startswith('slow_query ')]
+    product_queries = [line for line in slow if 'FROM product' in line]
+    assert product_queries
+    assert 'parameters=' in product_queries[0]
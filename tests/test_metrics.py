@@ -0,0 +1,90 @@
+"""Test the request metrics and the /metrics endpoint."""
+import json
+import os
+import re
+import time
+from app.metrics import MetricsRegistry, metrics
+
+
+def _sample(text, name, **labels):
+    """Return the value of one sample line from a Prometheus exposition, or None."""
+    for line in text.splitlines():
+        if not line.startswith(name + '{') and not line.startswith(name + ' '):
+            continue
+        if all(f'{k}="{v}"' in line for k, v in labels.items()):
+            return float(line.rsplit(' ', 1)[1])
+    return None
+
+
+def test_metrics_endpoint_reports_requests_by_blueprint(client, sample_products):
+    """Test request counters, latency, DB and template histograms per endpoint."""
+    before = metrics.get('http_requests_total', {
+        'blueprint': 'reports', 'endpoint': 'reports.product_summary_report', 'method': 'GET', 'status': '200'
+    })
+    client.get('/reports/product_summary')
+    client.get('/reports/product_summary')
+
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    text = response.get_data(as_text=True)
+
+    assert '# TYPE http_request_duration_seconds histogram' in text
+    assert _sample(text, 'http_requests_total', blueprint='reports',
+                   endpoint='reports.product_summary_report', status='200') == before + 2
+    assert _sample(text, 'http_request_duration_seconds_bucket', endpoint='reports.product_summary_report',
+                   le='+Inf') >= 2
+    assert _sample(text, 'http_request_db_queries_total', endpoint='reports.product_summary_report') >= 2
+    assert _sample(text, 'template_render_duration_seconds_count',
+                   template='reports/product_summary.html') >= 2
+    # The scrape itself is not recorded
+    assert 'endpoint="metrics"' not in text
+
+
+def test_registry_histogram_buckets_are_cumulative():
+    """Test the text format of a histogram."""
+    registry = MetricsRegistry()
+    registry.describe('job_seconds', 'histogram', 'Job time.', buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5):
+        registry.observe('job_seconds', value, {'job': 'a'})
+
+    text = registry.render()
+    assert 'job_seconds_bucket{job="a",le="0.1"} 1' in text
+    assert 'job_seconds_bucket{job="a",le="1.0"} 2' in text
+    assert 'job_seconds_bucket{job="a",le="+Inf"} 3' in text
+    assert re.search(r'job_seconds_sum\{job="a"\} 5\.55', text)
+
+
+def test_registry_merges_worker_files(tmp_path):
+    """Test that the file-backed store sums counters over every worker's file."""
+    registry = MetricsRegistry()
+    registry.multiproc_dir = str(tmp_path)
+    registry.describe('jobs_total', 'counter', 'Jobs run.')
+    registry.describe('queue_depth', 'gauge', 'Queued jobs.')
+    registry.inc('jobs_total', {'job': 'a'}, 3)
+    registry.set('queue_depth', 7)
+
+    # A file left by another worker that has since exited
+    (tmp_path / 'metrics_999999.json').write_text(
+        '{"jobs_total": [[[["job", "a"]], 2]], "queue_depth": [[[], 5]]}'
+    )
+
+    text = registry.render()
+    assert 'jobs_total{job="a"} 5' in text
+    assert 'queue_depth 7' in text
+
+
+def test_registry_writes_late_updates_without_more_traffic(tmp_path):
+    """Test that updates made inside the flush interval reach the worker file once it passes."""
+    registry = MetricsRegistry()
+    registry.multiproc_dir = str(tmp_path)
+    registry.flush_interval = 0.2
+    registry.describe('jobs_total', 'counter', 'Jobs run.')
+    path = tmp_path / f'metrics_{os.getpid()}.json'
+
+    registry.inc('jobs_total')
+    registry.inc('jobs_total')
+    assert json.loads(path.read_text())['jobs_total'] == [[[], 1]]
+
+    time.sleep(0.5)
+    assert json.loads(path.read_text())['jobs_total'] == [[[], 2]]
@@ -132,3 +132,75 @@ def test_token_methods_no_secret_key(app, new_user_model_only, caplog):
         assert "SECRET_KEY not set. Cannot verify password reset token." in caplog.text
     finally:
         app.config["SECRET_KEY"] = original_secret_key  # Restore secret key
+
+
+@pytest.fixture
+def user_with_permissions(app):
+    """A persisted user holding an 'Editor' role with the 'edit_products' permission."""
+    from app import db
+    from app.models import Role, Permission
+
+    with app.app_context():
+        permission = Permission(name="edit_products")
+        role = Role(name="Editor")
+        role.permissions = [permission]
+        user = User(username="editor", email="editor@example.com")
+        user.roles = [role]
+        db.session.add_all([permission, role, user])
+        db.session.commit()
+        yield user
+
+
+def _count_queries(app):
+    """Return a list that collects the SQL statements run against the app's engine."""
+    from sqlalchemy import event
+    from app import db
+
+    statements = []
+    event.listen(db.engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+    return statements
+
+
+def test_has_permission_resolves_once_per_request(app, user_with_permissions):
+    """Test that role and permission checks share one resolved set per request."""
+    with app.test_request_context():
+        assert user_with_permissions.id is not None  # Refresh the row after the fixture's commit
+        statements = _count_queries(app)
+        assert user_with_permissions.has_permission("edit_products") is True
+        assert user_with_permissions.has_permission("delete_users") is False
+        assert user_with_permissions.has_role("Editor") is True
+        assert user_with_permissions.is_admin is False
+        assert len(statements) == 1
+
+
+def test_process_cache_invalidated_by_role_and_user_updates(app, user_with_permissions):
+    """Test the process-level cache and its invalidation by RoleService and UserService."""
+    from app.models import Role, Permission
+    from app.services import RoleService, UserService
+    from app.utils import permission_cache
+
+    app.config["PERMISSION_CACHE_TTL"] = 60
+    try:
+        with app.test_request_context():
+            assert user_with_permissions.has_permission("edit_products") is True
+
+        with app.test_request_context():
+            assert user_with_permissions.id is not None
+            statements = _count_queries(app)
+            assert user_with_permissions.has_permission("edit_products") is True
+            assert statements == []
+
+            role = Role.query.filter_by(name="Editor").one()
+            RoleService.update_role_permissions(role.id, [])
+            assert user_with_permissions.has_permission("edit_products") is False
+
+            version = permission_cache.version
+            UserService.update_user(user_with_permissions.id, {
+                "username": "editor", "email": "editor@example.com", "roles": []
+            })
+            assert permission_cache.version == version
+            assert user_with_permissions.has_role("Editor") is False
+    finally:
+        app.config["PERMISSION_CACHE_TTL"] = 0
+        permission_cache.invalidate()
@@ -0,0 +1,100 @@
+"""Test the cached Flask-Login user loader."""
+import pytest
+from sqlalchemy import event
+from werkzeug.exceptions import HTTPException
+from app.models import db, User, Role, Permission
+from app.utils.user_cache import UserSnapshot
+from app.services import UserService
+
+
+@pytest.fixture
+def cached_user(app):
+    """A persisted user with an 'Editor' role, and the app's user cache."""
+    with app.app_context():
+        role = Role(name="Editor", permissions=[Permission(name="edit_products")])
+        user = User(username="cached", email="cached@example.com", first_name="Cached", last_name="User")
+        user.set_password("password123")
+        user.roles = [role]
+        db.session.add_all([role, user])
+        db.session.commit()
+        cache = app.extensions["user_cache"]
+        # Off by default (USER_CACHE_TTL); opt in as a deployment would
+        cache.ttl = 30
+        yield user.id, cache
+
+
+def _statements(app):
+    statements = []
+    event.listen(db.engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+    return statements
+
+
+def test_load_serves_snapshot_without_queries(app, cached_user):
+    """Test that a warm cache resolves the user and their permissions without SQL."""
+    user_id, cache = cached_user
+    with app.test_request_context():
+        assert isinstance(cache.load(user_id), User)
+
+    with app.test_request_context():
+        statements = _statements(app)
+        user = cache.load(user_id)
+        assert isinstance(user, UserSnapshot)
+        assert user.username == "cached"
+        assert user.full_name == "Cached User"
+        assert user.is_authenticated and user.is_active
+        assert user.has_permission("edit_products") and not user.is_admin
+        assert statements == []
+
+        assert user.check_password("password123")
+        assert isinstance(user.get_real_user(), User)
+
+
+def test_writes_to_the_user_invalidate_the_snapshot(app, cached_user):
+    """Test that update_user, password changes and delete_user drop the cached entry."""
+    user_id, cache = cached_user
+    with app.test_request_context():
+        cache.load(user_id)
+        UserService.update_user(user_id, {"username": "renamed", "email": "cached@example.com"})
+        user = cache.load(user_id)
+        assert isinstance(user, User) and user.username == "renamed"
+
+    with app.test_request_context():
+        snapshot = cache.load(user_id)
+        assert isinstance(snapshot, UserSnapshot)
+        snapshot.set_password("another-password")
+        db.session.commit()
+        assert isinstance(cache.load(user_id), User)
+
+    with app.test_request_context():
+        assert UserService.delete_user(user_id) is True
+        assert cache.load(user_id) is None
+
+
+def test_snapshot_of_a_deleted_user_logs_out(app, cached_user):
+    """Test that a snapshot whose row was deleted elsewhere ends the request as logged out, not a 500."""
+    user_id, cache = cached_user
+    with app.test_request_context():
+        cache.load(user_id)
+    # As another worker would: the row goes, this process's entry stays
+    db.session.execute(User.__table__.delete().where(User.__table__.c.id == user_id))
+    db.session.commit()
+
+    with app.test_request_context():
+        snapshot = cache.load(user_id)
+        assert isinstance(snapshot, UserSnapshot)
+        with pytest.raises(HTTPException) as raised:
+            snapshot.check_password("password123")
+        assert raised.value.get_response().status_code == 302
+    with app.test_request_context():
+        assert cache.load(user_id) is None
+
+
+def test_logged_in_requests_skip_the_user_select(client, app, cached_user):
+    """Test that the login loader stops selecting the user row once the cache is warm."""
+    client.post("/auth/login", data={"username": "cached", "password": "password123"})
+    client.get("/")
+
+    statements = _statements(app)
+    assert client.get("/").status_code == 200
+    assert not [s for s in statements if 'FROM "user"' in s or "FROM user " in s]
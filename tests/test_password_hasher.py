@@ -0,0 +1,97 @@
+"""Test the pooled password hasher and rehash-on-login."""
+import os
+import signal
+
+from werkzeug.security import generate_password_hash
+
+from app.metrics import metrics
+from app.models import db, User
+from app.password_hasher import PasswordHasher
+from app.services import UserService
+
+
+def _add_user(password_hash):
+    user = User(username='hasher', email='hasher@example.com', password_hash=password_hash)
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def test_login_upgrades_legacy_hashes(app, client):
+    """Test that a correct login re-hashes with the configured method, and a wrong one does not."""
+    user = _add_user(generate_password_hash('secret', 'pbkdf2:sha256:500'))
+
+    client.post('/auth/login', data={'username': 'hasher', 'password': 'wrong'})
+    db.session.refresh(user)
+    assert user.password_hash.startswith('pbkdf2:sha256:500$')
+
+    response = client.post('/auth/login', data={'username': 'hasher', 'password': 'secret'})
+    assert response.status_code == 302
+    db.session.refresh(user)
+    assert user.password_hash.startswith(app.config['PASSWORD_HASH_METHOD'] + '$')
+    assert user.check_password('secret')
+
+
+def test_user_service_hashes_through_the_hasher(app):
+    """Test that UserService writes hashes with the configured method."""
+    before = metrics.get('password_hash_operations_total', {'kind': 'hash', 'result': 'ok'}) or 0
+    user, errors = UserService.create_user({'username': 'svc', 'email': 'svc@example.com', 'password': 'password123'})
+    assert errors == {}
+    assert user.password_hash.startswith(app.config['PASSWORD_HASH_METHOD'] + '$')
+    assert metrics.get('password_hash_operations_total', {'kind': 'hash', 'result': 'ok'}) == before + 1
+
+
+def test_full_queue_rejects_with_503(app, client):
+    """Test that logins beyond the pending-job bound get a 503 instead of queueing."""
+    _add_user(generate_password_hash('secret'))
+    hasher = app.extensions['password_hasher']
+    hasher.queue_timeout = 0.01
+    for _ in range(hasher.max_pending):
+        hasher._slots.acquire()
+    try:
+        response = client.post('/auth/login', data={'username': 'hasher', 'password': 'secret'})
+    finally:
+        for _ in range(hasher.max_pending):
+            hasher._slots.release()
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+    assert metrics.get('password_hash_operations_total', {'kind': 'verify', 'result': 'rejected'}) >= 1
+
+
+def test_queue_depth_is_reported(app):
+    """Test the queue depth gauge while a job runs and after it finishes."""
+    hasher = app.extensions['password_hasher']
+    assert hasher._run('hash', lambda: metrics.get('password_hash_queue_depth')) == 1
+    assert metrics.get('password_hash_queue_depth') == 0
+
+
+def test_process_pool(app):
+    """Test hashing and verification in worker processes."""
+    app.config['PASSWORD_HASH_WORKERS'] = 1
+    hasher = PasswordHasher(app)
+    try:
+        pwhash = hasher.hash('secret')
+        assert pwhash.startswith(app.config['PASSWORD_HASH_METHOD'] + '$')
+        assert hasher.verify(pwhash, 'secret') and not hasher.verify(pwhash, 'other')
+        assert not hasher.needs_rehash(pwhash)
+        assert hasher.needs_rehash(generate_password_hash('secret', 'pbkdf2:sha256:500'))
+    finally:
+        hasher.shutdown()
+
+
+
+def test_dead_pool_worker_is_replaced(app):
+    """Test that jobs keep working after a pool process is killed."""
+    app.config['PASSWORD_HASH_WORKERS'] = 1
+    hasher = PasswordHasher(app)
+    try:
+        pwhash = hasher.hash('secret')
+        broken = hasher._executor
+        for pid in list(broken._processes):
+            os.kill(pid, signal.SIGKILL)
+
+        assert hasher.verify(pwhash, 'secret')
+        assert hasher._executor is not broken
+        assert hasher.verify(pwhash, 'secret')
+    finally:
+        hasher.shutdown()
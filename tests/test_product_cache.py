@@ -0,0 +1,190 @@
+"""Test the read-through product cache."""
+import json
+from decimal import Decimal
+
+from flask import current_app
+from sqlalchemy import event
+
+from app.metrics import metrics
+from app.models import db
+from app.product_cache import PRODUCT_COLUMNS, ProductCache, RedisProductStore
+from app.services.inventory_service import InventoryService
+from app.services.product_service import ProductService
+
+
+class FakeRedis:
+    """Local stand-in for a Redis client."""
+
+    def __init__(self):
+        self.data = {}
+
+    def mget(self, *keys):
+        return [self.data.get(key) for key in keys]
+
+    def setex(self, key, ttl, value):
+        self.data[key] = value.encode('utf-8')
+
+    def incr(self, key):
+        self.data[key] = str(int(self.data.get(key, b'0')) + 1).encode()
+        return int(self.data[key])
+
+    def expire(self, key, ttl):
+        return key in self.data
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+    def eval(self, script, numkeys, key, version_key, expected, ttl, payload):
+        # RedisProductStore.SET_IF_VERSION
+        assert script == RedisProductStore.SET_IF_VERSION
+        if self.data.get(version_key, b'0').decode() != expected:
+            return 0
+        self.setex(key, ttl, payload)
+        return 1
+
+
+def _fresh_get(product_id):
+    """Load a product as a new request would, in a new app context and so a new session."""
+    statements = []
+
+    def capture(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    with current_app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', capture)
+        try:
+            product = ProductService.get_product_by_id(product_id)
+            assert product is None or product in db.session
+            values = product and {c: getattr(product, c) for c in PRODUCT_COLUMNS}
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', capture)
+    return values, statements
+
+
+def test_repeat_reads_are_served_without_queries(app, sample_products):
+    """Test that a warm cache returns a session-attached product without SQL."""
+    product_id = sample_products[0].id
+    _fresh_get(product_id)
+    hits = metrics.get('product_cache_requests_total', {'tier': 'local', 'result': 'hit'})
+
+    product, statements = _fresh_get(product_id)
+    assert statements == []
+    assert (product['sku'], product['price'], product['stock_level']) == ('TP001', Decimal('10.99'), 50)
+    assert metrics.get('product_cache_requests_total', {'tier': 'local', 'result': 'hit'}) == hits + 1
+    assert _fresh_get(10 ** 6)[0] is None
+
+
+def test_writes_invalidate_the_cache(app, sample_products):
+    """Test that service, stock and bulk writes are visible to the next read."""
+    product_id = sample_products[0].id
+    _fresh_get(product_id)
+    ProductService.update_product(product_id, {'name': 'Renamed'})
+    assert _fresh_get(product_id)[0]['name'] == 'Renamed'
+
+    InventoryService.adjust_stock(product_id, -5)
+    assert _fresh_get(product_id)[0]['stock_level'] == 45
+
+    InventoryService.apply_stock_batch([{'sku': 'TP001', 'delta': 3}])
+    assert _fresh_get(product_id)[0]['stock_level'] == 48
+
+    ProductService.bulk_upsert([{'sku': 'TP001', 'price': '12.50'}])
+    assert _fresh_get(product_id)[0]['price'] == Decimal('12.50')
+
+    ProductService.delete_product(product_id)
+    assert _fresh_get(product_id)[0] is None
+
+
+def test_updates_start_from_the_stored_row(app, sample_products):
+    """Test that an edit of a stale cached product records the correct ledger delta."""
+    product_id = sample_products[0].id
+    _fresh_get(product_id)
+    # A write the cache cannot see, e.g. from another worker
+    db.session.execute(db.text('UPDATE product SET stock_level = 40 WHERE id = :id'), {'id': product_id})
+    db.session.commit()
+    assert _fresh_get(product_id)[0]['stock_level'] == 50
+
+    ProductService.update_product(product_id, {'stock_level': '42'})
+    movements = InventoryService.get_movements(product_id)
+    assert [m.delta for m in movements] == [2]
+
+
+def test_edit_route_saves_a_cached_product(app, client, sample_products):
+    """Test that the edit and stock routes work on products served from the cache."""
+    product_id = sample_products[0].id
+    assert client.get(f'/products/stock/in/{product_id}').status_code == 200
+    response = client.post(f'/products/edit/{product_id}', data={
+        'name': 'Edited', 'sku': 'TP001', 'description': '', 'price': '10.99',
+        'stock_level': '50', 'low_stock_threshold': '10',
+    })
+    assert response.status_code == 302
+    client.post(f'/products/stock/in/{product_id}', data={'quantity': '5'})
+    product = _fresh_get(product_id)[0]
+    assert (product['name'], product['stock_level']) == ('Edited', 55)
+
+
+def test_shared_tier(app, sample_products):
+    """Test that the shared tier is filled on a miss, read by other processes and invalidated."""
+    client = FakeRedis()
+    cache = app.extensions['product_cache']
+    cache.shared = RedisProductStore(client)
+    product_id = sample_products[0].id
+
+    _fresh_get(product_id)
+    assert json.loads(client.data[f'product:{product_id}'])['price'] == '10.99'
+
+    # Another worker: empty local tier, same shared store
+    cache.clear()
+    product, statements = _fresh_get(product_id)
+    assert statements == [] and product['price'] == Decimal('10.99')
+
+    InventoryService.adjust_stock(product_id, 1)
+    assert f'product:{product_id}' not in client.data
+
+
+def test_local_tier_bounds(app, sample_products):
+    """Test the LRU bound, the TTL and the guard against caching a row read before an invalidation."""
+    cache = ProductCache()
+    cache.ttl, cache.max_entries = 60, 2
+    for product_id in (1, 2, 3):
+        cache.put(product_id, {'id': product_id})
+    assert cache.get(1) is None and cache.get(3) == {'id': 3}
+
+    generation = cache._generation
+    cache.invalidate([4])
+    cache.put(4, {'id': 4}, generation)
+    assert cache.get(4) is None
+
+    cache.put(5, {'id': 5})
+    expires_at, data = cache._entries[5]
+    cache._entries[5] = (expires_at - 61, data)
+    assert cache.get(5) is None and 5 not in cache._entries
+
+
+def test_shared_tier_keeps_out_rows_read_before_another_workers_write(app, sample_products):
+    """Test that a row read before another worker's write and invalidation is not cached in the shared tier."""
+    client = FakeRedis()
+    cache = app.extensions['product_cache']
+    cache.shared = RedisProductStore(client)
+    other_worker = ProductCache(shared=RedisProductStore(client))
+    product_id = sample_products[0].id
+    key = f'product:{product_id}'
+    raced = []
+
+    def write_after_read(conn, cursor, statement, parameters, context, executemany):
+        # This worker has read the row; the other one now commits a change to it and invalidates
+        if not raced and statement.lstrip().startswith('SELECT') and 'FROM product' in statement:
+            raced.append(True)
+            other_worker.invalidate([product_id])
+
+    cache.clear()
+    event.listen(db.engine, 'after_cursor_execute', write_after_read)
+    try:
+        assert _fresh_get(product_id)[0]['stock_level'] == 50
+    finally:
+        event.remove(db.engine, 'after_cursor_execute', write_after_read)
+    assert raced and key not in client.data
+
+    # The next read, after the invalidation, is cached again
+    cache.clear()
+    _fresh_get(product_id)
+    assert json.loads(client.data[key])['stock_level'] == 50
@@ -0,0 +1,130 @@
+"""Test the in-process product typeahead index."""
+import sys
+import threading
+
+from sqlalchemy import event
+
+from app.models import db
+from app.product_lookup import PrefixIndex, ProductLookup, get_product_lookup
+from app.services.product_service import ProductService
+
+
+def test_prefix_index_matches_skus_and_name_words():
+    """Test that prefixes match SKUs and the start of any name word, case-insensitively."""
+    index = PrefixIndex.build([(1, 'WID-100', 'Blue Widget'), (2, 'GAD-200', 'Widget Gadget'),
+                               (3, 'SPR-300', 'Sprocket')])
+    assert [r[0] for r in index.lookup('wid', 10)] == [1, 2]
+    assert index.lookup('blue w', 10) == [(1, 'WID-100', 'Blue Widget')]
+    assert index.lookup('SPR-3', 10) == [(3, 'SPR-300', 'Sprocket')]
+    assert index.lookup('', 10) == []
+    assert len(index.lookup('w', 1)) == 1
+
+    index.upsert(1, 'WID-100', 'Red Gizmo')
+    assert index.lookup('blue', 10) == []
+    assert index.lookup('gizmo', 10) == [(1, 'WID-100', 'Red Gizmo')]
+    index.remove(2)
+    assert [r[0] for r in index.lookup('wid', 10)] == [1]
+
+
+def test_prefix_index_respects_max_products():
+    """Test that a catalog over the size bound yields no index."""
+    rows = [(i, f'SKU{i}', f'Product {i}') for i in range(5)]
+    assert PrefixIndex.build(rows, max_products=4) is None
+    assert len(PrefixIndex.build(rows, max_products=5)) == 5
+
+
+def test_lookup_follows_product_service_writes(app, sample_products):
+    """Test that create/update/delete through ProductService keep the index current."""
+    lookup = get_product_lookup()
+    assert [r[1] for r in lookup.lookup('tp00')] == ['TP001', 'TP002']
+
+    product, _ = ProductService.create_product({'name': 'Scanner Dock', 'sku': 'TP003', 'price': '5'})
+    ProductService.update_product(sample_products[0].id, {'name': 'Renamed Dock'})
+    ProductService.delete_product(sample_products[1].id)
+
+    assert [r[1] for r in lookup.lookup('tp00')] == ['TP001', 'TP003']
+    assert [r[2] for r in lookup.lookup('dock')] == ['Renamed Dock', 'Scanner Dock']
+    assert lookup.size == 2
+
+
+def test_database_fallback_matches_the_index(app):
+    """Test that a lookup answers the same whether it is served by the index or by the database."""
+    ProductService.bulk_upsert([
+        {'name': 'Blue Widget', 'sku': 'WID-100', 'price': '1'},
+        {'name': 'widget gadget', 'sku': 'gad-200', 'price': '1'},
+        {'name': 'Sprocket  Widget_Mount', 'sku': 'SPR-300', 'price': '1'},
+        {'name': 'Gizmo', 'sku': 'GIZ_1%', 'price': '1'},
+    ])
+    lookup = get_product_lookup()
+    lookup.rebuild()
+    for prefix in ('wid', 'WIDGET', 'Blue W', 'gad', 'widget_', 'giz_1%', 'spr', ' sprocket  widget', 'ZZZ', 'g'):
+        expected = lookup.lookup(prefix)
+        assert ProductLookup._query(prefix, 10) == expected, prefix
+    assert [r[1] for r in ProductLookup._query('widget', 10)] == [r[1] for r in lookup.lookup('widget')] != []
+
+
+def test_large_catalogs_use_the_full_text_index(app):
+    """Test that above the size bound lookups are answered from the full-text index, not a LIKE scan."""
+    ProductService.bulk_upsert([{'name': f'Widget {i}', 'sku': f'WID-{i}', 'price': '1'} for i in range(3)])
+    lookup = get_product_lookup()
+    lookup.max_products = 2
+    lookup.rebuild()
+    assert lookup.size is None
+    statements = []
+
+    def capture(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', capture)
+    try:
+        assert [r[1] for r in lookup.lookup('widget 1')] == ['WID-1']
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', capture)
+    assert any('MATCH' in statement for statement in statements)
+    assert not any('LIKE' in statement for statement in statements)
+
+
+def test_lookups_run_safely_alongside_writes(app):
+    """Test that lookups walking the index never see entries shifted by concurrent upserts and removes."""
+    lookup = get_product_lookup()
+    lookup.rebuild()
+    for i in range(200):
+        lookup.upsert(i, f'SKU{i:03d}', f'Part {i}')
+    errors = []
+
+    def churn():
+        for _ in range(20):
+            for i in range(0, 200, 2):
+                lookup.remove(i)
+            for i in range(0, 200, 2):
+                lookup.upsert(i, f'SKU{i:03d}', f'Part {i}')
+
+    writer = threading.Thread(target=churn)
+    # Switch threads as often as possible, so the writer runs in the middle of index walks
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    writer.start()
+    try:
+        while writer.is_alive():
+            lookup.lookup('sku', 200)
+    except IndexError as e:
+        errors.append(e)
+    finally:
+        writer.join()
+        sys.setswitchinterval(interval)
+    assert errors == []
+
+
+def test_bulk_writes_trigger_a_rebuild(app, sample_products):
+    """Test that bulk upserts mark the index for a rebuild on the next lookup."""
+    lookup = get_product_lookup()
+    lookup.lookup('tp')
+    ProductService.bulk_upsert([{'name': 'Bulk Item', 'sku': 'BULK1', 'price': '1'}])
+    assert [r[1] for r in lookup.lookup('bulk')] == ['BULK1']
+
+
+def test_rebuild_command(app, sample_products):
+    """Test the flask product-lookup rebuild command."""
+    result = app.test_cli_runner().invoke(args=['product-lookup', 'rebuild'])
+    assert result.exit_code == 0
+    assert 'Built product lookup index: 2 products' in result.output
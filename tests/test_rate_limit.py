@@ -0,0 +1,100 @@
+"""Test token-bucket rate limiting of the auth endpoints."""
+import re
+
+import pytest
+
+from app import create_app
+from app.metrics import metrics
+from app.models import db
+from app.rate_limit import MemoryBucketStore, parse_limit
+
+
+def _db_queries(response):
+    timing = ','.join(response.headers.getlist('Server-Timing'))
+    return int(re.search(r'desc="(\d+) queries"', timing).group(1))
+
+
+def _login(client, username, ip='10.0.0.1'):
+    return client.post('/auth/login', data={'username': username, 'password': 'wrong'},
+                       environ_base={'REMOTE_ADDR': ip})
+
+
+def test_parse_limit():
+    """Test the limit syntax."""
+    assert parse_limit('10/minute') == (10, 10 / 60)
+    assert parse_limit('100 / 5 minutes') == (100, 100 / 300)
+    assert parse_limit('3/hour') == (3, 3 / 3600)
+    for invalid in ('10', '0/minute', 'ten/minute', '10/fortnight'):
+        with pytest.raises(ValueError):
+            parse_limit(invalid)
+
+
+def test_username_bucket_rejects_before_any_query(app, client):
+    """Test that a username over its limit gets a 429 without touching the database."""
+    limiter = app.extensions['rate_limiter']
+    limiter.limits['auth.login'] = {'ip': parse_limit('100/minute'), 'username': parse_limit('3/minute')}
+    rejected = metrics.get('rate_limit_rejections_total', {'endpoint': 'auth.login', 'key': 'username'}) or 0
+
+    for i in range(3):
+        # Case and address do not matter: the bucket belongs to the username
+        assert _login(client, 'Victim' if i else 'victim', ip=f'10.0.0.{i}').status_code == 200
+    response = _login(client, 'VICTIM ', ip='10.0.0.9')
+    assert response.status_code == 429
+    assert int(response.headers['Retry-After']) >= 1
+    assert _db_queries(response) == 0
+    assert metrics.get('rate_limit_rejections_total', {'endpoint': 'auth.login', 'key': 'username'}) == rejected + 1
+
+    assert _login(client, 'someone-else').status_code == 200
+    assert client.get('/auth/login', environ_base={'REMOTE_ADDR': '10.0.0.9'}).status_code == 200
+
+
+def test_ip_bucket_limits_many_usernames(app, client):
+    """Test that one address cycling through usernames is stopped by its own bucket."""
+    app.extensions['rate_limiter'].limits['auth.login'] = {'ip': parse_limit('5/minute'),
+                                                          'username': parse_limit('5/minute')}
+    statuses = [_login(client, f'user{i}').status_code for i in range(6)]
+    assert statuses == [200] * 5 + [429]
+    assert _login(client, 'user0', ip='10.0.0.2').status_code == 200
+
+
+def test_rejection_spends_no_tokens(app, client):
+    """Test that hammering a locked-out username does not drain the address's bucket."""
+    app.extensions['rate_limiter'].limits['auth.login'] = {'ip': parse_limit('3/minute'),
+                                                          'username': parse_limit('1/minute')}
+    assert _login(client, 'victim').status_code == 200
+    assert [_login(client, 'victim').status_code for _ in range(5)] == [429] * 5
+    # Others behind the same address still have the two remaining tokens
+    assert [_login(client, f'colleague{i}').status_code for i in range(3)] == [200, 200, 429]
+
+
+def test_reset_requests_are_limited_per_email(app, client):
+    """Test the default per-email limit on password reset requests."""
+    statuses = [client.post('/auth/reset_password', data={'email': 'nobody@example.com'}).status_code
+                for _ in range(4)]
+    assert statuses[-1] == 429 and 429 not in statuses[:3]
+
+
+def test_buckets_refill(app):
+    """Test that tokens come back at the configured rate."""
+    store = MemoryBucketStore()
+    assert [store.take('k', 2, 1 / 30)[0] for _ in range(3)] == [True, True, False]
+    assert 29 < store.take('k', 2, 1 / 30)[1] <= 30
+
+    tokens, updated = store._buckets['k']
+    store._buckets['k'] = (tokens, updated - 30)
+    assert store.take('k', 2, 1 / 30) == (True, 0.0)
+
+
+def test_shared_store_spans_workers(app):
+    """Test that two app instances using one store share the buckets, as with the Redis backend."""
+    other = create_app('testing')
+    with other.app_context():
+        db.create_all()
+    store = app.extensions['rate_limiter'].store
+    other.extensions['rate_limiter'].store = store
+    for limiter in (app.extensions['rate_limiter'], other.extensions['rate_limiter']):
+        limiter.limits['auth.login'] = {'ip': parse_limit('2/minute')}
+
+    assert _login(app.test_client(), 'a').status_code == 200
+    assert _login(other.test_client(), 'b').status_code == 200
+    assert _login(app.test_client(), 'c').status_code == 429
@@ -0,0 +1,121 @@
+"""Test the /api/v1 product API."""
+import json
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import event
+
+from app.models import db
+from app.utils import serialization
+
+
+def test_list_products_paginates_with_cursors(client, sample_products):
+    """Test keyset pagination over the product list."""
+    response = client.get('/api/v1/products?per_page=1')
+    assert response.status_code == 200
+    assert response.mimetype == 'application/json'
+    body = response.get_json()
+    assert [item['sku'] for item in body['items']] == ['TP001']
+    assert body['items'][0]['price'] == '10.99'
+    assert body['prev_cursor'] is None
+
+    body = client.get(f"/api/v1/products?per_page=1&after={body['next_cursor']}").get_json()
+    assert [item['sku'] for item in body['items']] == ['TP002']
+    assert body['next_cursor'] is None
+
+
+def test_fields_projection(client, sample_products):
+    """Test that ?fields= returns only the requested fields."""
+    body = client.get('/api/v1/products?fields=sku,stock_level').get_json()
+    assert body['items'] == [{'sku': 'TP001', 'stock_level': 50}, {'sku': 'TP002', 'stock_level': 5}]
+
+    response = client.get(f'/api/v1/products/{sample_products[0].id}?fields=name')
+    assert response.get_json() == {'name': 'Test Product 1'}
+
+    response = client.get('/api/v1/products?fields=sku,password')
+    assert response.status_code == 400
+    assert 'password' in response.get_json()['error']
+
+
+def test_list_selects_only_requested_columns(app, client, sample_products):
+    """Test that the list query selects the projection and the sort key, not every column."""
+    statements = []
+
+    def capture(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', capture)
+    try:
+        client.get('/api/v1/products?fields=sku')
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', capture)
+    select_sql = next(s for s in statements if 'FROM product' in s)
+    assert 'product.sku' in select_sql
+    assert 'product.description' not in select_sql
+
+
+def test_create_update_delete(client, app):
+    """Test the write endpoints and their validation errors."""
+    response = client.post('/api/v1/products', json={'name': 'API Product', 'sku': 'API001', 'price': 4.5,
+                                                     'stock_level': 7, 'low_stock_threshold': 2})
+    assert response.status_code == 201
+    created = response.get_json()
+    assert created['sku'] == 'API001' and created['price'] == '4.50'
+    assert response.headers['Location'].endswith(f"/api/v1/products/{created['id']}")
+
+    response = client.patch(f"/api/v1/products/{created['id']}", json={'stock_level': 3})
+    assert response.status_code == 200
+    assert response.get_json()['stock_level'] == 3
+
+    response = client.patch(f"/api/v1/products/{created['id']}", json={'stock_level': 2.5})
+    assert response.status_code == 400
+    assert 'stock_level' in response.get_json()['errors']
+
+    response = client.post('/api/v1/products', json={'name': 'Dup', 'sku': 'API001'})
+    assert response.status_code == 400
+    assert 'sku' in response.get_json()['errors']
+
+    assert client.post('/api/v1/products', json={'id': 5, 'name': 'X', 'sku': 'X1'}).status_code == 400
+    assert client.post('/api/v1/products', data='not json', content_type='application/json').status_code == 400
+
+    assert client.delete(f"/api/v1/products/{created['id']}").status_code == 204
+    assert client.delete(f"/api/v1/products/{created['id']}").status_code == 404
+    assert client.get(f"/api/v1/products/{created['id']}").status_code == 404
+    assert client.patch(f"/api/v1/products/{created['id']}", json={'name': 'Gone'}).status_code == 404
+
+
+def test_json_fallback_without_orjson(client, sample_products):
+    """Test that responses are still JSON when orjson is not installed."""
+    with patch.object(serialization, 'orjson', None):
+        response = client.get('/api/v1/products?fields=sku,price')
+    assert json.loads(response.data)['items'][0] == {'sku': 'TP001', 'price': '10.99'}
+
+
+def test_msgpack_when_accepted(client, sample_products):
+    """Test MessagePack negotiation through the Accept header."""
+    msgpack = pytest.importorskip('msgpack')
+    response = client.get('/api/v1/products?fields=sku', headers={'Accept': 'application/msgpack'})
+    assert response.mimetype == 'application/msgpack'
+    assert msgpack.unpackb(response.data)['items'][0] == {'sku': 'TP001'}
+
+
+def test_batch_get(app, client, sample_products):
+    """Test resolving many SKUs or ids in one request."""
+    response = client.post('/api/v1/products/batch-get?fields=sku,price,stock_level',
+                           json={'skus': ['TP001', 'MISSING', 'TP002']})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['products'] == {
+        'TP001': {'sku': 'TP001', 'price': '10.99', 'stock_level': 50},
+        'MISSING': None,
+        'TP002': {'sku': 'TP002', 'price': '20.99', 'stock_level': 5},
+    }
+    assert body['missing'] == ['MISSING']
+
+    body = client.post('/api/v1/products/batch-get?fields=sku', json={'ids': [sample_products[0].id]}).get_json()
+    assert body['products'] == {str(sample_products[0].id): {'sku': 'TP001'}}
+
+    assert client.post('/api/v1/products/batch-get', json={'skus': 'TP001'}).status_code == 400
+    assert client.post('/api/v1/products/batch-get', json={'skus': [], 'ids': []}).status_code == 400
+    app.config['PRODUCT_BATCH_GET_MAX_ITEMS'] = 2
+    assert client.post('/api/v1/products/batch-get', json={'skus': ['a', 'b', 'c']}).status_code == 413
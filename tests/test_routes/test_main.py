@@ -1,4 +1,8 @@
 """Test the main routes."""
+import re
+from app.models import db, Product, User
+from app.services.inventory_summary_service import InventorySummaryService
+from app.services.product_service import ProductService
 
 def test_product_list(client, sample_products):
     """Test the product list (dashboard) route."""
@@ -16,3 +20,92 @@ def test_inventory_status(client, sample_products):
     for product in sample_products:
         assert product.name.encode() in response.data
 
+def test_product_list_paginates_with_cursors(client, app):
+    """Test that the dashboard renders one keyset page at a time with next/prev links."""
+    with app.app_context():
+        db.session.add_all([
+            Product(name=f'Paged Product {i:02d}', sku=f'PG{i:03d}', price=1, stock_level=50,
+                    low_stock_threshold=10)
+            for i in range(5)
+        ])
+        db.session.commit()
+
+    response = client.get('/?per_page=2')
+    assert response.status_code == 200
+    assert b'Paged Product 00' in response.data
+    assert b'Paged Product 01' in response.data
+    assert b'Paged Product 02' not in response.data
+    assert b'Next' in response.data
+    assert b'Previous' not in response.data
+
+    with app.app_context():
+        next_cursor = ProductService.get_products_page(per_page=2).next_cursor
+
+    response = client.get(f'/?per_page=2&after={next_cursor}')
+    assert response.status_code == 200
+    assert b'Paged Product 02' in response.data
+    assert b'Paged Product 03' in response.data
+    assert b'Paged Product 01' not in response.data
+    assert b'Previous' in response.data
+
+def test_inventory_status_ignores_malformed_cursor(client, sample_products):
+    """Test that a garbage cursor falls back to the first page."""
+    response = client.get('/inventory_status?after=not-a-cursor')
+    assert response.status_code == 200
+    for product in sample_products:
+        assert product.name.encode() in response.data
+
+def _db_queries(response):
+    """Number of SQL statements the request issued, from its Server-Timing header."""
+    header = next(h for h in response.headers.getlist('Server-Timing') if h.startswith('db;'))
+    return int(re.search(r'desc="(\d+) queries"', header).group(1))
+
+def test_unchanged_dashboard_answers_304_with_one_query(client, sample_products):
+    """Test that a matching If-None-Match skips the view after a single query."""
+    InventorySummaryService.rebuild()
+    response = client.get('/')
+    assert response.status_code == 200
+    etag = response.headers['ETag']
+    assert etag.startswith('W/"')
+    assert response.headers['Last-Modified']
+    assert response.headers['Cache-Control'] == 'private, no-cache'
+
+    response = client.get('/', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.data == b''
+    assert response.headers['ETag'] == etag
+    assert _db_queries(response) == 1
+
+def test_product_write_changes_the_etag(client, sample_products):
+    """Test that a write through the services invalidates the validator."""
+    InventorySummaryService.rebuild()
+    etag = client.get('/inventory_status').headers['ETag']
+
+    ProductService.update_product(sample_products[0].id, {'stock_level': 3})
+
+    response = client.get('/inventory_status', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert sample_products[0].name.encode() in response.data
+
+def test_etag_depends_on_page_and_user(app, client, sample_products):
+    """Test that query strings and logged-in users get their own validators."""
+    InventorySummaryService.rebuild()
+    anonymous = client.get('/').headers['ETag']
+    assert client.get('/?per_page=1').headers['ETag'] != anonymous
+
+    user = User(username='etaguser', email='etag@example.com')
+    user.set_password('password')
+    db.session.add(user)
+    db.session.commit()
+    client.post('/auth/login', data={'username': 'etaguser', 'password': 'password'})
+
+    response = client.get('/', headers={'If-None-Match': anonymous})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != anonymous
+
+def test_conditional_get_is_skipped_without_summary(client, sample_products):
+    """Test that pages render normally, without validators, before the summary exists."""
+    response = client.get('/', headers={'If-None-Match': '*'})
+    assert response.status_code == 200
+    assert 'ETag' not in response.headers
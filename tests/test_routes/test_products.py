@@ -150,4 +150,124 @@ def test_stock_out(client, sample_products, app):
         assert updated_product.stock_level == original_stock - 5
 
 
+def test_stock_out_product_archived_concurrently(client, sample_products, app, monkeypatch):
+    """Test that a product archived mid-request is reported as not found, not as short on stock."""
+    from app.services.inventory_service import InventoryService
+    product_id = sample_products[0].id
+    monkeypatch.setattr(InventoryService, 'apply_stock_delta',
+                        staticmethod(lambda *args, **kwargs: (None, "Product not found.")))
+
+    response = client.post(f'/products/stock/out/{product_id}', data={'quantity': '5'},
+                           follow_redirects=True)
+    assert response.status_code == 200
+    assert b'Product not found.' in response.data
+    assert b'Cannot remove' not in response.data
+
+
+
+
+def test_stock_routes_keep_inventory_summary_in_sync(client, sample_products, app):
+    """Test that stock in/out and delete routes update the inventory summary."""
+    from app.services.inventory_summary_service import InventorySummaryService
+    with app.app_context():
+        InventorySummaryService.rebuild()
+    product_id = sample_products[1].id
+
+    client.post(f'/products/stock/in/{product_id}', data={'quantity': '20'})
+    client.post(f'/products/stock/out/{product_id}', data={'quantity': '25'})
+    client.post(f'/products/delete/{sample_products[0].id}')
+
+    with app.app_context():
+        assert InventorySummaryService.check_drift() == {}
+
+def test_stock_routes_write_ledger_entries(client, sample_products, app):
+    """Test that the stock in/out routes append movements with their reason."""
+    from app.models import StockMovement
+    product_id = sample_products[0].id
+
+    client.post(f'/products/stock/in/{product_id}', data={'quantity': '7'})
+    client.post(f'/products/stock/out/{product_id}', data={'quantity': '3'})
+    client.post(f'/products/stock/out/{product_id}', data={'quantity': '5000'})  # rejected
+
+    with app.app_context():
+        movements = StockMovement.query.filter_by(product_id=product_id).order_by(StockMovement.id).all()
+        assert [(m.reason, m.delta) for m in movements] == [
+            (StockMovement.REASON_STOCK_IN, 7),
+            (StockMovement.REASON_STOCK_OUT, -3),
+        ]
+
+def test_stock_batch_json(client, sample_products, app):
+    """Test the batch stock endpoint with a JSON array."""
+    response = client.post('/products/stock/batch', json=[
+        {'sku': 'TP001', 'delta': -10},
+        {'sku': 'TP002', 'delta': -6},
+    ])
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['applied'] == 1
+    assert data['rejected'] == 1
+    assert data['results'][1]['status'] == 'insufficient_stock'
+
+    with app.app_context():
+        assert db.session.get(Product, sample_products[0].id).stock_level == 40
+
+def test_stock_batch_ndjson(client, sample_products, app):
+    """Test the batch stock endpoint with NDJSON lines."""
+    body = '{"sku": "TP002", "delta": 5}\n{"sku": "TP002", "delta": -10}\n'
+    response = client.post('/products/stock/batch', data=body, content_type='application/x-ndjson')
+    assert response.status_code == 200
+    assert [r['stock_level'] for r in response.get_json()['results']] == [10, 0]
+
+def test_stock_batch_rejects_malformed_body(client, app):
+    """Test that unparseable or oversized batches are rejected up front."""
+    response = client.post('/products/stock/batch', data='not json', content_type='application/json')
+    assert response.status_code == 400
+
+    app.config['STOCK_BATCH_MAX_ITEMS'] = 1
+    response = client.post('/products/stock/batch', json=[{'sku': 'A', 'delta': 1}] * 2)
+    assert response.status_code == 413
+
+def test_import_products_upload(client, app, tmp_path):
+    """Test the CSV upload endpoint, including the rejected-rows download."""
+    import io
+    app.instance_path = str(tmp_path)
+    body = b"name,sku,price,stock_level\nUploaded,UP001,2.50,4\nBroken,,1.00,1\n"
+
+    response = client.get('/products/import')
+    assert response.status_code == 200
+
+    response = client.post('/products/import', data={'csv_file': (io.BytesIO(body), 'catalog.csv')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 200
+    assert b'1 imported, 1 rejected' in response.data
 
+    with app.app_context():
+        assert Product.query.filter_by(sku='UP001').one().stock_level == 4
+
+    error_link = response.data.split(b'/products/import/errors/')[1].split(b'"')[0].decode()
+    download = client.get(f'/products/import/errors/{error_link}')
+    assert download.status_code == 200
+    assert b'Sku is required.' in download.data
+
+    assert client.get('/products/import/errors/..%2Fsecret.csv').status_code == 404
+
+def test_search_page(client, sample_products):
+    """Test the product search page."""
+    response = client.get('/products/search?q=TP002')
+    assert response.status_code == 200
+    assert b'Test Product 2' in response.data
+    assert b'Test Product 1' not in response.data
+
+    response = client.get('/products/search?q=nothing-like-this')
+    assert response.status_code == 200
+    assert b'No products match' in response.data
+
+def test_lookup_endpoint(client, sample_products):
+    """Test the typeahead JSON endpoint."""
+    response = client.get('/products/lookup?prefix=tp00&limit=1')
+    assert response.status_code == 200
+    assert response.get_json() == {
+        'prefix': 'tp00',
+        'results': [{'id': sample_products[0].id, 'sku': 'TP001', 'name': 'Test Product 1'}],
+    }
+    assert client.get('/products/lookup').get_json()['results'] == []
@@ -1,4 +1,5 @@
 """Test the report routes."""
+from app.services.inventory_summary_service import InventorySummaryService
 
 def test_low_stock_report(client, sample_products, app):
     """Test the low stock report route."""
@@ -45,3 +46,49 @@ def test_product_value_report(client, sample_products, app):
 
 
 
+def test_product_summary_report_csv_export(client, sample_products):
+    """Test that ?format=csv streams the summary as CSV."""
+    import csv
+    import io
+
+    response = client.get('/reports/product_summary?format=csv')
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert response.mimetype == 'text/csv'
+    assert 'attachment' in response.headers['Content-Disposition']
+
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert [r['sku'] for r in rows] == ['TP001', 'TP002']
+    assert rows[0]['price'] == '10.99'
+    assert rows[1]['status'] == 'Low Stock'
+
+def test_product_value_report_ndjson_export(client, sample_products, app):
+    """Test that ?format=ndjson streams one JSON object per product."""
+    import json
+
+    app.config['REPORT_EXPORT_BATCH_SIZE'] = 1
+    response = client.get('/reports/product_value?format=ndjson')
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [line['sku'] for line in lines] == ['TP001', 'TP002']
+    assert lines[0]['total_value'] == '549.50'
+
+def test_report_export_rejects_unknown_format(client, sample_products):
+    """Test that an unsupported export format is a 400."""
+    assert client.get('/reports/low_stock?format=xml').status_code == 400
+    response = client.get('/reports/low_stock?format=csv')
+    assert response.get_data(as_text=True).splitlines()[1].startswith('Test Product 2,TP002')
+
+def test_reports_answer_conditional_gets(client, sample_products):
+    """Test that each report and each export format revalidates on its own ETag."""
+    InventorySummaryService.rebuild()
+    for url in ('/reports/low_stock', '/reports/product_summary', '/reports/product_value',
+                '/reports/product_summary?format=csv'):
+        etag = client.get(url).headers['ETag']
+        response = client.get(url, headers={'If-None-Match': etag})
+        assert response.status_code == 304, url
+
+    html = client.get('/reports/product_summary').headers['ETag']
+    assert client.get('/reports/product_summary?format=csv').headers['ETag'] != html
@@ -1,4 +1,5 @@
 from app.services.inventory_service import InventoryService
+from app.models import db, Product
 
 def test_get_low_stock_products(app, sample_products):
     """Test getting low stock products."""
@@ -39,6 +40,193 @@ def test_adjust_stock(app, sample_products):
         product = InventoryService.adjust_stock(product_id, -5)
         assert product.stock_level == original_stock + 5
         
-        # Try to remove too much stock
+        # Try to remove too much stock: rejected, stock left unchanged
         product = InventoryService.adjust_stock(product_id, -1000)
-        assert product.stock_level == 0  # Should not go below zero
+        assert product is None
+        assert InventoryService.adjust_stock(product_id, 0).stock_level == original_stock + 5
+
+def test_get_inventory_stats_matches_python_implementation(app, sample_products):
+    """Test that the aggregate SQL stats agree with calculate_inventory_stats."""
+    from app.models import db, Product
+    from app.utils import calculate_inventory_stats
+    with app.app_context():
+        db.session.add_all([
+            Product(name='Empty Shelf', sku='ES001', price=3.50, stock_level=0, low_stock_threshold=5),
+            Product(name='Edge Case', sku='EC001', price=7.25, stock_level=10, low_stock_threshold=10),
+            Product(name='No Threshold', sku='NT001', price=1.10, stock_level=0, low_stock_threshold=-1),
+        ])
+        db.session.commit()
+
+        expected = calculate_inventory_stats(Product.query.all())
+        stats = InventoryService.get_inventory_stats()
+
+        assert stats == expected
+        assert stats['out_of_stock_count'] == 2
+        assert stats['low_stock_count'] == 3
+
+def test_get_inventory_stats_empty_catalog(app):
+    """Test the aggregate stats on an empty product table."""
+    from app.utils import calculate_inventory_stats
+    with app.app_context():
+        assert InventoryService.get_inventory_stats() == calculate_inventory_stats([])
+
+def test_get_inventory_stats_falls_back_on_query_error(app, sample_products, mocker):
+    """Test that a failing aggregate query falls back to the Python implementation."""
+    from app.models import db
+    from sqlalchemy.exc import OperationalError
+    with app.app_context():
+        mocker.patch.object(db.session, 'query', side_effect=OperationalError('SELECT', {}, Exception('boom')))
+        stats = InventoryService.get_inventory_stats()
+        assert stats['total_products'] == len(sample_products)
+
+def test_apply_stock_delta(app, sample_products):
+    """Test the conditional UPDATE primitive, including rejections."""
+    with app.app_context():
+        product_id = sample_products[1].id  # stock_level 5
+
+        assert InventoryService.apply_stock_delta(product_id, -5) == (0, None)
+        assert InventoryService.apply_stock_delta(product_id, -1) == (None, "Insufficient stock.")
+        assert InventoryService.apply_stock_delta(product_id, 3) == (3, None)
+        assert InventoryService.apply_stock_delta(999999, 1) == (None, "Product not found.")
+
+def test_concurrent_stock_adjustments_do_not_lose_updates(monkeypatch, tmp_path):
+    """Hammer one SKU from many threads and check the final count is exact."""
+    import threading
+    from app import create_app
+    from app.models import db, Product
+    from config import config_by_name
+
+    monkeypatch.setattr(config_by_name["testing"], "SQLALCHEMY_DATABASE_URI",
+                        f"sqlite:///{tmp_path / 'concurrency.db'}")
+    app = create_app("testing")
+    with app.app_context():
+        db.create_all()
+        product = Product(name='Hot SKU', sku='HOT001', price=1, stock_level=100, low_stock_threshold=0)
+        db.session.add(product)
+        db.session.commit()
+        product_id = product.id
+
+    threads_count, iterations = 8, 25
+    rejected = []
+
+    def picker(delta):
+        with app.app_context():
+            for _ in range(iterations):
+                if InventoryService.adjust_stock(product_id, delta) is None:
+                    rejected.append(delta)
+
+    # Half the threads restock by 1, half pick 2 at a time
+    threads = [threading.Thread(target=picker, args=(1 if i % 2 else -2,)) for i in range(threads_count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with app.app_context():
+        final_level = db.session.get(Product, product_id).stock_level
+        applied_in = (threads_count // 2) * iterations
+        applied_out = (threads_count // 2) * iterations - len(rejected)
+        assert final_level == 100 + applied_in - 2 * applied_out
+        assert final_level >= 0
+        db.drop_all()
+
+def test_stock_movements_are_recorded(app):
+    """Test that product creation, corrections and adjustments append to the ledger."""
+    from app.models import StockMovement
+    from app.services.product_service import ProductService
+    with app.app_context():
+        product, _ = ProductService.create_product({
+            'name': 'Ledger Product', 'sku': 'LDG001', 'price': '2.00',
+            'stock_level': '10', 'low_stock_threshold': '1'
+        })
+        ProductService.update_product(product.id, {'stock_level': '12'})
+        InventoryService.adjust_stock(product.id, -4, StockMovement.REASON_STOCK_OUT)
+        InventoryService.adjust_stock(product.id, -100, StockMovement.REASON_STOCK_OUT)  # rejected
+
+        movements = InventoryService.get_movements(product.id)
+        assert [(m.reason, m.delta) for m in movements] == [
+            (StockMovement.REASON_STOCK_OUT, -4),
+            (StockMovement.REASON_CORRECTION, 2),
+            (StockMovement.REASON_INITIAL, 10),
+        ]
+        assert sum(m.delta for m in movements) == db.session.get(Product, product.id).stock_level
+
+def test_get_stock_level_at_replays_from_snapshot(app):
+    """Test point-in-time stock levels with and without snapshots."""
+    from datetime import datetime, timezone
+    from app.models import StockSnapshot
+    from app.services.product_service import ProductService
+    with app.app_context():
+        product, _ = ProductService.create_product({
+            'name': 'Time Travel', 'sku': 'TT001', 'price': '1.00',
+            'stock_level': '5', 'low_stock_threshold': '1'
+        })
+        InventoryService.adjust_stock(product.id, 3)
+        after_restock = datetime.now(timezone.utc)
+
+        assert InventoryService.take_snapshots() == 1
+        assert InventoryService.take_snapshots() == 0  # Nothing moved since
+
+        InventoryService.adjust_stock(product.id, -6)
+        now = datetime.now(timezone.utc)
+
+        assert InventoryService.get_stock_level_at(product.id, after_restock) == 8
+        assert InventoryService.get_stock_level_at(product.id, now) == 2
+        assert StockSnapshot.query.filter_by(product_id=product.id).one().stock_level == 8
+
+def test_stock_snapshot_cli(app, sample_products):
+    """Test the stock snapshot CLI command."""
+    runner = app.test_cli_runner()
+    with app.app_context():
+        InventoryService.adjust_stock(sample_products[0].id, 1)
+
+    result = runner.invoke(args=['stock', 'snapshot'])
+    assert result.exit_code == 0
+    assert 'Wrote 1 stock snapshot(s).' in result.output
+
+def test_apply_stock_batch(app, sample_products):
+    """Test a mixed batch: in-order checks, rejections, unknown SKUs and the ledger."""
+    from app.models import StockMovement
+    from app.services.inventory_summary_service import InventorySummaryService
+    with app.app_context():
+        InventorySummaryService.rebuild()
+        results = InventoryService.apply_stock_batch([
+            {'sku': 'TP002', 'delta': -3},   # 5 -> 2
+            {'sku': 'TP002', 'delta': -3},   # rejected, only 2 left
+            {'sku': 'TP001', 'delta': 10},   # 50 -> 60
+            {'sku': 'TP002', 'delta': 4},    # 2 -> 6
+            {'sku': 'NOPE', 'delta': 1},
+            {'sku': 'TP001', 'delta': 'x'},
+        ])
+
+        assert [r['status'] for r in results] == [
+            'applied', 'insufficient_stock', 'applied', 'applied', 'not_found', 'invalid'
+        ]
+        assert [r.get('stock_level') for r in results[:4]] == [2, None, 60, 6]
+        assert db.session.get(Product, sample_products[0].id).stock_level == 60
+        assert db.session.get(Product, sample_products[1].id).stock_level == 6
+        assert StockMovement.query.count() == 3
+        assert InventorySummaryService.check_drift() == {}
+
+def test_apply_stock_batch_falls_back_when_stock_changed(app, sample_products, mocker):
+    """Test that a product whose stock dropped after the read is retried item by item."""
+    from sqlalchemy import update
+    with app.app_context():
+        original_execute = db.session.execute
+        drained = []
+
+        def execute(stmt, *args, **kwargs):
+            # Simulate another picker emptying TP002 between the read and the batch UPDATE
+            if not drained and getattr(stmt, 'is_update', False):
+                drained.append(True)
+                original_execute(update(Product).where(Product.sku == 'TP002').values(stock_level=1))
+            return original_execute(stmt, *args, **kwargs)
+
+        mocker.patch.object(db.session, 'execute', side_effect=execute)
+        results = InventoryService.apply_stock_batch([
+            {'sku': 'TP002', 'delta': -1},
+            {'sku': 'TP002', 'delta': -1},
+        ])
+
+        assert [r['status'] for r in results] == ['applied', 'insufficient_stock']
+        assert db.session.get(Product, sample_products[1].id).stock_level == 0
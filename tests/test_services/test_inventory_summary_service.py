@@ -0,0 +1,122 @@
+"""Test the materialized inventory summary."""
+from decimal import Decimal
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+from app.models import db, Product, InventorySummary
+from app.services.inventory_service import InventoryService
+from app.services.inventory_summary_service import InventorySummaryService
+from app.services.product_service import ProductService
+
+
+def _create(sku, price='10.00', stock='5', threshold='10'):
+    product, errors = ProductService.create_product({
+        'name': f'Product {sku}',
+        'sku': sku,
+        'price': price,
+        'stock_level': stock,
+        'low_stock_threshold': threshold
+    })
+    assert errors == {}
+    return product
+
+
+def test_summary_tracks_product_writes(app):
+    """Test that create, update, adjust and delete keep the summary in sync."""
+    with app.app_context():
+        first = _create('SUM001', price='2.50', stock='4')
+        _create('SUM002', price='1.00', stock='100')
+        assert InventorySummaryService.check_drift() == {}
+
+        ProductService.update_product(first.id, {'stock_level': '0', 'price': '3.00'})
+        assert InventorySummaryService.check_drift() == {}
+
+        InventoryService.adjust_stock(first.id, 7)
+        assert InventorySummaryService.check_drift() == {}
+
+        assert ProductService.delete_product(first.id) is True
+        assert InventorySummaryService.check_drift() == {}
+
+        summary = db.session.get(InventorySummary, InventorySummary.SINGLETON_ID)
+        assert summary.total_products == 1
+        assert summary.total_units == 100
+        assert Decimal(summary.total_value) == Decimal('100.00')
+        assert summary.low_stock_count == 0
+
+
+def test_get_stats_matches_aggregate(app):
+    """Test that stats read from the summary match the aggregate query."""
+    with app.app_context():
+        _create('SUM010', price='4.20', stock='0')
+        _create('SUM011', price='9.99', stock='3')
+        _create('SUM012', price='0.50', stock='50')
+        assert InventorySummaryService.get_stats() == InventoryService.get_inventory_stats()
+
+
+def test_get_stats_without_summary_row_uses_aggregate(app, sample_products):
+    """Test the fallback when the summary has never been built."""
+    with app.app_context():
+        assert db.session.get(InventorySummary, InventorySummary.SINGLETON_ID) is None
+        assert InventorySummaryService.get_stats() == InventoryService.get_inventory_stats()
+
+
+def test_concurrent_first_writers_both_commit(app, monkeypatch):
+    """Test that a first write losing the race to seed the summary row adds its change instead of failing."""
+    rival = {'id': InventorySummary.SINGLETON_ID, 'total_products': 1, 'total_units': 3, 'total_value': 3,
+             'low_stock_count': 0, 'out_of_stock_count': 0, 'catalog_version': 1}
+    seeded = []
+
+    def seed_first(conn, cursor, statement, parameters, context, executemany):
+        # Another writer commits the seed right after this one's UPDATE found no row
+        if not seeded and statement.startswith('UPDATE inventory_summary') and cursor.rowcount == 0:
+            seeded.append(True)
+            conn.execute(InventorySummary.__table__.insert(), rival)
+
+    def collide(commit=True):
+        # The rival's row was not yet visible to this seed, so its INSERT hits the same key
+        raise IntegrityError('INSERT INTO inventory_summary', {}, Exception('UNIQUE constraint failed'))
+
+    monkeypatch.setattr(InventorySummaryService, 'rebuild', staticmethod(collide))
+    event.listen(db.engine, 'after_cursor_execute', seed_first)
+    try:
+        product = _create('RACE1', price='2.00', stock='4', threshold='1')
+    finally:
+        event.remove(db.engine, 'after_cursor_execute', seed_first)
+    assert product is not None and seeded
+    summary = db.session.get(InventorySummary, InventorySummary.SINGLETON_ID, populate_existing=True)
+    assert (summary.total_products, summary.total_units, Decimal(summary.total_value)) == (2, 7, Decimal('11.00'))
+    assert summary.catalog_version == 2
+
+
+def test_check_drift_and_rebuild(app, sample_products):
+    """Test drift detection after out-of-band writes and repair via rebuild."""
+    with app.app_context():
+        InventorySummaryService.rebuild()
+        assert InventorySummaryService.check_drift() == {}
+
+        # Write that bypasses the services
+        db.session.add(Product(name='Sneaky', sku='SNK001', price=1, stock_level=0, low_stock_threshold=1))
+        db.session.commit()
+
+        drift = InventorySummaryService.check_drift()
+        assert drift['total_products'] == {'stored': 2, 'actual': 3}
+        assert 'out_of_stock_count' in drift
+
+        InventorySummaryService.rebuild()
+        assert InventorySummaryService.check_drift() == {}
+
+
+def test_inventory_summary_cli(app, sample_products):
+    """Test the rebuild and check CLI commands."""
+    runner = app.test_cli_runner()
+
+    result = runner.invoke(args=['inventory-summary', 'check'])
+    assert result.exit_code != 0
+    assert 'drifted' in result.output
+
+    result = runner.invoke(args=['inventory-summary', 'rebuild'])
+    assert result.exit_code == 0
+    assert '2 products' in result.output
+
+    result = runner.invoke(args=['inventory-summary', 'check'])
+    assert result.exit_code == 0
+    assert 'up to date' in result.output
@@ -0,0 +1,165 @@
+"""Test the mail outbox and its delivery worker against a local SMTP stand-in."""
+import socketserver
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+from flask import url_for
+
+from app.models import db, OutboundEmail, User
+from app.services.mail_service import MailService
+
+
+class SMTPStandIn(socketserver.ThreadingTCPServer):
+    """Minimal SMTP server that records what it receives; RCPT TO addresses in `refused` get a 550."""
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), SMTPHandler)
+        self.messages = []
+        self.connections = 0
+        self.refused = set()
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(f'{line}\r\n'.encode())
+
+    def handle(self):
+        self.server.connections += 1
+        self.reply('220 localhost stand-in')
+        recipients, reading_data, data = [], False, []
+        for raw in self.rfile:
+            line = raw.decode().rstrip('\r\n')
+            if reading_data:
+                if line == '.':
+                    self.server.messages.append((recipients, '\n'.join(data)))
+                    recipients, reading_data, data = [], False, []
+                    self.reply('250 OK')
+                else:
+                    data.append(line)
+                continue
+            command = line[:4].upper()
+            if command in ('EHLO', 'HELO'):
+                self.reply('250 localhost')
+            elif command == 'RCPT':
+                address = line.split(':', 1)[1].strip().strip('<>')
+                if address in self.server.refused:
+                    self.reply('550 No such user')
+                else:
+                    recipients.append(address)
+                    self.reply('250 OK')
+            elif command == 'DATA':
+                reading_data = True
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+            elif command == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:  # MAIL, RSET, NOOP
+                self.reply('250 OK')
+
+
+@pytest.fixture
+def smtp_server(app):
+    """A running stand-in server, with the app's mail settings pointed at it."""
+    server = SMTPStandIn()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    mail_state = app.extensions['mail']
+    mail_state.server, mail_state.port = server.server_address
+    mail_state.suppress = False
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _make_due(*emails):
+    for email in emails:
+        email.next_attempt_at = datetime.utcnow() - timedelta(seconds=1)
+    db.session.commit()
+
+
+def test_batch_is_sent_over_one_connection(app, smtp_server):
+    """Test that queued emails are delivered in one SMTP session and marked sent."""
+    for i in range(3):
+        MailService.enqueue(f'Hello {i}', [f'user{i}@example.com'], 'Body')
+
+    assert MailService.deliver_batch() == {'sent': 3, 'retry': 0, 'dead': 0}
+    assert smtp_server.connections == 1
+    assert sorted(r for recipients, _ in smtp_server.messages for r in recipients) == [
+        'user0@example.com', 'user1@example.com', 'user2@example.com']
+    assert MailService.queue_stats() == {OutboundEmail.STATUS_SENT: 3}
+    assert MailService.deliver_batch() == {'sent': 0, 'retry': 0, 'dead': 0}
+
+
+def test_failures_back_off_and_end_up_dead(app, smtp_server):
+    """Test that a refused recipient is retried with growing delays, then dead-lettered."""
+    app.config['MAIL_OUTBOX_MAX_ATTEMPTS'] = 3
+    smtp_server.refused.add('bounce@example.com')
+    bad = MailService.enqueue('Bad', ['bounce@example.com'], 'Body')
+    good = MailService.enqueue('Good', ['ok@example.com'], 'Body')
+
+    assert MailService.deliver_batch() == {'sent': 1, 'retry': 1, 'dead': 0}
+    delays = []
+    for expected in ({'sent': 0, 'retry': 1, 'dead': 0}, {'sent': 0, 'retry': 0, 'dead': 1}):
+        delays.append(bad.next_attempt_at - datetime.utcnow())
+        assert MailService.deliver_batch() == {'sent': 0, 'retry': 0, 'dead': 0}  # not due yet
+        _make_due(bad)
+        assert MailService.deliver_batch() == expected
+
+    assert delays[0] >= timedelta(seconds=29) and delays[1] >= timedelta(seconds=59)
+    assert (bad.status, bad.attempts) == (OutboundEmail.STATUS_DEAD, 3)
+    assert 'SMTPRecipientsRefused' in bad.last_error
+    assert good.status == OutboundEmail.STATUS_SENT
+
+    assert MailService.requeue_dead() == 1
+    smtp_server.refused.clear()
+    assert MailService.deliver_batch() == {'sent': 1, 'retry': 0, 'dead': 0}
+
+
+def test_unreachable_server_retries_the_whole_batch(app, smtp_server):
+    """Test that a connection failure schedules every claimed email for a retry without using attempts."""
+    app.config['MAIL_OUTBOX_MAX_ATTEMPTS'] = 1
+    smtp_server.shutdown()
+    smtp_server.server_close()
+    one = MailService.enqueue('One', ['a@example.com'], 'Body')
+    two = MailService.enqueue('Two', ['b@example.com'], 'Body')
+
+    for _ in range(3):
+        assert MailService.deliver_batch() == {'sent': 0, 'retry': 2, 'dead': 0}
+        assert MailService.queue_stats() == {OutboundEmail.STATUS_PENDING: 2}
+        assert (one.attempts, two.attempts) == (0, 0)
+        assert one.next_attempt_at - datetime.utcnow() >= timedelta(seconds=29)
+        _make_due(one, two)
+
+
+def test_expired_claims_are_retried(app):
+    """Test that emails claimed by a worker that died become due once the lease expires."""
+    email = MailService.enqueue('Stuck', ['a@example.com'], 'Body')
+    assert [e.id for e in MailService.claim_batch()] == [email.id]
+    assert MailService.claim_batch() == []
+
+    _make_due(email)
+    assert [e.attempts for e in MailService.claim_batch()] == [2]
+
+
+def test_password_reset_is_queued_not_sent(app, client, smtp_server):
+    """Test that the reset request only enqueues, and the worker command sends it."""
+    user = User(username='resetme', email='resetme@example.com')
+    user.set_password('password')
+    db.session.add(user)
+    db.session.commit()
+
+    with app.test_request_context():
+        url = url_for('auth.request_reset_token')
+    response = client.post(url, data={'email': 'resetme@example.com'})
+    assert response.status_code == 302
+    assert smtp_server.messages == []
+    assert MailService.queue_stats() == {OutboundEmail.STATUS_PENDING: 1}
+
+    result = app.test_cli_runner().invoke(args=['mail-worker', '--once'])
+    assert result.exit_code == 0
+    assert 'Mail worker stopped: 1 sent' in result.output
+    assert smtp_server.messages[0][0] == ['resetme@example.com']
+    assert '/auth/reset_password/' in smtp_server.messages[0][1]
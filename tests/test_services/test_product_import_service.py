@@ -0,0 +1,90 @@
+"""Test the bulk CSV product importer."""
+import io
+import csv
+from decimal import Decimal
+from app.models import db, Product, StockMovement
+from app.services.product_import_service import ProductImportService
+from app.services.inventory_summary_service import InventorySummaryService
+
+
+CSV_HEADER = "name,sku,description,price,stock_level,low_stock_threshold\n"
+
+
+def test_import_csv_inserts_valid_rows_and_reports_rejects(app, sample_products):
+    """Test chunked import with type errors, duplicates and existing SKUs."""
+    data = CSV_HEADER + (
+        "Bolt,BLT001,Steel bolt,0.25,1000,100\n"
+        "Nut,NUT001,,0.10,0,50\n"
+        "Bad Price,BAD001,,abc,1,1\n"
+        "Existing,TP001,,1.00,1,1\n"
+        "Bolt Again,BLT001,,0.25,1,1\n"
+        ",NONAME,,1.00,1,1\n"
+        "Washer,WSH001,,,,\n"
+    )
+    errors = io.StringIO()
+    progress = []
+
+    with app.app_context():
+        InventorySummaryService.rebuild()
+        totals = ProductImportService.import_csv(io.StringIO(data), chunk_size=3,
+                                                 error_stream=errors, progress=progress.append)
+
+        assert totals == {'rows': 7, 'imported': 3, 'rejected': 4}
+        assert [p['rows'] for p in progress] == [3, 6, 7]
+
+        bolt = Product.query.filter_by(sku='BLT001').one()
+        assert bolt.price == Decimal('0.25')
+        assert bolt.stock_level == 1000
+        washer = Product.query.filter_by(sku='WSH001').one()
+        assert washer.stock_level == 0 and washer.price == Decimal('0.00')
+
+        assert StockMovement.query.filter_by(product_id=bolt.id).one().delta == 1000
+        assert InventorySummaryService.check_drift() == {}
+
+    rejected = list(csv.DictReader(io.StringIO(errors.getvalue())))
+    assert [r['sku'] for r in rejected] == ['BAD001', 'TP001', 'BLT001', 'NONAME']
+    assert [r['line'] for r in rejected] == ['4', '5', '6', '7']
+    assert 'price' in rejected[0]['error']
+    assert 'already in use' in rejected[1]['error']
+    assert 'Duplicate SKU' in rejected[2]['error']
+
+
+def test_import_products_cli(app, tmp_path):
+    """Test the flask import-products command with an error file."""
+    source = tmp_path / 'catalog.csv'
+    source.write_text(CSV_HEADER + "Gear,GR001,,5.00,3,1\nGear,GR001,,5.00,3,1\n")
+    error_file = tmp_path / 'errors.csv'
+
+    result = app.test_cli_runner().invoke(args=['import-products', str(source), '--errors', str(error_file)])
+
+    assert result.exit_code == 0
+    assert 'Import finished: 1 imported, 1 rejected.' in result.output
+    assert 'Duplicate SKU' in error_file.read_text()
+    with app.app_context():
+        assert Product.query.filter_by(sku='GR001').count() == 1
+
+
+def test_import_csv_upsert_updates_existing_skus(app, sample_products):
+    """Test that upsert mode updates existing SKUs and keeps blank cells."""
+    data = CSV_HEADER + (
+        "Test Product 1,TP001,First test product,10.99,50,10\n"
+        ",TP002,,25.00,,\n"
+        "Bolt,BLT001,Steel bolt,0.25,1000,100\n"
+        "Bolt,BLT001,Steel bolt,0.25,1000,100\n"
+    )
+    errors = io.StringIO()
+
+    with app.app_context():
+        InventorySummaryService.rebuild()
+        totals = ProductImportService.import_csv(io.StringIO(data), chunk_size=2,
+                                                 error_stream=errors, upsert=True)
+
+        assert totals == {'rows': 4, 'imported': 2, 'rejected': 1,
+                          'inserted': 1, 'updated': 1, 'unchanged': 1}
+        product = Product.query.filter_by(sku='TP002').one()
+        assert product.price == Decimal('25.00')
+        assert product.name == 'Test Product 2' and product.stock_level == 5
+        assert InventorySummaryService.check_drift() == {}
+
+    rejected = list(csv.DictReader(io.StringIO(errors.getvalue())))
+    assert [(r['line'], r['sku']) for r in rejected] == [('5', 'BLT001')]
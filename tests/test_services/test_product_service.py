@@ -1,6 +1,8 @@
 """Test the product service."""
 from app.services.product_service import ProductService
 from decimal import Decimal 
+from app.models import Product, StockMovement
+from app.services.inventory_summary_service import InventorySummaryService
 
 def test_create_product_successful(app):
     """Test successfully creating a product."""
@@ -86,3 +88,173 @@ def test_validate_product_data_numeric_fields(app):
         errors = ProductService.validate_product_data(data)
         assert 'low_stock_threshold' in errors
 
+
+def test_get_products_page_walks_forward_and_back(app):
+    """Test keyset pagination over (name, id), including duplicate names."""
+    with app.app_context():
+        for i in range(5):
+            ProductService.create_product({
+                'name': 'Widget' if i < 3 else f'Zed {i}',
+                'sku': f'KS{i:03d}',
+                'price': '1.00',
+                'stock_level': '1',
+                'low_stock_threshold': '0'
+            })
+
+        first = ProductService.get_products_page(per_page=2)
+        assert [p.sku for p in first.items] == ['KS000', 'KS001']
+        assert first.has_next and not first.has_prev
+
+        second = ProductService.get_products_page(after=first.next_cursor, per_page=2)
+        assert [p.sku for p in second.items] == ['KS002', 'KS003']
+        assert second.has_next and second.has_prev
+
+        third = ProductService.get_products_page(after=second.next_cursor, per_page=2)
+        assert [p.sku for p in third.items] == ['KS004']
+        assert not third.has_next and third.has_prev
+
+        back = ProductService.get_products_page(before=third.prev_cursor, per_page=2)
+        assert [p.sku for p in back.items] == ['KS002', 'KS003']
+        assert back.has_next and back.has_prev
+
+def test_get_products_page_caps_page_size(app):
+    """Test that per_page is clamped to PRODUCTS_MAX_PER_PAGE."""
+    with app.app_context():
+        app.config['PRODUCTS_MAX_PER_PAGE'] = 3
+        page = ProductService.get_products_page(per_page=1000)
+        assert page.per_page == 3
+
+def test_bulk_upsert_reports_inserted_updated_unchanged(app, sample_products):
+    """Test that bulk_upsert inserts new SKUs, updates changed ones and skips identical rows."""
+    with app.app_context():
+        InventorySummaryService.rebuild()
+        rows = [
+            {'sku': 'TP001', 'name': 'Test Product 1', 'description': 'First test product',
+             'price': '10.99', 'stock_level': 50, 'low_stock_threshold': 10},
+            {'sku': 'TP002', 'price': '19.99', 'stock_level': '8'},
+            {'sku': 'NEW001', 'name': 'New Product', 'price': '5.00', 'stock_level': 3},
+            {'sku': 'NEW002', 'price': '1.00'},
+            {'sku': 'NEW003', 'name': 'Bad', 'price': '-1'},
+            {'sku': 'NEW001', 'name': 'Twice'},
+        ]
+
+        result = ProductService.bulk_upsert(rows, chunk_size=2)
+
+        assert (result['inserted'], result['updated'], result['unchanged'], result['rejected']) == (1, 1, 1, 3)
+        assert set(result['errors']) == {3, 4, 5}
+        assert 'name' in result['errors'][3]
+        assert 'price' in result['errors'][4]
+
+        updated = Product.query.filter_by(sku='TP002').one()
+        assert updated.price == Decimal('19.99')
+        assert updated.stock_level == 8
+        assert updated.name == 'Test Product 2'
+        created = Product.query.filter_by(sku='NEW001').one()
+        assert created.stock_level == 3 and created.description == ''
+
+        assert [m.delta for m in StockMovement.query.filter_by(product_id=updated.id)] == [3]
+        assert [m.delta for m in StockMovement.query.filter_by(product_id=created.id)] == [3]
+        assert InventorySummaryService.check_drift() == {}
+
+        again = ProductService.bulk_upsert(rows[:3])
+        assert (again['inserted'], again['updated'], again['unchanged']) == (0, 0, 3)
+        assert Product.query.filter_by(sku='TP002').one().price == Decimal('19.99')
+
+def test_upsert_rows_get_format_checks_only(app, sample_products):
+    """Test that an upsert row is format-checked without treating its stored SKU as taken."""
+    with app.app_context():
+        assert ProductService._validate_upsert_row({'sku': 'TP001', 'price': '3.50'}) == {}
+        assert ProductService._validate_upsert_row({'sku': 'TP001', 'name': ''}) == {'name': "Name cannot be empty."}
+        assert set(ProductService._validate_upsert_row({'sku': 'NEW', 'stock_level': '-2', 'price': 'x'})) == {
+            'stock_level', 'price'}
+
+def test_search_ranks_name_and_sku_matches_first(app):
+    """Test that search matches word prefixes across fields and ranks name hits above description hits."""
+    ProductService.bulk_upsert([
+        {'name': 'Blue Widget', 'sku': 'WID-100', 'price': '5'},
+        {'name': 'Gadget', 'sku': 'GAD-200', 'description': 'Works with any widget', 'price': '5'},
+        {'name': 'Sprocket', 'sku': 'SPR-300', 'price': '5'},
+    ])
+
+    results = ProductService.search('widg')
+    assert [p.sku for p in results.items] == ['WID-100', 'GAD-200']
+    assert not results.has_next
+
+    assert [p.sku for p in ProductService.search('spr 300').items] == ['SPR-300']
+    assert ProductService.search('widget sprocket').items == []
+    assert ProductService.search('  "; -- ').items == []
+
+def test_search_index_follows_updates_and_deletes(app, sample_products):
+    """Test that the full-text index stays in sync with product writes."""
+    product = sample_products[0]
+    assert [p.id for p in ProductService.search('test product 1').items] == [product.id]
+
+    ProductService.update_product(product.id, {'name': 'Renamed Gizmo'})
+    assert ProductService.search('test product 1').items == []
+    assert [p.id for p in ProductService.search('gizmo').items] == [product.id]
+
+    ProductService.delete_product(product.id)
+    assert ProductService.search('gizmo').items == []
+
+def test_delete_archives_and_keeps_the_ledger(app):
+    """Test that deleting a product keeps its stock history and frees its SKU."""
+    from app.models import db
+    from app.services import InventoryService
+    from sqlalchemy import select
+
+    product, _ = ProductService.create_product({'name': 'Audited', 'sku': 'AUD-1', 'price': '2.00',
+                                                'stock_level': '7', 'low_stock_threshold': '1'})
+    InventoryService.adjust_stock(product.id, -2)
+    assert ProductService.delete_product(product.id) is True
+
+    assert ProductService.get_product_by_id(product.id) is None
+    assert [m.delta for m in InventoryService.get_movements(product.id)] == [-2, 7]
+    archived = db.session.execute(
+        select(Product).where(Product.id == product.id).execution_options(include_archived=True)
+    ).scalar_one()
+    assert archived.archived_at is not None and archived.stock_level == 5
+    assert InventorySummaryService.check_drift() == {}
+
+    replacement, errors = ProductService.create_product({'name': 'Audited v2', 'sku': 'AUD-1', 'price': '3.00'})
+    assert errors == {} and replacement.id != product.id
+    assert ProductService.get_products_by_skus(['AUD-1'])['AUD-1'].id == replacement.id
+
+def test_upsert_reusing_an_archived_sku_logs_against_the_new_row(app):
+    """Test that the opening movement of a re-upserted SKU goes to the new product, not the archived one."""
+    from app.services import InventoryService
+
+    product, _ = ProductService.create_product({'name': 'Retired', 'sku': 'RET-1', 'price': '2.00',
+                                                'stock_level': '4'})
+    assert ProductService.delete_product(product.id) is True
+
+    result = ProductService.bulk_upsert([{'sku': 'RET-1', 'name': 'Returned', 'price': '2.50', 'stock_level': 9}])
+
+    assert result['inserted'] == 1
+    replacement = ProductService.get_products_by_skus(['RET-1'])['RET-1']
+    assert replacement.id != product.id
+    assert [m.delta for m in InventoryService.get_movements(replacement.id)] == [9]
+    assert [m.delta for m in InventoryService.get_movements(product.id)] == [4]
+
+def test_search_paginates(app):
+    """Test that search results are split into numbered pages."""
+    ProductService.bulk_upsert([{'name': f'Bolt {i}', 'sku': f'BOLT{i}', 'price': '1'} for i in range(5)])
+
+    first = ProductService.search('bolt', per_page=2)
+    assert len(first.items) == 2 and first.has_next and not first.has_prev
+    last = ProductService.search('bolt', page=3, per_page=2)
+    assert len(last.items) == 1 and not last.has_next and last.has_prev
+    seen = {p.id for n in (1, 2, 3) for p in ProductService.search('bolt', page=n, per_page=2).items}
+    assert len(seen) == 5
+
+def test_get_products_by_skus_flags_missing_and_chunks(app, sample_products):
+    """Test batch SKU resolution: request order, missing SKUs and chunked IN queries."""
+    result = ProductService.get_products_by_skus(['TP002', 'NOPE', 'TP001', 'TP002'], chunk_size=1)
+    assert list(result) == ['TP002', 'NOPE', 'TP001']
+    assert result['NOPE'] is None
+    assert isinstance(result['TP001'], Product) and result['TP001'].price == Decimal('10.99')
+
+    rows = ProductService.get_products_by_skus(['TP001', 'NOPE'], fields=['price', 'stock_level'])
+    assert rows == {'TP001': {'sku': 'TP001', 'price': Decimal('10.99'), 'stock_level': 50}, 'NOPE': None}
+
+    by_id = ProductService.get_products_by_ids([sample_products[1].id, -1], fields=['sku'])
+    assert by_id == {sample_products[1].id: {'id': sample_products[1].id, 'sku': 'TP002'}, -1: None}